@@ -0,0 +1,254 @@
+from array import array
+import sys
+
+import tree_memory
+
+
+class ArrayAVLTree():
+    """AVL tree whose nodes live in parallel typed arrays (struct-of-arrays).
+
+    A node is an integer id indexing the _left, _right, _parent and _height
+    arrays, so there is no per-node Python object. Deleted ids are threaded
+    onto a free-list through _left and reused by later inserts. If keytype
+    is an array typecode (e.g. 'q' for ints or 'd' for floats) the keys are
+    stored unboxed in a typed array too; otherwise they go in a plain list.
+    """
+
+    _NIL = -1
+
+    def __init__(self, keytype=None):
+        """Create an initially empty tree."""
+        self._keys = array(keytype) if keytype is not None else []
+        self._left = array('i')
+        self._right = array('i')
+        self._parent = array('i')
+        self._height = array('B')  # NIL has height 0, a leaf height 1
+        self._root = self._NIL
+        self._free = self._NIL
+        self._size = 0
+
+    def _alloc(self, element, parent):
+        node = self._free
+        if node != self._NIL:
+            self._free = self._left[node]
+            self._keys[node] = element
+            self._left[node] = self._NIL
+            self._right[node] = self._NIL
+            self._parent[node] = parent
+            self._height[node] = 1
+        else:
+            node = len(self._left)
+            self._keys.append(element)
+            self._left.append(self._NIL)
+            self._right.append(self._NIL)
+            self._parent.append(parent)
+            self._height.append(1)
+        return node
+
+    def _release(self, node):
+        if isinstance(self._keys, list):
+            self._keys[node] = None  # drop the reference to the key object
+        self._left[node] = self._free
+        self._free = node
+
+    def search(self, element):
+        return self._search_node(element) != self._NIL
+
+    def _search_node(self, element):
+        keys, left, right = self._keys, self._left, self._right
+        current = self._root
+        while current != -1:
+            key = keys[current]
+            if element == key:
+                return current
+            elif element < key:
+                current = left[current]
+            else:
+                current = right[current]
+        return self._NIL
+
+    def insert(self, element):
+        if self._root == self._NIL:
+            self._root = self._alloc(element, self._NIL)
+            self._size = 1
+            return
+
+        keys, left, right = self._keys, self._left, self._right
+        current = self._root
+        while True:
+            key = keys[current]
+            if element == key:
+                # Duplicate elements not allowed
+                return
+            if element < key:
+                child = left[current]
+                if child == -1:
+                    left[current] = self._alloc(element, current)
+                    break
+            else:
+                child = right[current]
+                if child == -1:
+                    right[current] = self._alloc(element, current)
+                    break
+            current = child
+
+        self._size += 1
+        self._rebalance_upward(current)
+
+    def delete(self, element):
+        node = self._search_node(element)
+        if node == self._NIL:
+            return False
+
+        left, right, parent = self._left, self._right, self._parent
+        if left[node] != -1 and right[node] != -1:
+            # Copy the inorder successor up, then remove the successor instead
+            successor = right[node]
+            while left[successor] != -1:
+                successor = left[successor]
+            self._keys[node] = self._keys[successor]
+            node = successor
+
+        child = left[node] if left[node] != -1 else right[node]
+        above = parent[node]
+        if child != -1:
+            parent[child] = above
+        if above == -1:
+            self._root = child
+        elif left[above] == node:
+            left[above] = child
+        else:
+            right[above] = child
+
+        self._release(node)
+        self._size -= 1
+        self._rebalance_upward(above)
+        return True
+
+    def _node_height(self, node):
+        return self._height[node] if node != -1 else 0
+
+    def _update_height(self, node):
+        self._height[node] = 1 + max(self._node_height(self._left[node]),
+                                     self._node_height(self._right[node]))
+
+    def _get_balance(self, node):
+        return self._node_height(self._left[node]) - self._node_height(self._right[node])
+
+    def _rebalance_upward(self, node):
+        """Restore heights and balance from node up to the root.
+
+        Stops early once a subtree ends up with the height it had before,
+        since nothing above it can have changed.
+        """
+        height = self._height
+        while node != -1:
+            old_height = height[node]
+            self._update_height(node)
+            balance = self._get_balance(node)
+            if balance > 1:
+                if self._get_balance(self._left[node]) < 0:
+                    self._rotate_left(self._left[node])
+                node = self._rotate_right(node)
+            elif balance < -1:
+                if self._get_balance(self._right[node]) > 0:
+                    self._rotate_right(self._right[node])
+                node = self._rotate_left(node)
+            if height[node] == old_height:
+                return
+            node = self._parent[node]
+
+    def _replace_child(self, above, old, new):
+        if above == -1:
+            self._root = new
+        elif self._left[above] == old:
+            self._left[above] = new
+        else:
+            self._right[above] = new
+
+    def _rotate_left(self, node):
+        left, right, parent = self._left, self._right, self._parent
+        new_root = right[node]
+        inner = left[new_root]
+        right[node] = inner
+        if inner != -1:
+            parent[inner] = node
+
+        above = parent[node]
+        parent[new_root] = above
+        self._replace_child(above, node, new_root)
+        left[new_root] = node
+        parent[node] = new_root
+
+        self._update_height(node)
+        self._update_height(new_root)
+        return new_root
+
+    def _rotate_right(self, node):
+        left, right, parent = self._left, self._right, self._parent
+        new_root = left[node]
+        inner = right[new_root]
+        left[node] = inner
+        if inner != -1:
+            parent[inner] = node
+
+        above = parent[node]
+        parent[new_root] = above
+        self._replace_child(above, node, new_root)
+        right[new_root] = node
+        parent[node] = new_root
+
+        self._update_height(node)
+        self._update_height(new_root)
+        return new_root
+
+    def size(self):
+        return self._size
+
+    def memory_report(self, deep=False):
+        """Report slot count, bytes per slot, total bytes and bytes per key.
+
+        A node is a slot of the parallel arrays, freed slots included, so
+        bytes per node is the arrays' total over their length. Keys in a
+        typed array are already part of that; keys in a list are only
+        measured with deep=True (see tree_memory).
+        """
+        arrays = (self._keys, self._left, self._right, self._parent, self._height)
+        slots = len(self._left)
+        deep_keys = None
+        if deep:
+            deep_keys = self.iter_inorder() if isinstance(self._keys, list) else ()
+        return tree_memory.report(slots, sum(map(sys.getsizeof, arrays)), self._size,
+                                  tree_memory.object_bytes(self), deep_keys)
+
+    def is_empty(self):
+        return self._size == 0
+
+    def height(self):
+        return self._node_height(self._root) - 1
+
+    def inorder_traversal(self):
+        return list(self.iter_inorder())
+
+    def iter_inorder(self):
+        """Lazily yield elements in sorted order using O(height) memory."""
+        keys, left, right = self._keys, self._left, self._right
+        stack = []
+        node = self._root
+        while stack or node != -1:
+            if node != -1:
+                stack.append(node)
+                node = left[node]
+            else:
+                node = stack.pop()
+                yield keys[node]
+                node = right[node]
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, element):
+        return self.search(element)
+
+    def __iter__(self):
+        return self.iter_inorder()
@@ -1,14 +1,28 @@
+from array import array
+from collections import deque
+from operator import attrgetter
+
+import batch_ops
+from frozen_tree import FrozenTree
+import sorted_build
+import tree_file
+import tree_memory
+
+_node_parts = attrgetter('_element', '_left', '_right')
+
+
 class AVLTree():
     class _Node:
         """Lightweight, nonpublic class for storing a node."""
-        __slots__ = '_element', '_parent', '_left', '_right', '_height' # streamline memory usage
+        __slots__ = '_element', '_parent', '_left', '_right', '_height', '_count' # streamline memory usage
 
         def __init__(self, element, parent=None, left=None, right=None):
             self._element = element
             self._parent = parent
             self._left = left
             self._right = right
-            self._height = 0
+            self._height = 1  # a missing child counts as height 0
+            self._count = 1
 
         def left_height(self):
             return self._left._height if self._left != None else 0
@@ -19,11 +33,34 @@ class AVLTree():
         def set_height(self, new_height):
             self._height = new_height
 
+        def left_count(self):
+            return self._left._count if self._left is not None else 0
+
+        def right_count(self):
+            return self._right._count if self._right is not None else 0
+
     def __init__(self):
         """Create an initially empty binary tree."""
         self._root = None
         self._size = 0
 
+    @classmethod
+    def from_sorted(cls, iterable):
+        """Build a perfectly balanced tree from ascending elements in O(n).
+
+        The input may be a one-shot iterator; it is consumed once and never
+        copied into a list. Duplicate elements are skipped, like insert().
+        """
+        tree = cls()
+        head, count = sorted_build.link_sorted(iterable, cls._Node)
+        tree._root = sorted_build.build_balanced(head, count, tree._finish_built)
+        tree._size = count
+        return tree
+
+    def _finish_built(self, node, size):
+        self._update_height(node)
+        self._update_size(node)
+
     def search(self, element):
         return self._search_node(element) is not None
 
@@ -64,16 +101,19 @@ class AVLTree():
         
         # Update height
         self._update_height(node)
+        self._update_size(node)
         
         # Check balance and perform rotations if needed
         return self._rebalance(node)
 
     def delete(self, element):
+        """Delete element; returns whether it was present."""
         if self._root is None:
             return False
         
+        before = self._size
         self._root = self._delete_recursive(self._root, element)
-        return True
+        return self._size < before
 
     def _delete_recursive(self, node, element):
         if node is None:
@@ -85,16 +125,16 @@ class AVLTree():
             node._right = self._delete_recursive(node._right, element)
         else:
             # Node to be deleted found
-            self._size -= 1
-            
             # Case 1: Node with only right child or no child
             if node._left is None:
+                self._size -= 1
                 if node._right:
                     node._right._parent = node._parent
                 return node._right
             
             # Case 2: Node with only left child
             elif node._right is None:
+                self._size -= 1
                 node._left._parent = node._parent
                 return node._left
             
@@ -105,22 +145,327 @@ class AVLTree():
             # Replace node's element with successor's element
             node._element = successor._element
             
-            # Delete the successor
+            # Delete the successor (its removal accounts for the size change)
             node._right = self._delete_recursive(node._right, successor._element)
         
         self._update_height(node)
+        self._update_size(node)
         
         return self._rebalance(node)
 
+    @classmethod
+    def join(cls, left, pivot, right):
+        """Join two trees and a pivot with left < pivot < right in O(log n).
+
+        Returns a new tree; left and right are left empty.
+        """
+        if (left._root is not None and not left._find_max(left._root)._element < pivot) or \
+                (right._root is not None and not pivot < left._find_min(right._root)._element):
+            raise ValueError("join requires left < pivot < right")
+        tree = cls()
+        tree._set_root(tree._join(left._root, tree._Node(pivot), right._root))
+        left.clear()
+        right.clear()
+        return tree
+
+    def split(self, element):
+        """Split the tree at element, returning two trees (<= element, > element).
+
+        Runs in O(log n); this tree is left empty.
+        """
+        smaller, match, larger = self._split(self._root, element)
+        if match is not None:
+            smaller = self._join(smaller, match, None)
+        left_tree, right_tree = type(self)(), type(self)()
+        left_tree._set_root(smaller)
+        right_tree._set_root(larger)
+        self.clear()
+        return left_tree, right_tree
+
+    def delete_range(self, min_val, max_val):
+        """Delete every element within [min_val, max_val], returning how many were removed."""
+        if max_val < min_val or self._root is None:
+            return 0
+        before = self._size
+        smaller, _, rest = self._split(self._root, min_val)
+        _, _, larger = self._split(rest, max_val)
+        self._set_root(self._concat(smaller, larger))
+        return before - self._size
+
+    def extract_below(self, element):
+        """Remove and return, as a new tree, every element less than element."""
+        smaller, match, larger = self._split(self._root, element)
+        if match is not None:
+            larger = self._join(None, match, larger)
+        self._set_root(larger)
+        extracted = type(self)()
+        extracted._set_root(smaller)
+        return extracted
+
+    def union(self, other):
+        """Return a new tree of the elements in this tree or other.
+
+        The set operations are join-based divide and conquer: split one
+        tree at the other's root, recurse on both halves and join the
+        results back, O(m log(n/m + 1)) for sizes m <= n. Nodes carry
+        parent pointers, so they cannot be shared between trees: the new
+        tree is built from copies of both trees' nodes, which makes these
+        methods Theta(n + m) overall. The in-place operators (|=, &=, -=,
+        ^=) reuse this tree's nodes and copy only other, so updating a
+        large tree with a small batch costs O(m log(n/m + 1)). other may be
+        another AVLTree or any iterable yielding ascending elements;
+        repeats are skipped and an element out of order raises ValueError,
+        in every set operation and in-place form.
+        """
+        return self._combine(self._union, self._copy_nodes(self._root), self._nodes_of(other))
+
+    def intersection(self, other):
+        """Return a new tree of the elements in both this tree and other."""
+        return self._combine(self._intersection, self._copy_nodes(self._root), self._nodes_of(other))
+
+    def difference(self, other):
+        """Return a new tree of the elements in this tree but not in other."""
+        return self._combine(self._difference, self._copy_nodes(self._root), self._nodes_of(other))
+
+    def symmetric_difference(self, other):
+        """Return a new tree of the elements in exactly one of this tree and other."""
+        return self._combine(self._symmetric_difference, self._copy_nodes(self._root), self._nodes_of(other))
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __xor__(self, other):
+        return self.symmetric_difference(other)
+
+    # The in-place forms work on this tree's own nodes; only other is copied
+    def __ior__(self, other):
+        self._set_root(self._union(self._root, self._nodes_of(other)))
+        return self
+
+    def __iand__(self, other):
+        self._set_root(self._intersection(self._root, self._nodes_of(other)))
+        return self
+
+    def __isub__(self, other):
+        self._set_root(self._difference(self._root, self._nodes_of(other)))
+        return self
+
+    def __ixor__(self, other):
+        self._set_root(self._symmetric_difference(self._root, self._nodes_of(other)))
+        return self
+
+    def _combine(self, operation, first, second):
+        tree = type(self)()
+        tree._set_root(operation(first, second))
+        return tree
+
+    def _nodes_of(self, other):
+        """Return a private copy of other's elements as a detached subtree."""
+        if isinstance(other, AVLTree):
+            return self._copy_nodes(other._root)
+        return self.from_sorted(batch_ops.ascending(other))._root
+
+    def _copy_nodes(self, root):
+        """Copy a subtree node for node, keeping its shape, heights and sizes."""
+        if root is None:
+            return None
+        top = self._Node(root._element)
+        stack = [(root, top)]
+        while stack:
+            node, copy = stack.pop()
+            copy._height = node._height
+            copy._count = node._count
+            if node._left is not None:
+                copy._left = self._Node(node._left._element, copy)
+                stack.append((node._left, copy._left))
+            if node._right is not None:
+                copy._right = self._Node(node._right._element, copy)
+                stack.append((node._right, copy._right))
+        return top
+
+    def _detach(self, node):
+        """Cut node off from its children, returning them as free-standing subtrees."""
+        left, right = node._left, node._right
+        if left is not None:
+            left._parent = None
+        if right is not None:
+            right._parent = None
+        node._left = node._right = node._parent = None
+        return left, right
+
+    # Each operation recurses over the nodes of the smaller tree and splits
+    # the larger one at them
+
+    def _union(self, first, second):
+        if first is None:
+            return second
+        if second is None:
+            return first
+        if first._count > second._count:
+            first, second = second, first
+        left, right = self._detach(first)
+        smaller, _, larger = self._split(second, first._element)
+        return self._join(self._union(left, smaller), first, self._union(right, larger))
+
+    def _intersection(self, first, second):
+        if first is None or second is None:
+            return None
+        if first._count > second._count:
+            first, second = second, first
+        left, right = self._detach(first)
+        smaller, match, larger = self._split(second, first._element)
+        left = self._intersection(left, smaller)
+        right = self._intersection(right, larger)
+        if match is None:
+            return self._concat(left, right)
+        return self._join(left, first, right)
+
+    def _difference(self, first, second):
+        if first is None or second is None:
+            return first
+        if first._count > second._count:
+            left, right = self._detach(second)
+            smaller, _, larger = self._split(first, second._element)
+            return self._concat(self._difference(smaller, left), self._difference(larger, right))
+        left, right = self._detach(first)
+        smaller, match, larger = self._split(second, first._element)
+        left = self._difference(left, smaller)
+        right = self._difference(right, larger)
+        if match is None:
+            return self._join(left, first, right)
+        return self._concat(left, right)
+
+    def _symmetric_difference(self, first, second):
+        if first is None:
+            return second
+        if second is None:
+            return first
+        if first._count > second._count:
+            first, second = second, first
+        left, right = self._detach(first)
+        smaller, match, larger = self._split(second, first._element)
+        left = self._symmetric_difference(left, smaller)
+        right = self._symmetric_difference(right, larger)
+        if match is None:
+            return self._join(left, first, right)
+        return self._concat(left, right)
+
+    def _set_root(self, root):
+        self._root = root
+        if root is not None:
+            root._parent = None
+        self._size = root._count if root is not None else 0
+
+    def _height_of(self, node):
+        return node._height if node is not None else 0
+
+    def _join(self, left, pivot, right):
+        """Join subtrees left < pivot node < right, returning the new subtree root."""
+        left_height, right_height = self._height_of(left), self._height_of(right)
+        if left_height > right_height + 1:
+            # Walk down the right spine of left to a subtree as short as right
+            above, node = None, left
+            while self._height_of(node) > right_height + 1:
+                above, node = node, node._right
+            self._link(pivot, node, right)
+            if above is None:
+                return pivot
+            above._right = pivot
+            pivot._parent = above
+            return self._rebalance_upward(above)
+        if right_height > left_height + 1:
+            above, node = None, right
+            while self._height_of(node) > left_height + 1:
+                above, node = node, node._left
+            self._link(pivot, left, node)
+            if above is None:
+                return pivot
+            above._left = pivot
+            pivot._parent = above
+            return self._rebalance_upward(above)
+        self._link(pivot, left, right)
+        pivot._parent = None
+        return pivot
+
+    def _link(self, node, left, right):
+        node._left = left
+        node._right = right
+        if left is not None:
+            left._parent = node
+        if right is not None:
+            right._parent = node
+        self._update_height(node)
+        self._update_size(node)
+
+    def _rebalance_upward(self, node):
+        """Fix heights, sizes and balance from node up to the top, returning the top."""
+        while True:
+            above = node._parent
+            on_left = above is not None and above._left is node
+            self._update_height(node)
+            self._update_size(node)
+            node = self._rebalance(node)
+            if above is None:
+                return node
+            if on_left:
+                above._left = node
+            else:
+                above._right = node
+            node = above
+
+    def _split(self, node, element):
+        """Split a subtree into (< element, node holding element or None, > element)."""
+        if node is None:
+            return None, None, None
+        left, right = node._left, node._right
+        if left is not None:
+            left._parent = None
+        if right is not None:
+            right._parent = None
+        if element == node._element:
+            node._left = node._right = node._parent = None
+            self._update_height(node)
+            self._update_size(node)
+            return left, node, right
+        if element < node._element:
+            smaller, match, larger = self._split(left, element)
+            return smaller, match, self._join(larger, node, right)
+        smaller, match, larger = self._split(right, element)
+        return self._join(left, node, smaller), match, larger
+
+    def _concat(self, left, right):
+        """Join two subtrees with every element of left < every element of right."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        _, pivot, rest = self._split(right, self._find_min(right)._element)
+        return self._join(left, pivot, rest)
+
     def _find_min(self, node):
         while node._left is not None:
             node = node._left
         return node
 
+    def _find_max(self, node):
+        while node._right is not None:
+            node = node._right
+        return node
+
     def _update_height(self, node):
         if node is not None:
             node._height = 1 + max(node.left_height(), node.right_height())
 
+    def _update_size(self, node):
+        if node is not None:
+            node._count = 1 + node.left_count() + node.right_count()
+
     def _get_balance(self, node):
         if node is None:
             return 0
@@ -162,7 +507,9 @@ class AVLTree():
         node._parent = new_root
         
         self._update_height(node)
+        self._update_size(node)
         self._update_height(new_root)
+        self._update_size(new_root)
         
         return new_root
 
@@ -178,29 +525,329 @@ class AVLTree():
         node._parent = new_root
         
         self._update_height(node)
+        self._update_size(node)
         self._update_height(new_root)
+        self._update_size(new_root)
         
         return new_root
 
+    def rank(self, element):
+        """Return the number of elements strictly less than element."""
+        return self._count_below(element, False)
+
+    def _count_below(self, element, inclusive):
+        count = 0
+        node = self._root
+        while node is not None:
+            if element < node._element or (not inclusive and element == node._element):
+                node = node._left
+            else:
+                count += 1 + (node._left._count if node._left is not None else 0)
+                node = node._right
+        return count
+
+    def select(self, k):
+        """Return the k-th smallest element (0-based)."""
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError("select index out of range")
+        node = self._root
+        while True:
+            left_count = node._left._count if node._left is not None else 0
+            if k < left_count:
+                node = node._left
+            elif k == left_count:
+                return node._element
+            else:
+                k -= left_count + 1
+                node = node._right
+
+    def count_range(self, min_val, max_val):
+        """Return the number of elements within [min_val, max_val]."""
+        if max_val < min_val:
+            return 0
+        return self._count_below(max_val, True) - self._count_below(min_val, False)
+
+    def median(self):
+        """Return the lower median, or None if the tree is empty."""
+        if self._size == 0:
+            return None
+        return self.select((self._size - 1) // 2)
+
+    def search_many(self, elements):
+        """Return the membership of every element in one pass over the tree.
+
+        See batch_ops.search_many. Returns a NumPy bool mask for array
+        input, otherwise a list.
+        """
+        return batch_ops.search_many(elements, self._root, _node_parts)
+
+    def insert_many(self, elements):
+        """Insert a batch of elements, returning how many were new.
+
+        Large batches are merged with the inorder stream and rebuilt in
+        linear time; small ones are inserted one by one in sorted order.
+        """
+        batch = batch_ops.sorted_unique(elements)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), self._size):
+            self._adopt(self.from_sorted(batch_ops.merge_unique(self.iter_inorder(), batch)))
+        else:
+            for element in batch:
+                self.insert(element)
+        return self._size - before
+
+    def delete_many(self, elements):
+        """Delete a batch of elements, returning how many were present."""
+        batch = batch_ops.sorted_unique(elements)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), self._size):
+            self._adopt(self.from_sorted(batch_ops.subtract_sorted(self.iter_inorder(), batch)))
+        else:
+            for element in batch:
+                self.delete(element)
+        return before - self._size
+
+    def _adopt(self, other):
+        """Take over the nodes of another tree of the same type."""
+        self._root = other._root
+        self._size = other._size
+
     def size(self):
         return self._size
 
+    def clear(self):
+        self._root = None
+        self._size = 0
+
     def is_empty(self):
         return self._size == 0
 
     def height(self):
-        return self._root._height if self._root else -1
+        return self._root._height - 1 if self._root else -1
 
     def inorder_traversal(self):
-        result = []
-        self._inorder_recursive(self._root, result)
-        return result
+        return list(self.iter_inorder())
 
-    def _inorder_recursive(self, node, result):
-        if node is not None:
-            self._inorder_recursive(node._left, result)
-            result.append(node._element)
-            self._inorder_recursive(node._right, result)
+    def iter_inorder(self):
+        """Lazily yield elements in sorted order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._right
+
+    def range_query(self, min_val, max_val):
+        """Return all elements within the range [min_val, max_val]."""
+        return list(self.iter_range(min_val, max_val))
+
+    def iter_range(self, min_val, max_val):
+        """Lazily yield elements within [min_val, max_val] in sorted order."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                # Only smaller elements live to the left, skip them if out of range
+                node = node._left if node._element > min_val else None
+            else:
+                node = stack.pop()
+                if node._element > max_val:
+                    return
+                if node._element >= min_val:
+                    yield node._element
+                node = node._right
+
+    def iter_reverse(self):
+        """Lazily yield elements in descending order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._right
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._left
+
+    def iter_preorder(self):
+        """Lazily yield elements in preorder (node, left, right)."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield node._element
+            if node._right is not None:
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+
+    def iter_postorder(self):
+        """Lazily yield elements in postorder (left, right, node)."""
+        stack = []
+        node = self._root
+        last = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                top = stack[-1]
+                if top._right is not None and top._right is not last:
+                    node = top._right
+                else:
+                    yield top._element
+                    last = stack.pop()
+
+    def iter_level_order(self, max_depth=None):
+        """Lazily yield elements breadth-first, down to max_depth if given."""
+        if self._root is None:
+            return
+        queue = deque([self._root])
+        depth = 0
+        while queue:
+            expand = max_depth is None or depth < max_depth
+            for _ in range(len(queue)):
+                node = queue.popleft()
+                yield node._element
+                if expand:
+                    if node._left is not None:
+                        queue.append(node._left)
+                    if node._right is not None:
+                        queue.append(node._right)
+            if not expand:
+                return
+            depth += 1
+
+    def iter_levels(self, max_depth=None):
+        """Lazily yield one list of elements per level, down to max_depth if given."""
+        level = [self._root] if self._root is not None else []
+        depth = 0
+        while level and (max_depth is None or depth <= max_depth):
+            yield [node._element for node in level]
+            next_level = []
+            for node in level:
+                if node._left is not None:
+                    next_level.append(node._left)
+                if node._right is not None:
+                    next_level.append(node._right)
+            level = next_level
+            depth += 1
+
+    def dump(self, path):
+        """Write the tree to a binary snapshot file (see tree_file)."""
+        tree_file.dump(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        """Load a snapshot written by dump(); mmap=True returns a read-only MappedTree.
+
+        Pickled keys load only with allow_pickle=True; see tree_file.load.
+        """
+        return tree_file.load(cls, path, mmap=mmap, allow_pickle=allow_pickle)
+
+    def _dump_columns(self):
+        heights = array('B')
+        heights.extend(self._inorder_heights())
+        return {b'DPTH': tree_file.compact_uints(self._inorder_depths()), b'HGHT': heights}
+
+    def _inorder_heights(self):
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                node = stack.pop()
+                yield node._height
+                node = node._right
+
+    def _inorder_depths(self):
+        """Yield the depth of every node in inorder."""
+        stack = []
+        node = self._root
+        depth = 0
+        while stack or node is not None:
+            if node is not None:
+                stack.append((node, depth))
+                node = node._left
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                yield depth
+                node = node._right
+                depth += 1
+
+    @classmethod
+    def _load_columns(cls, keys, columns):
+        depths = columns.get(b'DPTH')
+        heights = columns.get(b'HGHT')
+        if depths is None or heights is None or not len(keys) == len(depths) == len(heights):
+            return cls.from_sorted(keys)
+        tree = cls()
+        tree._root = tree._link_by_depth(keys, depths, heights)
+        tree._size = len(keys)
+        return tree
+
+    def _link_by_depth(self, keys, depths, heights):
+        """Rebuild the exact shape given by inorder elements, depths and heights in O(n).
+
+        The stack holds the right spine built so far. A node is complete once
+        a shallower node arrives, at which point its subtree size is known.
+        """
+        def finish(node):
+            self._update_size(node)
+            return node
+
+        stack = []
+        root = None
+        for element, depth, height in zip(keys, depths, heights):
+            node = self._Node(element)
+            node._height = height
+            child = None
+            while stack and stack[-1][1] > depth:
+                child = finish(stack.pop()[0])
+            node._left = child
+            if child is not None:
+                child._parent = node
+            if stack:
+                node._parent = stack[-1][0]
+                node._parent._right = node
+            else:
+                root = node
+            stack.append((node, depth))
+        while stack:
+            finish(stack.pop()[0])
+        return root
+
+    def memory_report(self, deep=False):
+        """Report node count, bytes per node, total bytes and bytes per key.
+
+        The nodes are walked iteratively. Keys are shared with the caller
+        and only measured with deep=True (see tree_memory).
+        """
+        nodes, node_bytes = tree_memory.walk(self._root, lambda node: (node._left, node._right))
+        return tree_memory.report(nodes, node_bytes, self._size, tree_memory.object_bytes(self),
+                                  self.iter_inorder() if deep else None)
+
+    def freeze(self):
+        """Return an immutable Eytzinger-ordered FrozenTree snapshot of the elements."""
+        return FrozenTree(self.iter_inorder())
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
 
     def display(self):
         self._display(self._root, 0)
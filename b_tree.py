@@ -0,0 +1,551 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+import sys
+
+from frozen_tree import FrozenTree
+import tree_file
+import tree_memory
+
+
+class BTree():
+    """B-tree of configurable order.
+
+    Every node has at most order children (order - 1 keys) and every node
+    but the root at least ceil(order / 2) children. Keys inside a node are
+    kept in a sorted list that is searched with bisect, so a larger order
+    trades a few C-level comparisons for far fewer Python-level node hops.
+    A 2-4 tree is the B-tree of order 4.
+    """
+
+    DEFAULT_ORDER = 64
+
+    class _Node:
+        """Lightweight, nonpublic class for storing a node."""
+        __slots__ = '_parent', '_keys', '_children'  # streamline memory usage
+
+        def __init__(self, parent=None, keys=None, children=None):
+            self._parent = parent
+            self._keys = keys if keys is not None else []
+            self._children = children if children is not None else []
+
+        def is_leaf(self):
+            """Check if this node is a leaf."""
+            return len(self._children) == 0
+
+        def find_child_index(self, key):
+            """Find the index of the child where key should be inserted."""
+            return bisect_right(self._keys, key)
+
+    def __init__(self, order=DEFAULT_ORDER):
+        """Create an initially empty B-tree whose nodes have at most order children."""
+        if order < 3:
+            raise ValueError("a B-tree needs an order of at least 3")
+        self._order = order
+        self._max_keys = order - 1
+        self._min_keys = (order + 1) // 2 - 1
+        self._root = None
+        self._size = 0
+
+    @property
+    def order(self):
+        """The maximum number of children per node."""
+        return self._order
+
+    @classmethod
+    def from_sorted(cls, iterable, order=None):
+        """Bulk load ascending elements into a packed B-tree in O(n).
+
+        Leaves are filled with order - 1 keys each and the tree is built
+        bottom up, one level at a time; only the last two nodes of a level
+        may be evened out to respect the minimum fill. The input may be a
+        one-shot iterator and is never copied into a list. Duplicate
+        elements are skipped.
+        """
+        tree = cls() if order is None else cls(order)
+        nodes, separators = tree._pack_leaves(iterable)
+        while len(nodes) > 1:
+            nodes, separators = tree._pack_level(nodes, separators)
+        if nodes:
+            tree._root = nodes[0]
+        return tree
+
+    def _pack_leaves(self, iterable):
+        """Group sorted elements into full leaves and the separators between them."""
+        leaves = []
+        separators = []
+        keys = []
+        previous = None
+        for element in iterable:
+            if self._size:
+                if element == previous:
+                    continue
+                if element < previous:
+                    raise ValueError("from_sorted requires elements in ascending order")
+            previous = element
+            self._size += 1
+            if len(keys) < self._max_keys:
+                keys.append(element)
+            else:
+                leaves.append(self._Node(keys=keys))
+                separators.append(element)
+                keys = []
+        if keys:
+            leaves.append(self._Node(keys=keys))
+        elif separators:
+            # The last element became a separator; give it back as a leaf
+            last = separators.pop()
+            full = leaves[-1]._keys
+            separators.append(full.pop())
+            leaves.append(self._Node(keys=[last]))
+        if len(leaves) > 1 and len(leaves[-1]._keys) < self._min_keys:
+            # Spread the keys of the last two leaves evenly around their separator
+            previous, last = leaves[-2], leaves[-1]
+            merged = previous._keys + [separators.pop()] + last._keys
+            half = len(merged) // 2
+            previous._keys = merged[:half]
+            separators.append(merged[half])
+            last._keys = merged[half + 1:]
+        return leaves, separators
+
+    def _pack_level(self, children, separators):
+        """Group one level under parents of order children, returning the next level up."""
+        order = self._order
+        parents = []
+        promoted = []
+        for start in range(0, len(children), order):
+            group = children[start:start + order]
+            if start:
+                promoted.append(separators[start - 1])
+            parents.append(self._Node(keys=separators[start:start + len(group) - 1], children=group))
+        if len(parents) > 1 and len(parents[-1]._children) <= self._min_keys:
+            # Too few children for a node; share the last two groups evenly
+            previous, last = parents[-2], parents[-1]
+            group = previous._children + last._children
+            keys = previous._keys + [promoted.pop()] + last._keys
+            half = len(group) // 2
+            previous._children, last._children = group[:half], group[half:]
+            previous._keys, last._keys = keys[:half - 1], keys[half:]
+            promoted.append(keys[half - 1])
+        for parent in parents:
+            for child in parent._children:
+                child._parent = parent
+        return parents, promoted
+
+    def search(self, element):
+        """Search for an element in the tree. Returns True if found, False otherwise."""
+        node = self._root
+        while node is not None:
+            keys = node._keys
+            i = bisect_left(keys, element)
+            if i < len(keys) and keys[i] == element:
+                return True
+            if not node._children:
+                return False
+            node = node._children[i]
+        return False
+
+    def insert(self, element):
+        """Insert an element into the tree."""
+        # If tree is empty, create root
+        if self._root is None:
+            self._root = self._Node(keys=[element])
+            self._size += 1
+            return
+
+        # Walk down to the leaf, giving up if the element already exists
+        node = self._root
+        while True:
+            keys = node._keys
+            i = bisect_left(keys, element)
+            if i < len(keys) and keys[i] == element:
+                return
+            if not node._children:
+                break
+            node = node._children[i]
+
+        keys.insert(i, element)
+        self._size += 1
+
+        # If leaf is overfull, split it
+        if len(keys) > self._max_keys:
+            self._split_node(node)
+
+    def _split_node(self, node):
+        """Split an overfull node around its middle key, moving up while parents overflow."""
+        while len(node._keys) > self._max_keys:
+            keys = node._keys
+            middle = (len(keys) - 1) // 2
+            middle_key = keys[middle]
+
+            # Create new right node
+            right_node = self._Node(parent=node._parent, keys=keys[middle + 1:])
+            node._keys = keys[:middle]
+
+            # Handle children if not leaf
+            if node._children:
+                right_node._children = node._children[middle + 1:]
+                node._children = node._children[:middle + 1]
+                for child in right_node._children:
+                    child._parent = right_node
+
+            # If this is root, create new root
+            parent = node._parent
+            if parent is None:
+                new_root = self._Node(keys=[middle_key], children=[node, right_node])
+                node._parent = new_root
+                right_node._parent = new_root
+                self._root = new_root
+                return
+
+            # Insert middle key and the right node into the parent
+            key_index = bisect_left(parent._keys, middle_key)
+            parent._keys.insert(key_index, middle_key)
+            parent._children.insert(key_index + 1, right_node)
+            node = parent
+
+    def delete(self, element):
+        """Delete an element from the tree."""
+        # Find the node containing the element
+        node = self._root
+        while node is not None:
+            keys = node._keys
+            key_index = bisect_left(keys, element)
+            if key_index < len(keys) and keys[key_index] == element:
+                break
+            node = node._children[key_index] if node._children else None
+        if node is None:
+            return False
+
+        self._size -= 1
+
+        if node._children:
+            # Element is in an internal node; replace it with its inorder
+            # predecessor (rightmost key in the left subtree)
+            leaf = node._children[key_index]
+            while leaf._children:
+                leaf = leaf._children[-1]
+            node._keys[key_index] = leaf._keys.pop()
+        else:
+            leaf = node
+            del leaf._keys[key_index]
+
+        if leaf is self._root:
+            if not leaf._keys:
+                self._root = None
+        elif len(leaf._keys) < self._min_keys:
+            self._fix_underflow(leaf)
+        return True
+
+    def _fix_underflow(self, node):
+        """Fix underflow when a node has fewer than the minimum number of keys."""
+        min_keys = self._min_keys
+        while True:
+            if node is self._root:
+                if not node._keys:
+                    # The root ran out of keys; its only child takes over
+                    self._root = node._children[0] if node._children else None
+                    if self._root is not None:
+                        self._root._parent = None
+                return
+
+            parent = node._parent
+            node_index = parent._children.index(node)
+
+            # Try to borrow from left sibling
+            if node_index > 0:
+                left_sibling = parent._children[node_index - 1]
+                if len(left_sibling._keys) > min_keys:
+                    node._keys.insert(0, parent._keys[node_index - 1])
+                    parent._keys[node_index - 1] = left_sibling._keys.pop()
+                    if left_sibling._children:
+                        borrowed_child = left_sibling._children.pop()
+                        borrowed_child._parent = node
+                        node._children.insert(0, borrowed_child)
+                    return
+
+            # Try to borrow from right sibling
+            if node_index < len(parent._children) - 1:
+                right_sibling = parent._children[node_index + 1]
+                if len(right_sibling._keys) > min_keys:
+                    node._keys.append(parent._keys[node_index])
+                    parent._keys[node_index] = right_sibling._keys.pop(0)
+                    if right_sibling._children:
+                        borrowed_child = right_sibling._children.pop(0)
+                        borrowed_child._parent = node
+                        node._children.append(borrowed_child)
+                    return
+
+            # Merge with a sibling: the right one of the pair is absorbed
+            if node_index > 0:
+                left, right = parent._children[node_index - 1], node
+                separator_index = node_index - 1
+            else:
+                left, right = node, parent._children[1]
+                separator_index = 0
+            left._keys.append(parent._keys.pop(separator_index))
+            left._keys.extend(right._keys)
+            for child in right._children:
+                child._parent = left
+            left._children.extend(right._children)
+            del parent._children[separator_index + 1]
+
+            # Check if parent needs fixing
+            if len(parent._keys) >= min_keys and parent is not self._root:
+                return
+            node = parent
+
+    def iter_inorder(self):
+        """Lazily yield keys in sorted order using O(height) memory."""
+        if self._root is None:
+            return
+        stack = []
+        node = self._root
+        while True:
+            # Descend to the leftmost leaf, remembering where to resume
+            while not node.is_leaf():
+                stack.append((node, 0))
+                node = node._children[0]
+            yield from node._keys
+            if not stack:
+                return
+            node, index = stack.pop()
+            yield node._keys[index]
+            if index + 1 < len(node._keys):
+                stack.append((node, index + 1))
+            node = node._children[index + 1]
+
+    def range_query(self, min_val, max_val):
+        """Return all keys within the range [min_val, max_val]."""
+        return list(self.iter_range(min_val, max_val))
+
+    def iter_range(self, min_val, max_val):
+        """Lazily yield keys within [min_val, max_val] in sorted order.
+
+        One bisecting descent finds the first key >= min_val; from there the
+        walk continues like iter_inorder until a key passes max_val.
+        """
+        if self._root is None:
+            return
+        stack = []
+        node = self._root
+        while True:
+            index = bisect_left(node._keys, min_val)
+            if node.is_leaf():
+                break
+            if index < len(node._keys):
+                stack.append((node, index))
+            node = node._children[index]
+        while True:
+            for key in node._keys[index:]:
+                if key > max_val:
+                    return
+                yield key
+            if not stack:
+                return
+            node, index = stack.pop()
+            key = node._keys[index]
+            if key > max_val:
+                return
+            yield key
+            if index + 1 < len(node._keys):
+                stack.append((node, index + 1))
+            node = node._children[index + 1]
+            while not node.is_leaf():
+                stack.append((node, 0))
+                node = node._children[0]
+            index = 0
+
+    def iter_reverse(self):
+        """Lazily yield keys in descending order using O(height) memory."""
+        if self._root is None:
+            return
+        stack = []
+        node = self._root
+        while True:
+            # Descend to the rightmost leaf, remembering where to resume
+            while not node.is_leaf():
+                index = len(node._keys)
+                stack.append((node, index))
+                node = node._children[index]
+            yield from reversed(node._keys)
+            if not stack:
+                return
+            node, index = stack.pop()
+            yield node._keys[index - 1]
+            if index > 1:
+                stack.append((node, index - 1))
+            node = node._children[index - 1]
+
+    def iter_preorder(self):
+        """Lazily yield keys in preorder (node keys, then each child)."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield from node._keys
+            stack.extend(reversed(node._children))
+
+    def iter_postorder(self):
+        """Lazily yield keys in postorder (each child, then node keys)."""
+        if self._root is None:
+            return
+        stack = [(self._root, 0)]
+        while stack:
+            node, index = stack[-1]
+            if index < len(node._children):
+                stack[-1] = (node, index + 1)
+                stack.append((node._children[index], 0))
+            else:
+                stack.pop()
+                yield from node._keys
+
+    def iter_level_order(self, max_depth=None):
+        """Lazily yield each node's keys as a tuple, breadth-first, down to max_depth if given."""
+        if self._root is None:
+            return
+        queue = deque([self._root])
+        depth = 0
+        while queue:
+            expand = max_depth is None or depth < max_depth
+            for _ in range(len(queue)):
+                node = queue.popleft()
+                yield tuple(node._keys)
+                if expand:
+                    queue.extend(node._children)
+            if not expand:
+                return
+            depth += 1
+
+    def iter_levels(self, max_depth=None):
+        """Lazily yield one list of node key tuples per level, down to max_depth if given."""
+        level = [self._root] if self._root is not None else []
+        depth = 0
+        while level and (max_depth is None or depth <= max_depth):
+            yield [tuple(node._keys) for node in level]
+            level = [child for node in level for child in node._children]
+            depth += 1
+
+    def dump(self, path):
+        """Write the tree to a binary snapshot file (see tree_file)."""
+        tree_file.dump(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        """Load a snapshot written by dump(); mmap=True returns a read-only MappedTree.
+
+        Pickled keys load only with allow_pickle=True; see tree_file.load.
+        """
+        return tree_file.load(cls, path, mmap=mmap, allow_pickle=allow_pickle)
+
+    def _dump_columns(self):
+        counts = [len(keys) for level in self.iter_levels() for keys in level]
+        return {b'NKEY': tree_file.compact_uints(counts), b'ORDR': tree_file.compact_uints([self._order])}
+
+    @classmethod
+    def _load_columns(cls, keys, columns):
+        """Rebuild the exact node layout from per-node key counts in BFS order."""
+        counts = columns.get(b'NKEY')
+        order = columns.get(b'ORDR')
+        order = order[0] if order else 4  # files written before the order was stored
+        if counts is None or sum(counts) != len(keys):
+            return cls.from_sorted(keys, order)
+        tree = cls(order)
+        tree._size = len(keys)
+        if not keys:
+            return tree
+        nodes = [tree._Node(keys=[None] * count) for count in counts]
+
+        # Every node of a level has children unless the level is the last
+        level = [nodes[0]]
+        index = 1
+        while index < len(nodes):
+            next_level = []
+            for node in level:
+                children = nodes[index:index + len(node._keys) + 1]
+                index += len(children)
+                node._children = children
+                for child in children:
+                    child._parent = node
+                next_level.extend(children)
+            level = next_level
+        tree._root = nodes[0]
+
+        # Hand out the sorted keys along an inorder walk of the empty slots
+        remaining = iter(keys)
+        stack = []
+        node = tree._root
+        while True:
+            while not node.is_leaf():
+                stack.append((node, 0))
+                node = node._children[0]
+            for i in range(len(node._keys)):
+                node._keys[i] = next(remaining)
+            if not stack:
+                return tree
+            node, index = stack.pop()
+            node._keys[index] = next(remaining)
+            if index + 1 < len(node._keys):
+                stack.append((node, index + 1))
+            node = node._children[index + 1]
+
+    def memory_report(self, deep=False):
+        """Report node count, bytes per node, total bytes and bytes per key.
+
+        A node's bytes include its _keys and _children lists (a leaf still
+        has an empty _children list). The nodes are walked iteratively;
+        keys are only measured with deep=True (see tree_memory).
+        """
+        def sizeof(node):
+            return sys.getsizeof(node) + sys.getsizeof(node._keys) + sys.getsizeof(node._children)
+
+        nodes, node_bytes = tree_memory.walk(self._root, lambda node: node._children, sizeof)
+        return tree_memory.report(nodes, node_bytes, self._size, tree_memory.object_bytes(self),
+                                  self.iter_inorder() if deep else None)
+
+    def freeze(self):
+        """Return an immutable Eytzinger-ordered FrozenTree snapshot of the keys."""
+        return FrozenTree(self.iter_inorder())
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, element):
+        return self.search(element)
+
+    def display(self):
+        """Display the tree structure."""
+        if self._root is None:
+            print("Tree is empty")
+        else:
+            self._display(self._root, 0)
+
+    def _display(self, node, depth):
+        """Recursive helper to display the tree structure."""
+        if node is None:
+            return
+
+        # Display current node
+        indent = "  " * depth
+        print(f"{indent}Keys: {node._keys}")
+
+        # Display children
+        if not node.is_leaf():
+            print(f"{indent}Children:")
+            for i, child in enumerate(node._children):
+                print(f"{indent}  Child {i}:")
+                self._display(child, depth + 2)
+
+    def size(self):
+        """Return the number of elements in the tree."""
+        return self._size
+
+    def is_empty(self):
+        """Check if the tree is empty."""
+        return self._size == 0
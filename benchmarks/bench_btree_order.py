@@ -0,0 +1,69 @@
+"""Sweep the order of BTree for int and str keys to find the fastest one.
+
+Each order runs random inserts, then searches for every key, then deletes
+every key. The best order is the one with the lowest total time.
+
+    python benchmarks/bench_btree_order.py [--size N] [--orders 4,8,...]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from b_tree import BTree
+
+ORDERS = (4, 8, 16, 32, 64, 128, 256)
+
+
+def measure(order, keys, probes):
+    start = time.perf_counter()
+    tree = BTree(order)
+    for key in keys:
+        tree.insert(key)
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in probes:
+        tree.search(key)
+    searched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in probes:
+        tree.delete(key)
+    deleted = time.perf_counter() - start
+    return inserted, searched, deleted
+
+
+def sweep(label, keys, orders):
+    probes = keys[:]
+    random.Random(7).shuffle(probes)
+    n = len(keys)
+    print(f"{label} keys, n={n:,} (ops/s)")
+    print(f"  {'order':>5} {'insert':>12} {'search':>12} {'delete':>12}")
+    best = None
+    for order in orders:
+        timings = measure(order, keys, probes)
+        print(f"  {order:>5}" + "".join(f" {n / elapsed:12,.0f}" for elapsed in timings))
+        if best is None or sum(timings) < best[1]:
+            best = order, sum(timings)
+    print(f"  best order: {best[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--orders", default=",".join(map(str, ORDERS)))
+    args = parser.parse_args()
+    orders = [int(order) for order in args.orders.split(",")]
+
+    keys = list(range(args.size))
+    random.Random(42).shuffle(keys)
+    sweep("int", keys, orders)
+    sweep("str", [f"key-{key:09d}" for key in keys], orders)
+
+
+if __name__ == "__main__":
+    main()
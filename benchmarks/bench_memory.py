@@ -0,0 +1,69 @@
+"""Measure bytes per key for the different tree layouts with tracemalloc.
+
+Keys are created before measuring starts, so the figures count only what the
+tree itself allocates (nodes, arrays, and unboxed keys for typed arrays).
+Each row also shows the bytes per key that the tree's own memory_report()
+estimates from sys.getsizeof, as a check of the report against what the
+allocator actually handed out during the inserts.
+
+    python benchmarks/bench_memory.py [--size N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from array_avl_tree import ArrayAVLTree
+from avl_tree_skeleton import AVLTree
+from b_tree import BTree
+from binary_tree import BinarySearchTree
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+from two_four_tree_skeleton import TwoFourTree
+
+
+def measure(label, factory, keys):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = factory()
+    for key in keys:
+        tree.insert(key)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = tree.size()
+    reported = tree.memory_report()['bytes_per_key']
+    print(f"  {label:<28} {current / n:8.1f} B/key   peak {peak / n:8.1f} B/key   "
+          f"report {reported:8.1f} B/key   {n / elapsed:10,.0f} inserts/s")
+    return current / n
+
+
+def run(n):
+    keys = list(range(n))
+    random.Random(42).shuffle(keys)
+    float_keys = [float(key) for key in keys]
+    print(f"Random insert of {n:,} keys")
+    measure("BinarySearchTree", BinarySearchTree, keys)
+    measure("AVLTree (objects)", AVLTree, keys)
+    measure("RedBlackTree", RedBlackTree, keys)
+    measure("SplayTree", SplayTree, keys)
+    measure("TwoFourTree", TwoFourTree, keys)
+    measure("BTree (order 64)", BTree, keys)
+    measure("ArrayAVLTree (list keys)", ArrayAVLTree, keys)
+    measure("ArrayAVLTree ('q' keys)", lambda: ArrayAVLTree('q'), keys)
+    measure("ArrayAVLTree ('d' keys)", lambda: ArrayAVLTree('d'), float_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Size the buffer pool of PagedBTree: hit ratio and page I/O per pool size.
+
+Builds a paged file of random int keys once, then reopens it with each pool
+size and runs the same random lookups, reporting lookups/s, the buffer pool
+hit ratio and pages read from the file.
+
+    python benchmarks/bench_paged_btree.py [--size N] [--page-size B] [--path FILE]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paged_btree import PagedBTree
+
+POOL_SIZES = (8, 32, 128, 512, 2048, 8192)
+
+
+def run(n, page_size, path):
+    keys = list(range(n))
+    random.Random(42).shuffle(keys)
+    start = time.perf_counter()
+    with PagedBTree(path, page_size=page_size, cache_pages=1024) as tree:
+        for key in keys:
+            tree.insert(key)
+        stats = tree.stats()
+        height = tree.height()
+    elapsed = time.perf_counter() - start
+    print(f"Built {n:,} keys in {stats['file_pages']:,} pages of {page_size} bytes "
+          f"(height {height}): {n / elapsed:,.0f} inserts/s, {stats['page_writes']:,} page writes")
+
+    rng = random.Random(7)
+    probes = [rng.randrange(n) for _ in range(min(n, 200_000))]
+    print(f"  {'pool':>6} {'lookups/s':>12} {'hit ratio':>10} {'page reads':>11}")
+    for pages in POOL_SIZES:
+        with PagedBTree(path, cache_pages=pages) as tree:
+            start = time.perf_counter()
+            for key in probes:
+                tree.search(key)
+            elapsed = time.perf_counter() - start
+            stats = tree.stats()
+        print(f"  {pages:>6} {len(probes) / elapsed:12,.0f} {stats['hit_ratio']:10.3f} "
+              f"{stats['page_reads']:11,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--path", help="file to build (default: a temporary file)")
+    args = parser.parse_args()
+    if args.path is not None:
+        if os.path.exists(args.path):
+            os.remove(args.path)
+        run(args.size, args.page_size, args.path)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.size, args.page_size, os.path.join(directory, "bench.btpg"))
+
+
+if __name__ == "__main__":
+    main()
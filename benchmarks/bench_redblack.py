@@ -0,0 +1,87 @@
+"""Measure memory per node and throughput of RedBlackTree.
+
+With --baseline REF the redblack_tree_skeleton.py of that git revision is
+loaded as well and measured on the same keys, for a side-by-side comparison
+(e.g. --baseline HEAD~1 before a change is committed).
+
+    python benchmarks/bench_redblack.py [--size N] [--baseline REF]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import redblack_tree_skeleton
+
+
+def load_revision(ref):
+    source = subprocess.run(["git", "show", f"{ref}:redblack_tree_skeleton.py"],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    module = types.ModuleType(f"redblack_tree_skeleton@{ref}")
+    exec(compile(source, module.__name__, "exec"), module.__dict__)
+    return module
+
+
+def rate(count, elapsed):
+    return f"{count / elapsed:12,.0f}"
+
+
+def measure(label, cls, keys):
+    # Memory is traced in a separate pass, since tracing slows allocation
+    tracemalloc.start()
+    tree = cls()
+    for key in keys:
+        tree.insert(key)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+
+    start = time.perf_counter()
+    tree = cls()
+    for key in keys:
+        tree.insert(key)
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        tree.search(key)
+    searched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        for key in keys:
+            tree.delete(key)
+        deleted = rate(len(keys), time.perf_counter() - start)
+    except Exception as error:  # older revisions may not survive deletes
+        deleted = f"{'failed':>12} ({type(error).__name__})"
+
+    print(f"  {label:<24} {current / len(keys):8.1f} B/node {rate(len(keys), inserted)} "
+          f"{rate(len(keys), searched)} {deleted}")
+
+
+def run(n, baseline):
+    keys = list(range(n))
+    random.Random(42).shuffle(keys)
+    print(f"Random workload of {n:,} int keys (ops/s: insert, search, delete)")
+    if baseline is not None:
+        measure(f"RedBlackTree @ {baseline}", load_revision(baseline).RedBlackTree, keys)
+    measure("RedBlackTree", redblack_tree_skeleton.RedBlackTree, keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--baseline", metavar="REF", help="git revision to compare against")
+    args = parser.parse_args()
+    run(args.size, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
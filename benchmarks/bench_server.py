@@ -0,0 +1,219 @@
+"""Load generator for tree_server: throughput and tail latency over local sockets.
+
+Starts a server in a child process (or uses a running one with --connect),
+preloads one tree with --preload even keys and then runs --clients
+coroutines sharing one TreeClient of --connections pipelined connections.
+Each coroutine sends requests back to back, drawn from --mix:
+
+    get     GET of a random key (MGET of --batch keys when --batch > 1)
+    put     PUT of a random odd key (MPUT)
+    del     DEL of a random key (MDEL)
+    range   RANGE of about --range-width / 2 keys, read to the end as it streams
+    rank    RANK of a random key (bst, avl and splay trees only)
+
+Latency is measured per request from send to last reply byte, so it
+includes queueing behind other pipelined requests. The report gives
+requests/s, keys/s and p50/p90/p99/p99.9/max latency per request kind in
+microseconds; --json writes it to a file.
+
+    python benchmarks/bench_server.py [--kind avl] [--clients 64] [--connections 4]
+        [--batch 1] [--mix get=80,put=10,del=5,range=5] [--duration 10] [--unix PATH]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tree_client import TreeClient
+import tree_server
+
+PERCENTILES = (50, 90, 99, 99.9)
+TREE = 'bench'
+PRELOAD_BATCH = 1_000  # keys per MPUT while preloading; keeps request lines short
+
+
+def run_server(host, port, unix):
+    server = tree_server.TreeServer()
+    try:
+        asyncio.run(tree_server.serve(server, host, port, unix))
+    except KeyboardInterrupt:
+        pass
+
+
+def free_port(host):
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+async def connect(args, attempts=100):
+    """Connect once the server accepts connections."""
+    for _ in range(attempts):
+        try:
+            return await TreeClient.connect(args.host, args.port, args.unix, size=args.connections)
+        except (ConnectionError, FileNotFoundError):
+            await asyncio.sleep(0.05)
+    raise SystemExit("the server did not come up")
+
+
+async def preload(client, args):
+    """Create and fill the tree, unless a running server already hosts it."""
+    if TREE in await client.trees():
+        return
+    await client.create(TREE, args.kind)
+    keys = list(range(0, 2 * args.preload, 2))
+    for start in range(0, len(keys), PRELOAD_BATCH):
+        await client.mput(TREE, keys[start:start + PRELOAD_BATCH])
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ('get', 'put', 'del', 'range', 'rank'):
+            raise SystemExit(f"unknown request kind {kind!r}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+async def worker(client, args, rng, deadline, latencies, counts):
+    kinds = list(args.mix)
+    weights = list(args.mix.values())
+    space = 2 * args.preload or 1
+    batch = args.batch
+    clock = time.perf_counter_ns
+    while clock() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        start = clock()
+        if kind == 'range':
+            low = rng.randrange(space)
+            keys = 0
+            async for chunk in client.range_chunks(TREE, low, low + args.range_width):
+                keys += len(chunk)
+        elif kind == 'rank':
+            await client.rank(TREE, rng.randrange(space))
+            keys = 1
+        elif batch == 1:
+            key = rng.randrange(space)
+            if kind == 'get':
+                await client.get(TREE, key)
+            elif kind == 'put':
+                await client.put(TREE, key | 1)
+            else:
+                await client.delete(TREE, key)
+            keys = 1
+        else:
+            sample = [rng.randrange(space) for _ in range(batch)]
+            if kind == 'get':
+                await client.mget(TREE, sample)
+            elif kind == 'put':
+                await client.mput(TREE, [key | 1 for key in sample])
+            else:
+                await client.mdel(TREE, sample)
+            keys = batch
+        latencies[kind].append(clock() - start)
+        counts[kind] += keys
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def load(args):
+    client = await connect(args)
+    try:
+        await preload(client, args)
+        latencies = {kind: [] for kind in args.mix}
+        counts = dict.fromkeys(args.mix, 0)
+        started = time.perf_counter_ns()
+        deadline = started + int(args.duration * 1e9)
+        await asyncio.gather(*(worker(client, args, random.Random(args.seed + i), deadline, latencies, counts)
+                               for i in range(args.clients)))
+        elapsed = (time.perf_counter_ns() - started) / 1e9
+    finally:
+        await client.close()
+    requests = sum(len(times) for times in latencies.values())
+    report = {
+        'kind': args.kind,
+        'clients': args.clients,
+        'connections': args.connections,
+        'batch': args.batch,
+        'transport': 'unix' if args.unix else 'tcp',
+        'seconds': elapsed,
+        'requests': requests,
+        'requests_per_sec': requests / elapsed,
+        'keys_per_sec': sum(counts.values()) / elapsed,
+        'latency_us': {},
+    }
+    for kind, times in latencies.items():
+        if not times:
+            continue
+        times.sort()
+        stats = {f"p{p:g}": percentile(times, p) / 1e3 for p in PERCENTILES}
+        stats['max'] = times[-1] / 1e3
+        stats['count'] = len(times)
+        report['latency_us'][kind] = stats
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", default="avl", choices=tree_server.KINDS)
+    parser.add_argument("--preload", type=int, default=100_000, help="keys loaded before the run")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent request loops")
+    parser.add_argument("--connections", type=int, default=4, help="connections in the client pool")
+    parser.add_argument("--batch", type=int, default=1, help="keys per GET/PUT/DEL; above 1 uses MGET/MPUT/MDEL")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("get=80,put=10,del=5,range=5"))
+    parser.add_argument("--range-width", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--unix", help="use a Unix socket at this path instead of TCP")
+    parser.add_argument("--connect", action="store_true",
+                        help="load a server that is already running instead of starting one")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+    if args.kind == 'bplus':
+        raise SystemExit("the load generator drives key-set trees; bplus needs values")
+    if 'rank' in args.mix and args.kind not in ('bst', 'avl', 'splay'):
+        raise SystemExit(f"{args.kind} trees do not keep ranks")
+
+    process = None
+    if not args.connect:
+        if args.unix is None and args.port is None:
+            args.port = free_port(args.host)
+        process = multiprocessing.Process(target=run_server, args=(args.host, args.port, args.unix), daemon=True)
+        process.start()
+    elif args.port is None:
+        args.port = tree_server.DEFAULT_PORT
+    try:
+        report = asyncio.run(load(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+            if args.unix and os.path.exists(args.unix):
+                os.remove(args.unix)
+
+    print(f"{report['kind']} over {report['transport']}, {args.clients} clients on {args.connections} "
+          f"connections, batch {args.batch}: {report['requests_per_sec']:,.0f} requests/s, "
+          f"{report['keys_per_sec']:,.0f} keys/s")
+    print(f"  {'request':<7} {'count':>9} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'max us':>9}")
+    for kind, stats in report['latency_us'].items():
+        print(f"  {kind:<7} {stats['count']:>9,} {stats['p50']:9.0f} {stats['p90']:9.0f} {stats['p99']:9.0f} "
+              f"{stats['p99.9']:9.0f} {stats['max']:9.0f}")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Per-access time of the SplayTree splaying engines and splay policies.
+
+Every configuration starts from the same balanced tree of n keys and replays
+the same access trace of searches; a second pass replays it as deletes and
+re-inserts. Splay policies only change searches, so the second pass shows
+what they cost once updates splay again. Traces are uniform, Zipf and
+sequential (keys in ascending order, wrapping around). Times are reported in
+microseconds per access.
+
+    python benchmarks/bench_splay.py [--size N] [--accesses M] [--zipf S]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from splay_tree_skeleton import SplayTree
+
+CONFIGS = [
+    ("bottom-up", {'engine': 'bottom_up'}),
+    ("top-down", {'engine': 'top_down'}),
+    ("semi", {'engine': 'bottom_up', 'splay_policy': 'semi'}),
+    ("depth>=16 bu", {'engine': 'bottom_up', 'splay_policy': 'depth', 'min_depth': 16}),
+    ("depth>=16 td", {'engine': 'top_down', 'splay_policy': 'depth', 'min_depth': 16}),
+    ("depth>=24 td", {'engine': 'top_down', 'splay_policy': 'depth', 'min_depth': 24}),
+    ("p=0.25 bu", {'engine': 'bottom_up', 'splay_policy': 'random', 'probability': 0.25}),
+    ("p=0.25 td", {'engine': 'top_down', 'splay_policy': 'random', 'probability': 0.25}),
+]
+
+
+def uniform_trace(n, m, rng):
+    return [rng.randrange(n) for _ in range(m)]
+
+
+def sequential_trace(n, m):
+    return [i % n for i in range(m)]
+
+
+def zipf_trace(n, m, rng, s):
+    """Keys drawn with probability proportional to 1 / rank**s; hot keys are scattered."""
+    weights = itertools.accumulate(1 / rank ** s for rank in range(1, n + 1))
+    keys = list(range(n))
+    rng.shuffle(keys)
+    return rng.choices(keys, cum_weights=list(weights), k=m)
+
+
+def replay(options, n, trace):
+    tree = SplayTree.from_sorted(range(n))
+    for name, value in options.items():
+        setattr(tree, name, value)
+    start = time.perf_counter()
+    for key in trace:
+        tree.search(key)
+    searched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in trace:
+        tree.delete(key)
+        tree.insert(key)
+    updated = time.perf_counter() - start
+    return searched, updated
+
+
+def run(n, m, s):
+    rng = random.Random(42)
+    traces = [
+        ("uniform", uniform_trace(n, m, rng)),
+        (f"zipf s={s}", zipf_trace(n, m, rng, s)),
+        ("sequential", sequential_trace(n, m)),
+    ]
+    print(f"n={n:,} keys, {m:,} accesses per trace (us per access)")
+    print(f"  {'trace':<12} {'config':<12} {'search':>8} {'del+ins':>8}")
+    for trace_name, trace in traces:
+        for label, options in CONFIGS:
+            searched, updated = replay(options, n, trace)
+            print(f"  {trace_name:<12} {label:<12} {searched / m * 1e6:8.2f} {updated / m * 1e6:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--accesses", type=int, default=200_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent s")
+    args = parser.parse_args()
+    run(args.size, args.accesses, args.zipf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Run every tree under the same workloads and compare against a saved baseline.
+
+Trees: BinarySearchTree, AVLTree, RedBlackTree, TwoFourTree and SplayTree.
+Workloads:
+
+    random    insert n shuffled keys into an empty tree, then search them
+    sorted    insert n keys in ascending order, then search them
+    reverse   insert n keys in descending order, then search them
+    zipf      search a preloaded tree with Zipf-skewed keys (hot keys scattered)
+    mixed     50% searches, 25% inserts, 25% deletes on a preloaded tree
+    range     90% range queries of about 100 keys, 10% inserts
+    delete    80% deletes of preloaded keys, 20% inserts
+
+Preloaded trees are bulk loaded with from_sorted and not timed. Every
+operation is timed on its own: ops/s is the operation count over the summed
+operation times, and latency percentiles are reported per operation kind in
+microseconds. Peak memory is traced with tracemalloc in a separate pass,
+since tracing slows allocation. A case that runs past --budget seconds is
+stopped and reported with status "timeout" (the plain BST on sorted input).
+
+    python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--json OUT]
+        [--baseline OLD.json] [--threshold 0.1]
+
+With --baseline the run is compared case by case against an earlier --json
+output; a case regresses when its ops/s falls, or its peak memory rises, by
+more than the threshold. The exit status is 1 if any case regressed.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from avl_tree_skeleton import AVLTree
+from binary_tree import BinarySearchTree
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+from two_four_tree_skeleton import TwoFourTree
+
+TREES = {
+    'bst': BinarySearchTree,
+    'avl': AVLTree,
+    'redblack': RedBlackTree,
+    'two_four': TwoFourTree,
+    'splay': SplayTree,
+}
+
+PERCENTILES = (50, 90, 99, 99.9)
+RANGE_WIDTH = 200  # preloaded keys are even, so a range holds about 100 of them
+
+
+def zipf_keys(keys, m, rng, s=1.1):
+    """Draw m of keys with probability proportional to 1 / rank**s; hot keys are scattered."""
+    keys = keys[:]
+    rng.shuffle(keys)
+    weights = itertools.accumulate(1 / rank ** s for rank in range(1, len(keys) + 1))
+    return rng.choices(keys, cum_weights=list(weights), k=m)
+
+
+def insertion_workload(order):
+    def workload(n, m, rng):
+        keys = list(range(n))
+        if order == 'random':
+            rng.shuffle(keys)
+        elif order == 'reverse':
+            keys.reverse()
+        probes = rng.sample(range(n), min(n, m))
+        return [], [('insert', key, None) for key in keys] + [('search', key, None) for key in probes]
+    return workload
+
+
+def zipf_workload(n, m, rng):
+    keys = list(range(0, 2 * n, 2))
+    return keys, [('search', key, None) for key in zipf_keys(keys, m, rng)]
+
+
+def mixed_workload(n, m, rng):
+    ops = []
+    for _ in range(m):
+        roll = rng.random()
+        key = rng.randrange(2 * n)
+        if roll < 0.5:
+            ops.append(('search', key, None))
+        elif roll < 0.75:
+            ops.append(('insert', key | 1, None))
+        else:
+            ops.append(('delete', key, None))
+    return list(range(0, 2 * n, 2)), ops
+
+
+def range_workload(n, m, rng):
+    ops = []
+    for _ in range(m):
+        key = rng.randrange(2 * n)
+        if rng.random() < 0.9:
+            ops.append(('range', key, key + RANGE_WIDTH))
+        else:
+            ops.append(('insert', key | 1, None))
+    return list(range(0, 2 * n, 2)), ops
+
+
+def delete_workload(n, m, rng):
+    keys = list(range(0, 2 * n, 2))
+    victims = rng.sample(keys, min(n, m))
+    ops = []
+    for key in victims:
+        ops.append(('delete', key, None))
+        if rng.random() < 0.25:
+            ops.append(('insert', rng.randrange(2 * n) | 1, None))
+    return keys, ops[:m]
+
+
+WORKLOADS = {
+    'random': insertion_workload('random'),
+    'sorted': insertion_workload('sorted'),
+    'reverse': insertion_workload('reverse'),
+    'zipf': zipf_workload,
+    'mixed': mixed_workload,
+    'range': range_workload,
+    'delete': delete_workload,
+}
+
+
+def replay(cls, preload, ops, budget):
+    """Run ops on a fresh tree; returns (latencies by kind in ns, finished)."""
+    tree = cls.from_sorted(preload)
+    methods = {
+        'insert': tree.insert,
+        'search': tree.search,
+        'delete': tree.delete,
+        'range': tree.range_query,
+    }
+    latencies = {kind: [] for kind in methods}
+    clock = time.perf_counter_ns
+    deadline = clock() + int(budget * 1e9)
+    for kind, key, high in ops:
+        call = methods[kind]
+        start = clock()
+        if high is None:
+            call(key)
+        else:
+            call(key, high)
+        end = clock()
+        latencies[kind].append(end - start)
+        if end > deadline:
+            return latencies, False
+    return latencies, True
+
+
+def peak_memory(cls, preload, ops, budget):
+    """Peak bytes allocated while bulk loading and replaying, keys excluded."""
+    tracemalloc.start()
+    try:
+        replay(cls, preload, ops, budget)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize(latencies):
+    total = sum(sum(times) for times in latencies.values())
+    count = sum(len(times) for times in latencies.values())
+    summary = {
+        'ops': count,
+        'seconds': total / 1e9,
+        'ops_per_sec': count / total * 1e9 if total else 0.0,
+        'latency_us': {},
+    }
+    for kind, times in latencies.items():
+        if not times:
+            continue
+        times.sort()
+        stats = {f"p{p:g}": percentile(times, p) / 1e3 for p in PERCENTILES}
+        stats['max'] = times[-1] / 1e3
+        stats['count'] = len(times)
+        summary['latency_us'][kind] = stats
+    return summary
+
+
+def run_case(tree_name, workload_name, n, args):
+    rng = random.Random(args.seed)
+    preload, ops = WORKLOADS[workload_name](n, min(n, args.ops), rng)
+    cls = TREES[tree_name]
+    best = None
+    for _ in range(args.repeat):
+        latencies, finished = replay(cls, preload, ops, args.budget)
+        summary = summarize(latencies)
+        summary['status'] = 'ok' if finished else 'timeout'
+        if not finished:
+            best = summary
+            break
+        if best is None or summary['ops_per_sec'] > best['ops_per_sec']:
+            best = summary
+    if args.memory and best['status'] == 'ok':
+        best['peak_bytes'] = peak_memory(cls, preload, ops, args.budget)
+    return dict(tree=tree_name, workload=workload_name, size=n, **best)
+
+
+def compare(results, baseline, threshold):
+    """Return (case, what, old, new) for every case that regressed against baseline."""
+    previous = {(case['tree'], case['workload'], case['size']): case for case in baseline['results']}
+    regressions = []
+    for case in results:
+        key = (case['tree'], case['workload'], case['size'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        if old['status'] == 'ok' and case['status'] != 'ok':
+            regressions.append((key, 'status', old['status'], case['status']))
+            continue
+        if case['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+            regressions.append((key, 'ops/s', old['ops_per_sec'], case['ops_per_sec']))
+        if 'peak_bytes' in case and 'peak_bytes' in old and \
+                case['peak_bytes'] > old['peak_bytes'] * (1 + threshold):
+            regressions.append((key, 'peak bytes', old['peak_bytes'], case['peak_bytes']))
+    return regressions
+
+
+def parse_list(text, choices):
+    names = text.split(",")
+    for name in names:
+        if name not in choices:
+            raise SystemExit(f"unknown name {name!r}; choose from {', '.join(choices)}")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trees", default=",".join(TREES))
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated tree sizes, up to 10000000")
+    parser.add_argument("--ops", type=int, default=1_000_000,
+                        help="operations per case beyond the inserts (at most the size)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument("--budget", type=float, default=60.0, help="seconds before a case is stopped")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results of an earlier --json run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change that counts as a regression")
+    args = parser.parse_args()
+    trees = parse_list(args.trees, TREES)
+    workloads = parse_list(args.workloads, WORKLOADS)
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+
+    results = []
+    print(f"  {'tree':<9} {'workload':<8} {'size':>10} {'ops/s':>12} {'p50 us':>8} "
+          f"{'p99 us':>8} {'peak MB':>8}  status")
+    for n in sizes:
+        for workload_name in workloads:
+            for tree_name in trees:
+                case = run_case(tree_name, workload_name, n, args)
+                results.append(case)
+                # The headline latency is that of the workload's most common operation
+                common = max(case['latency_us'].values(), key=lambda stats: stats['count'])
+                peak = f"{case['peak_bytes'] / 2**20:8.1f}" if 'peak_bytes' in case else f"{'-':>8}"
+                print(f"  {tree_name:<9} {workload_name:<8} {n:>10,} {case['ops_per_sec']:12,.0f} "
+                      f"{common['p50']:8.2f} {common['p99']:8.2f} {peak}  {case['status']}", flush=True)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if not regressions:
+            print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+            return
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for (tree_name, workload_name, n), what, old, new in regressions:
+            if what == 'status':
+                print(f"  {tree_name}/{workload_name}/{n}: {old} -> {new}")
+            else:
+                print(f"  {tree_name}/{workload_name}/{n}: {what} {old:,.0f} -> {new:,.0f} "
+                      f"({(new - old) / old:+.1%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Traverse degenerate (chain-shaped) trees built from sorted keys.
+
+Sorted ingest turns the unbalanced BinarySearchTree and the SplayTree into
+chains.  This script builds such chains and times every whole-tree walk to
+show that none of them depend on the interpreter's recursion limit.
+
+    python benchmarks/bench_traversal.py [--size N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binary_tree import BinarySearchTree
+from splay_tree_skeleton import SplayTree
+
+
+def build_bst_chain(n):
+    """Link n ascending keys into a right-leaning chain.
+
+    Repeated insert() would do the same thing in O(n^2) time, so the nodes are
+    linked directly to keep setup time out of the measurement.
+    """
+    tree = BinarySearchTree()
+    previous = None
+    for key in range(n):
+        node = tree._Node(key, parent=previous)
+        if previous is None:
+            tree._root = node
+        else:
+            previous._right = node
+        previous = node
+    tree._size = n
+    return tree
+
+
+def build_splay_chain(n):
+    """Insert ascending keys; each one is splayed above the previous root."""
+    tree = SplayTree()
+    for key in range(n):
+        tree.insert(key)
+    return tree
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed:8.3f} s")
+    return result
+
+
+def run(n):
+    print(f"BinarySearchTree chain, n={n:,}")
+    bst = timed("build", lambda: build_bst_chain(n))
+    assert timed("height", bst.height) == n - 1
+    assert len(timed("inorder_traversal", bst.inorder_traversal)) == n
+    assert len(timed("preorder_traversal", bst.preorder_traversal)) == n
+    assert len(timed("postorder_traversal", bst.postorder_traversal)) == n
+    assert timed("validate_bst", bst.validate_bst)
+    assert len(timed("range_query (middle)", lambda: bst.range_query(n // 4, n // 2))) == n // 4 + 1
+
+    print(f"SplayTree chain, n={n:,}")
+    splay = timed("build (sorted insert)", lambda: build_splay_chain(n))
+    assert timed("height", splay.height) == n - 1
+    assert len(timed("inorder_traversal", splay.inorder_traversal)) == n
+    assert len(timed("preorder_traversal", splay.preorder_traversal)) == n
+    assert timed("_count_nodes", lambda: splay._count_nodes(splay._root)) == n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10**6)
+    args = parser.parse_args()
+    run(args.size)
+
+
+if __name__ == "__main__":
+    main()
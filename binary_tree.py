@@ -1,19 +1,49 @@
+from collections import deque
+from operator import attrgetter
+
+import batch_ops
+from frozen_tree import FrozenTree
+import sorted_build
+import tree_file
+import tree_memory
+
+_node_parts = attrgetter('_element', '_left', '_right')
+
+
 class BinarySearchTree():
     class _Node:
         """Lightweight, nonpublic class for storing a node."""
-        __slots__ = '_element', '_parent', '_left', '_right' # streamline memory usage
+        __slots__ = '_element', '_parent', '_left', '_right', '_count' # streamline memory usage
 
         def __init__(self, element, parent=None, left=None, right=None):
             self._element = element
             self._parent = parent
             self._left = left
             self._right = right
+            self._count = 1  # number of nodes in this subtree
 
     def __init__(self):
         """Create an initially empty binary search tree."""
         self._root = None
         self._size = 0
 
+    @classmethod
+    def from_sorted(cls, iterable):
+        """Build a perfectly balanced tree from ascending elements in O(n).
+
+        The input may be a one-shot iterator; it is consumed once and never
+        copied into a list. Duplicate elements are skipped, like insert().
+        """
+        tree = cls()
+        head, count = sorted_build.link_sorted(iterable, cls._Node)
+        tree._root = sorted_build.build_balanced(head, count, tree._set_count)
+        tree._size = count
+        return tree
+
+    @staticmethod
+    def _set_count(node, size):
+        node._count = size
+
     def search(self, element):
         node = self._root
         while node is not None:
@@ -39,18 +69,18 @@ class BinarySearchTree():
             if element < node._element:
                 if node._left is None:
                     node._left = self._Node(element, parent=node)
-                    self._size += 1
                     break
                 node = node._left
             elif element > node._element:
                 if node._right is None:
                     node._right = self._Node(element, parent=node)
-                    self._size += 1
                     break
                 node = node._right
             else:
                 # Element already exists, don't insert duplicate
-                break
+                return
+        self._size += 1
+        self._adjust_counts(node, 1)
 
     def delete(self, element):
         node = self.search(element)
@@ -76,8 +106,15 @@ class BinarySearchTree():
             node._parent._right = child
 
         self._size -= 1
+        self._adjust_counts(node._parent, -1)
         return True
 
+    def _adjust_counts(self, node, delta):
+        """Add delta to the subtree size of node and all its ancestors."""
+        while node is not None:
+            node._count += delta
+            node = node._parent
+
     def _find_successor(self, current_node):
         return self._go_left(current_node._right)
 
@@ -104,6 +141,140 @@ class BinarySearchTree():
             return None
         return self._go_right(self._root)._element
 
+    def rank(self, element):
+        """Return the number of elements strictly less than element."""
+        return self._count_below(element, False)
+
+    def _count_below(self, element, inclusive):
+        count = 0
+        node = self._root
+        while node is not None:
+            if element < node._element or (not inclusive and element == node._element):
+                node = node._left
+            else:
+                count += 1 + (node._left._count if node._left is not None else 0)
+                node = node._right
+        return count
+
+    def select(self, k):
+        """Return the k-th smallest element (0-based)."""
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError("select index out of range")
+        node = self._root
+        while True:
+            left_count = node._left._count if node._left is not None else 0
+            if k < left_count:
+                node = node._left
+            elif k == left_count:
+                return node._element
+            else:
+                k -= left_count + 1
+                node = node._right
+
+    def count_range(self, min_val, max_val):
+        """Return the number of elements within [min_val, max_val]."""
+        if max_val < min_val:
+            return 0
+        return self._count_below(max_val, True) - self._count_below(min_val, False)
+
+    def median(self):
+        """Return the lower median, or None if the tree is empty."""
+        if self._size == 0:
+            return None
+        return self.select((self._size - 1) // 2)
+
+    def search_many(self, elements):
+        """Return the membership of every element in one pass over the tree.
+
+        See batch_ops.search_many. Returns a NumPy bool mask for array
+        input, otherwise a list.
+        """
+        return batch_ops.search_many(elements, self._root, _node_parts)
+
+    def insert_many(self, elements):
+        """Insert a batch of elements, returning how many were new.
+
+        Large batches are merged with the inorder stream and rebuilt in
+        linear time; small ones are inserted one by one in sorted order.
+        """
+        batch = batch_ops.sorted_unique(elements)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), self._size):
+            self._adopt(self.from_sorted(batch_ops.merge_unique(self.iter_inorder(), batch)))
+        else:
+            for element in batch:
+                self.insert(element)
+        return self._size - before
+
+    def delete_many(self, elements):
+        """Delete a batch of elements, returning how many were present."""
+        batch = batch_ops.sorted_unique(elements)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), self._size):
+            self._adopt(self.from_sorted(batch_ops.subtract_sorted(self.iter_inorder(), batch)))
+        else:
+            for element in batch:
+                self.delete(element)
+        return before - self._size
+
+    def union(self, other):
+        """Return a new tree of the elements in this tree or other.
+
+        other may be any tree or iterable that yields ascending elements;
+        repeats are skipped and an element out of order raises ValueError,
+        here and in every other set operation, in-place forms included.
+        The two inorder streams are merged and the result bulk loaded,
+        O(n + m) in all.
+        """
+        return self.from_sorted(batch_ops.merge_unique(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    def intersection(self, other):
+        """Return a new tree of the elements in both this tree and other."""
+        return self.from_sorted(batch_ops.intersect_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    def difference(self, other):
+        """Return a new tree of the elements in this tree but not in other."""
+        return self.from_sorted(batch_ops.subtract_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    def symmetric_difference(self, other):
+        """Return a new tree of the elements in exactly one of this tree and other."""
+        return self.from_sorted(batch_ops.symmetric_difference_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __xor__(self, other):
+        return self.symmetric_difference(other)
+
+    def __ior__(self, other):
+        self.insert_many(list(batch_ops.ascending(other)))
+        return self
+
+    def __iand__(self, other):
+        self._adopt(self.intersection(other))
+        return self
+
+    def __isub__(self, other):
+        self.delete_many(list(batch_ops.ascending(other)))
+        return self
+
+    def __ixor__(self, other):
+        self._adopt(self.symmetric_difference(other))
+        return self
+
+    def _adopt(self, other):
+        """Take over the nodes of another tree of the same type."""
+        self._root = other._root
+        self._size = other._size
+
     def size(self):
         return self._size
 
@@ -111,100 +282,154 @@ class BinarySearchTree():
         return self._size == 0
 
     def height(self):
-        return self._height_recursive(self._root)
-
-    def _height_recursive(self, node):
-        if node is None:
+        if self._root is None:
             return -1
-        return 1 + max(self._height_recursive(node._left), 
-                      self._height_recursive(node._right))
+        best = 0
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > best:
+                best = depth
+            if node._left is not None:
+                stack.append((node._left, depth + 1))
+            if node._right is not None:
+                stack.append((node._right, depth + 1))
+        return best
 
     def inorder_traversal(self):
-        result = []
-        self._inorder_recursive(self._root, result)
-        return result
-
-    def _inorder_recursive(self, node, result):
-        if node is not None:
-            self._inorder_recursive(node._left, result)
-            result.append(node._element)
-            self._inorder_recursive(node._right, result)
+        return list(self.iter_inorder())
 
     def preorder_traversal(self):
-        result = []
-        self._preorder_recursive(self._root, result)
-        return result
-
-    def _preorder_recursive(self, node, result):
-        if node is not None:
-            result.append(node._element)
-            self._preorder_recursive(node._left, result)
-            self._preorder_recursive(node._right, result)
+        return list(self.iter_preorder())
 
     def postorder_traversal(self):
-        result = []
-        self._postorder_recursive(self._root, result)
-        return result
+        return list(self.iter_postorder())
 
-    def _postorder_recursive(self, node, result):
-        if node is not None:
-            self._postorder_recursive(node._left, result)
-            self._postorder_recursive(node._right, result)
-            result.append(node._element)
+    def iter_inorder(self):
+        """Lazily yield elements in sorted order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._right
+
+    def iter_reverse(self):
+        """Lazily yield elements in descending order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._right
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._left
+
+    def iter_preorder(self):
+        """Lazily yield elements in preorder (node, left, right)."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield node._element
+            if node._right is not None:
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+
+    def iter_postorder(self):
+        """Lazily yield elements in postorder (left, right, node)."""
+        stack = []
+        node = self._root
+        last = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                top = stack[-1]
+                if top._right is not None and top._right is not last:
+                    node = top._right
+                else:
+                    yield top._element
+                    last = stack.pop()
 
     def level_order_traversal(self):
         """breadth-first."""
+        return list(self.iter_level_order())
+
+    def iter_level_order(self, max_depth=None):
+        """Lazily yield elements breadth-first, down to max_depth if given."""
         if self._root is None:
-            return []
-        
-        result = []
-        queue = [self._root]
-        
+            return
+        queue = deque([self._root])
+        depth = 0
         while queue:
-            node = queue.pop(0)
-            result.append(node._element)
-            
-            if node._left:
-                queue.append(node._left)
-            if node._right:
-                queue.append(node._right)
-        
-        return result
+            expand = max_depth is None or depth < max_depth
+            for _ in range(len(queue)):
+                node = queue.popleft()
+                yield node._element
+                if expand:
+                    if node._left is not None:
+                        queue.append(node._left)
+                    if node._right is not None:
+                        queue.append(node._right)
+            if not expand:
+                return
+            depth += 1
+
+    def iter_levels(self, max_depth=None):
+        """Lazily yield one list of elements per level, down to max_depth if given."""
+        level = [self._root] if self._root is not None else []
+        depth = 0
+        while level and (max_depth is None or depth <= max_depth):
+            yield [node._element for node in level]
+            next_level = []
+            for node in level:
+                if node._left is not None:
+                    next_level.append(node._left)
+                if node._right is not None:
+                    next_level.append(node._right)
+            level = next_level
+            depth += 1
 
     def range_query(self, min_val, max_val):
         """Return all elements in the BST within the range [min_val, max_val]."""
-        result = []
-        self._range_query_recursive(self._root, min_val, max_val, result)
-        return result
+        return list(self.iter_range(min_val, max_val))
 
-    def _range_query_recursive(self, node, min_val, max_val, result):
-        if node is None:
-            return
-        
-        # If current node is greater than min_val, explore left subtree
-        if node._element > min_val:
-            self._range_query_recursive(node._left, min_val, max_val, result)
-        
-        # If current node is within range, add it
-        if min_val <= node._element <= max_val:
-            result.append(node._element)
-        
-        # If current node is less than max_val, explore right subtree
-        if node._element < max_val:
-            self._range_query_recursive(node._right, min_val, max_val, result)
+    def iter_range(self, min_val, max_val):
+        """Lazily yield elements within [min_val, max_val] in sorted order."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                # Only smaller elements live to the left, skip them if out of range
+                node = node._left if node._element > min_val else None
+            else:
+                node = stack.pop()
+                if node._element > max_val:
+                    return
+                if node._element >= min_val:
+                    yield node._element
+                node = node._right
 
     def validate_bst(self):
-        return self._validate_bst_recursive(self._root, float('-inf'), float('inf'))
-
-    def _validate_bst_recursive(self, node, min_val, max_val):
-        if node is None:
-            return True
-        
-        if node._element <= min_val or node._element >= max_val:
-            return False
-        
-        return (self._validate_bst_recursive(node._left, min_val, node._element) and
-                self._validate_bst_recursive(node._right, node._element, max_val))
+        previous = None
+        first = True
+        for element in self.iter_inorder():
+            if not first and element <= previous:
+                return False
+            previous = element
+            first = False
+        return True
 
     def clear(self):
         self._root = None
@@ -220,17 +445,21 @@ class BinarySearchTree():
         self._display(self._root, 0)
 
     def _display(self, node, depth):
-        if node == None:
-            return
-
-        if node._right != None:
-            self._display(node._right, depth+1)
-        label = ''
-        if node == self._root:
-            label += '  <- root'
-        print(f'{"    "*depth}* {node._element}{label}')
-        if node._left != None:
-            self._display(node._left, depth+1)
+        # Reverse inorder walk with an explicit stack so chains don't recurse
+        stack = []
+        while stack or node is not None:
+            if node is not None:
+                stack.append((node, depth))
+                node = node._right
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                label = ''
+                if node == self._root:
+                    label += '  <- root'
+                print(f'{"    "*depth}* {node._element}{label}')
+                node = node._left
+                depth += 1
 
     def __len__(self):
         return self._size
@@ -238,8 +467,97 @@ class BinarySearchTree():
     def __contains__(self, element):
         return self.contains(element)
 
+    def dump(self, path):
+        """Write the tree to a binary snapshot file (see tree_file)."""
+        tree_file.dump(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        """Load a snapshot written by dump(); mmap=True returns a read-only MappedTree.
+
+        Pickled keys load only with allow_pickle=True; see tree_file.load.
+        """
+        return tree_file.load(cls, path, mmap=mmap, allow_pickle=allow_pickle)
+
+    def _dump_columns(self):
+        return {b'DPTH': tree_file.compact_uints(self._inorder_depths())}
+
+    def _inorder_depths(self):
+        """Yield the depth of every node in inorder."""
+        stack = []
+        node = self._root
+        depth = 0
+        while stack or node is not None:
+            if node is not None:
+                stack.append((node, depth))
+                node = node._left
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                yield depth
+                node = node._right
+                depth += 1
+
+    @classmethod
+    def _load_columns(cls, keys, columns):
+        depths = columns.get(b'DPTH')
+        if depths is None or len(depths) != len(keys):
+            return cls.from_sorted(keys)
+        tree = cls()
+        tree._root = tree._link_by_depth(keys, depths)
+        tree._size = len(keys)
+        return tree
+
+    def _link_by_depth(self, keys, depths):
+        """Rebuild the exact shape given by inorder elements and node depths in O(n).
+
+        The stack holds the right spine built so far. A node is complete once
+        a shallower node arrives, at which point its subtree size is known.
+        """
+        def finish(node):
+            node._count = (1 + (node._left._count if node._left is not None else 0)
+                           + (node._right._count if node._right is not None else 0))
+            return node
+
+        stack = []
+        root = None
+        for element, depth in zip(keys, depths):
+            node = self._Node(element)
+            child = None
+            while stack and stack[-1][1] > depth:
+                child = finish(stack.pop()[0])
+            node._left = child
+            if child is not None:
+                child._parent = node
+            if stack:
+                node._parent = stack[-1][0]
+                node._parent._right = node
+            else:
+                root = node
+            stack.append((node, depth))
+        while stack:
+            finish(stack.pop()[0])
+        return root
+
+    def memory_report(self, deep=False):
+        """Report node count, bytes per node, total bytes and bytes per key.
+
+        The nodes are walked iteratively. Keys are shared with the caller
+        and only measured with deep=True (see tree_memory).
+        """
+        nodes, node_bytes = tree_memory.walk(self._root, lambda node: (node._left, node._right))
+        return tree_memory.report(nodes, node_bytes, self._size, tree_memory.object_bytes(self),
+                                  self.iter_inorder() if deep else None)
+
+    def freeze(self):
+        """Return an immutable Eytzinger-ordered FrozenTree snapshot of the elements."""
+        return FrozenTree(self.iter_inorder())
+
     def __iter__(self):
-        return iter(self.inorder_traversal())
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
 
     def __str__(self):
         if self.is_empty():
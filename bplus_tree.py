@@ -0,0 +1,468 @@
+from bisect import bisect_left, bisect_right
+import itertools
+import sys
+
+from frozen_tree import FrozenTree
+import tree_memory
+
+
+class BPlusTree():
+    """B+ tree mapping keys to values, with doubly-linked leaves.
+
+    Keys and their values live only in the leaves; internal nodes hold
+    separator keys for routing, where a separator is <= every key of the
+    subtree to its right. The leaves are chained in key order through
+    _prev/_next, so a range scan is one O(log n) descent followed by a
+    sequential walk along the leaf list, in either direction.
+    """
+
+    DEFAULT_ORDER = 64
+
+    class _Leaf:
+        """Lightweight, nonpublic class for storing a leaf."""
+        __slots__ = '_parent', '_keys', '_values', '_prev', '_next'  # streamline memory usage
+
+        def __init__(self, keys=None, values=None):
+            self._parent = None
+            self._keys = keys if keys is not None else []
+            self._values = values if values is not None else []
+            self._prev = None
+            self._next = None
+
+    class _Internal:
+        """Lightweight, nonpublic class for storing an internal node."""
+        __slots__ = '_parent', '_keys', '_children'  # streamline memory usage
+
+        def __init__(self, keys=None, children=None):
+            self._parent = None
+            self._keys = keys if keys is not None else []
+            self._children = children if children is not None else []
+
+    def __init__(self, order=DEFAULT_ORDER):
+        """Create an initially empty tree; nodes hold at most order - 1 keys."""
+        if order < 3:
+            raise ValueError("a B+ tree needs an order of at least 3")
+        self._order = order
+        self._max_keys = order - 1
+        self._min_leaf_keys = self._max_keys // 2
+        self._min_keys = (order + 1) // 2 - 1
+        self._root = self._Leaf()
+        self._size = 0
+
+    @property
+    def order(self):
+        """The maximum number of children per internal node."""
+        return self._order
+
+    @classmethod
+    def from_sorted(cls, iterable, order=None):
+        """Bulk load ascending keys (each mapped to None) in O(n)."""
+        return cls.from_items(((key, None) for key in iterable), order)
+
+    @classmethod
+    def from_items(cls, items, order=None):
+        """Bulk load (key, value) pairs in ascending key order in O(n).
+
+        Leaves are filled to capacity and linked as they are made, then the
+        internal levels are built bottom up. For a repeated key the last
+        value wins.
+        """
+        tree = cls() if order is None else cls(order)
+        leaves = tree._pack_leaves(items)
+        if not leaves:
+            return tree
+        nodes, separators = leaves, [leaf._keys[0] for leaf in leaves[1:]]
+        while len(nodes) > 1:
+            nodes, separators = tree._pack_level(nodes, separators)
+        tree._root = nodes[0]
+        return tree
+
+    def _pack_leaves(self, items):
+        """Group sorted pairs into full, linked leaves."""
+        leaves = []
+        leaf = None
+        for key, value in items:
+            if leaf is not None and leaf._keys:
+                previous = leaf._keys[-1]
+                if key == previous:
+                    leaf._values[-1] = value
+                    continue
+                if key < previous:
+                    raise ValueError("from_items requires keys in ascending order")
+            if leaf is None or len(leaf._keys) == self._max_keys:
+                new_leaf = self._Leaf()
+                if leaf is not None:
+                    leaf._next = new_leaf
+                    new_leaf._prev = leaf
+                leaf = new_leaf
+                leaves.append(leaf)
+            leaf._keys.append(key)
+            leaf._values.append(value)
+            self._size += 1
+        if len(leaves) > 1 and len(leaves[-1]._keys) < self._min_leaf_keys:
+            # Spread the keys of the last two leaves evenly
+            previous, last = leaves[-2], leaves[-1]
+            keys = previous._keys + last._keys
+            values = previous._values + last._values
+            half = len(keys) // 2
+            previous._keys, last._keys = keys[:half], keys[half:]
+            previous._values, last._values = values[:half], values[half:]
+        return leaves
+
+    def _pack_level(self, children, separators):
+        """Group one level under parents of order children, returning the next level up."""
+        order = self._order
+        parents = []
+        promoted = []
+        for start in range(0, len(children), order):
+            group = children[start:start + order]
+            if start:
+                promoted.append(separators[start - 1])
+            parents.append(self._Internal(keys=separators[start:start + len(group) - 1], children=group))
+        if len(parents) > 1 and len(parents[-1]._children) <= self._min_keys:
+            # Too few children for a node; share the last two groups evenly
+            previous, last = parents[-2], parents[-1]
+            group = previous._children + last._children
+            keys = previous._keys + [promoted.pop()] + last._keys
+            half = len(group) // 2
+            previous._children, last._children = group[:half], group[half:]
+            previous._keys, last._keys = keys[:half - 1], keys[half:]
+            promoted.append(keys[half - 1])
+        for parent in parents:
+            for child in parent._children:
+                child._parent = parent
+        return parents, promoted
+
+    def _find_leaf(self, key):
+        """Descend to the leaf whose key range covers key."""
+        node = self._root
+        leaf_type = self._Leaf
+        while type(node) is not leaf_type:
+            node = node._children[bisect_right(node._keys, key)]
+        return node
+
+    def get(self, key, default=None):
+        """Return the value stored for key, or default if key is absent."""
+        leaf = self._find_leaf(key)
+        keys = leaf._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return leaf._values[i]
+        return default
+
+    def search(self, key):
+        """Return True if key is in the tree."""
+        keys = self._find_leaf(key)._keys
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def insert(self, key, value=None):
+        """Map key to value, replacing the value if key is already present."""
+        leaf = self._find_leaf(key)
+        keys = leaf._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            leaf._values[i] = value
+            return
+        keys.insert(i, key)
+        leaf._values.insert(i, value)
+        self._size += 1
+        if len(keys) > self._max_keys:
+            self._split_leaf(leaf)
+
+    def _split_leaf(self, leaf):
+        """Move the upper half of an overfull leaf into a new right neighbour."""
+        middle = len(leaf._keys) // 2
+        right = self._Leaf(leaf._keys[middle:], leaf._values[middle:])
+        del leaf._keys[middle:]
+        del leaf._values[middle:]
+        right._next = leaf._next
+        if right._next is not None:
+            right._next._prev = right
+        right._prev = leaf
+        leaf._next = right
+        self._insert_in_parent(leaf, right._keys[0], right)
+
+    def _insert_in_parent(self, node, separator, right):
+        """Hang right next to node under separator, splitting parents that overflow."""
+        while True:
+            parent = node._parent
+            if parent is None:
+                self._root = self._Internal(keys=[separator], children=[node, right])
+                node._parent = right._parent = self._root
+                return
+            right._parent = parent
+            index = bisect_right(parent._keys, separator)
+            parent._keys.insert(index, separator)
+            parent._children.insert(index + 1, right)
+            if len(parent._keys) <= self._max_keys:
+                return
+
+            # The middle separator moves up; it is not kept in either half
+            keys = parent._keys
+            middle = len(keys) // 2
+            separator = keys[middle]
+            right = self._Internal(keys[middle + 1:], parent._children[middle + 1:])
+            for child in right._children:
+                child._parent = right
+            del keys[middle:]
+            del parent._children[middle + 1:]
+            node = parent
+
+    def delete(self, key):
+        """Delete key; returns whether it was present."""
+        leaf = self._find_leaf(key)
+        keys = leaf._keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return False
+        del keys[i]
+        del leaf._values[i]
+        self._size -= 1
+        if leaf is not self._root and len(keys) < self._min_leaf_keys:
+            self._fix_leaf_underflow(leaf)
+        return True
+
+    def _fix_leaf_underflow(self, leaf):
+        """Refill an underfull leaf from a sibling, or merge it with one."""
+        parent = leaf._parent
+        index = parent._children.index(leaf)
+        minimum = self._min_leaf_keys
+
+        if index > 0:
+            left = parent._children[index - 1]
+            if len(left._keys) > minimum:
+                leaf._keys.insert(0, left._keys.pop())
+                leaf._values.insert(0, left._values.pop())
+                parent._keys[index - 1] = leaf._keys[0]
+                return
+        if index + 1 < len(parent._children):
+            right = parent._children[index + 1]
+            if len(right._keys) > minimum:
+                leaf._keys.append(right._keys.pop(0))
+                leaf._values.append(right._values.pop(0))
+                parent._keys[index] = right._keys[0]
+                return
+
+        # Merge: the right leaf of the pair is absorbed and unlinked
+        if index > 0:
+            left, right, separator_index = parent._children[index - 1], leaf, index - 1
+        else:
+            left, right, separator_index = leaf, parent._children[1], 0
+        left._keys.extend(right._keys)
+        left._values.extend(right._values)
+        left._next = right._next
+        if left._next is not None:
+            left._next._prev = left
+        del parent._keys[separator_index]
+        del parent._children[separator_index + 1]
+        self._fix_internal_underflow(parent)
+
+    def _fix_internal_underflow(self, node):
+        """Restore the minimum fill of internal nodes from node up to the root."""
+        minimum = self._min_keys
+        while True:
+            if node is self._root:
+                if not node._keys:
+                    # The root ran out of separators; its only child takes over
+                    self._root = node._children[0]
+                    self._root._parent = None
+                return
+            if len(node._keys) >= minimum:
+                return
+
+            parent = node._parent
+            index = parent._children.index(node)
+
+            # Try to borrow through the parent from the left sibling
+            if index > 0:
+                left = parent._children[index - 1]
+                if len(left._keys) > minimum:
+                    node._keys.insert(0, parent._keys[index - 1])
+                    parent._keys[index - 1] = left._keys.pop()
+                    child = left._children.pop()
+                    child._parent = node
+                    node._children.insert(0, child)
+                    return
+
+            # Try to borrow through the parent from the right sibling
+            if index + 1 < len(parent._children):
+                right = parent._children[index + 1]
+                if len(right._keys) > minimum:
+                    node._keys.append(parent._keys[index])
+                    parent._keys[index] = right._keys.pop(0)
+                    child = right._children.pop(0)
+                    child._parent = node
+                    node._children.append(child)
+                    return
+
+            # Merge with a sibling, pulling their separator down between them
+            if index > 0:
+                left, right, separator_index = parent._children[index - 1], node, index - 1
+            else:
+                left, right, separator_index = node, parent._children[1], 0
+            left._keys.append(parent._keys.pop(separator_index))
+            left._keys.extend(right._keys)
+            for child in right._children:
+                child._parent = left
+            left._children.extend(right._children)
+            del parent._children[separator_index + 1]
+            node = parent
+
+    def scan(self, lo=None, hi=None, reverse=False):
+        """Lazily yield (key, value) pairs with lo <= key <= hi in key order.
+
+        Either bound may be None for an open end. With reverse=True the pairs
+        come in descending order, walking the leaf list backwards from hi.
+        """
+        if reverse:
+            return self._scan_reverse(lo, hi)
+        return self._scan_forward(lo, hi)
+
+    def _scan_forward(self, lo, hi):
+        if lo is None:
+            leaf = self._first_leaf()
+            start = 0
+        else:
+            leaf = self._find_leaf(lo)
+            start = bisect_left(leaf._keys, lo)
+        while leaf is not None:
+            keys = leaf._keys
+            if hi is not None and keys and keys[-1] > hi:
+                stop = bisect_right(keys, hi)
+                yield from zip(keys[start:stop], leaf._values[start:stop])
+                return
+            if start:
+                yield from zip(keys[start:], leaf._values[start:])
+            else:
+                yield from zip(keys, leaf._values)
+            leaf = leaf._next
+            start = 0
+
+    def _scan_reverse(self, lo, hi):
+        if hi is None:
+            leaf = self._last_leaf()
+            stop = len(leaf._keys)
+        else:
+            leaf = self._find_leaf(hi)
+            stop = bisect_right(leaf._keys, hi)
+        while leaf is not None:
+            keys = leaf._keys
+            start = 0
+            if lo is not None and keys and keys[0] < lo:
+                start = bisect_left(keys, lo, 0, stop)
+            for i in range(stop - 1, start - 1, -1):
+                yield keys[i], leaf._values[i]
+            if start:
+                return
+            leaf = leaf._prev
+            if leaf is not None:
+                stop = len(leaf._keys)
+
+    def _first_leaf(self):
+        node = self._root
+        while type(node) is not self._Leaf:
+            node = node._children[0]
+        return node
+
+    def _last_leaf(self):
+        node = self._root
+        while type(node) is not self._Leaf:
+            node = node._children[-1]
+        return node
+
+    def range_query(self, lo, hi):
+        """Return the keys within [lo, hi] as a list."""
+        return [key for key, _ in self.scan(lo, hi)]
+
+    def items(self):
+        """Lazily yield all (key, value) pairs in key order."""
+        return self._scan_forward(None, None)
+
+    def values(self):
+        """Lazily yield all values in key order."""
+        leaf = self._first_leaf()
+        while leaf is not None:
+            yield from leaf._values
+            leaf = leaf._next
+
+    def iter_inorder(self):
+        """Lazily yield keys in sorted order."""
+        leaf = self._first_leaf()
+        while leaf is not None:
+            yield from leaf._keys
+            leaf = leaf._next
+
+    def iter_reverse(self):
+        """Lazily yield keys in descending order."""
+        leaf = self._last_leaf()
+        while leaf is not None:
+            yield from reversed(leaf._keys)
+            leaf = leaf._prev
+
+    def find_min(self):
+        keys = self._first_leaf()._keys
+        return keys[0] if keys else None
+
+    def find_max(self):
+        keys = self._last_leaf()._keys
+        return keys[-1] if keys else None
+
+    def memory_report(self, deep=False):
+        """Report node count, bytes per node, total bytes and bytes per key.
+
+        A node's bytes include its _keys list and its _values (leaf) or
+        _children (internal) list. The nodes are walked iteratively; with
+        deep=True the keys and values are measured too (see tree_memory).
+        """
+        leaf = self._Leaf
+
+        def children(node):
+            return () if type(node) is leaf else node._children
+
+        def sizeof(node):
+            rest = node._values if type(node) is leaf else node._children
+            return sys.getsizeof(node) + sys.getsizeof(node._keys) + sys.getsizeof(rest)
+
+        nodes, node_bytes = tree_memory.walk(self._root, children, sizeof)
+        objects = itertools.chain(self.iter_inorder(), self.values()) if deep else None
+        return tree_memory.report(nodes, node_bytes, self._size, tree_memory.object_bytes(self), objects)
+
+    def freeze(self):
+        """Return an immutable Eytzinger-ordered FrozenTree snapshot of the keys."""
+        return FrozenTree(self.iter_inorder())
+
+    def __getitem__(self, key):
+        leaf = self._find_leaf(key)
+        keys = leaf._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return leaf._values[i]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
+
+    def __len__(self):
+        return self._size
+
+    def size(self):
+        """Return the number of keys in the tree."""
+        return self._size
+
+    def is_empty(self):
+        """Check if the tree is empty."""
+        return self._size == 0
@@ -0,0 +1,167 @@
+"""Immutable, cache-friendly snapshot of a search tree.
+
+The keys are stored in Eytzinger (BFS) order in one contiguous array: the
+root sits at index 1 and the children of index k at 2k and 2k + 1. A lookup
+touches the array top to bottom with no pointer chasing, and the first few
+levels share a handful of cache lines. Integer and float keys go in a typed
+array whose buffer can be shared zero-copy; any other keys use a list.
+
+NumPy is optional. When present, contains_many/lower_bound_many run every
+probe of a batch through the levels together as vectorized operations.
+"""
+from array import array
+import sys
+
+import tree_memory
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+def key_typecode(keys):
+    """Pick an array typecode able to hold every key, or None."""
+    if all(type(key) is int for key in keys):
+        if not keys or (_INT64_MIN <= keys[0] and keys[-1] <= _INT64_MAX):
+            return 'q'
+    elif all(type(key) is float for key in keys):
+        return 'd'
+    return None
+
+
+class FrozenTree():
+    """Read-only Eytzinger-ordered snapshot built from ascending keys."""
+
+    def __init__(self, sorted_keys):
+        """Build the snapshot from keys in ascending order (e.g. tree.iter_inorder())."""
+        keys = list(sorted_keys)
+        n = len(keys)
+        layout = [keys[0] if keys else 0] * (n + 1)  # slot 0 is padding
+
+        # Inorder walk of the implicit tree hands out keys in sorted order
+        position = 0
+        stack = []
+        k = 1
+        while stack or k <= n:
+            if k <= n:
+                stack.append(k)
+                k *= 2
+            else:
+                k = stack.pop()
+                layout[k] = keys[position]
+                position += 1
+                k = 2 * k + 1
+
+        typecode = key_typecode(keys)
+        self._keys = array(typecode, layout) if typecode is not None else layout
+        self._size = n
+
+    def __len__(self):
+        return self._size
+
+    def size(self):
+        return self._size
+
+    def memory_report(self, deep=False):
+        """Report slot count, bytes per slot, total bytes and bytes per key.
+
+        Every key takes one slot of the Eytzinger array, plus the padding
+        slot 0. Keys in a typed array are part of it; keys in a list are
+        only measured with deep=True (see tree_memory).
+        """
+        deep_keys = None
+        if deep:
+            deep_keys = self._keys[1:] if isinstance(self._keys, list) else ()
+        return tree_memory.report(len(self._keys), sys.getsizeof(self._keys), self._size,
+                                  tree_memory.object_bytes(self), deep_keys)
+
+    def is_empty(self):
+        return self._size == 0
+
+    @property
+    def buffer(self):
+        """Read-only memoryview of the Eytzinger array (slot 0 is padding)."""
+        if not isinstance(self._keys, array):
+            raise TypeError("only int and float snapshots are backed by a buffer")
+        return memoryview(self._keys).toreadonly()
+
+    def _lower_bound_index(self, element):
+        keys, n = self._keys, self._size
+        k = 1
+        while k <= n:
+            k = 2 * k + (keys[k] < element)
+        # Undo the trailing right turns plus the final left turn
+        return k >> ((~k & (k + 1)).bit_length())
+
+    def contains(self, element):
+        keys, n = self._keys, self._size
+        k = 1
+        while k <= n:
+            key = keys[k]
+            if key == element:
+                return True
+            k = 2 * k + (key < element)
+        return False
+
+    def lower_bound(self, element):
+        """Return the smallest key >= element, or None if there is none."""
+        k = self._lower_bound_index(element)
+        return self._keys[k] if k != 0 else None
+
+    def _lower_bound_indices(self, probes):
+        keys = np.frombuffer(self._keys, dtype=self._keys.typecode)
+        n = self._size
+        k = np.ones(len(probes), dtype=np.int64)
+        for _ in range(n.bit_length()):
+            inside = k <= n
+            step = keys[np.where(inside, k, 0)] < probes
+            k = np.where(inside, 2 * k + step, k)
+        lowest_zero = ~k & (k + 1)
+        return k // (2 * lowest_zero)
+
+    def contains_many(self, elements):
+        """Return the membership of each element (a NumPy bool mask when vectorized)."""
+        if np is None or not isinstance(self._keys, array):
+            return [self.contains(element) for element in elements]
+        probes = np.asarray(elements)
+        k = self._lower_bound_indices(probes)
+        keys = np.frombuffer(self._keys, dtype=self._keys.typecode)
+        return (k != 0) & (keys[k] == probes)
+
+    def lower_bound_many(self, elements):
+        """Return (keys, found) for a batch of probes.
+
+        found[i] says whether probe i has a lower bound and keys[i] is it;
+        entries where found is False are padding. Without NumPy, or for
+        keys that are not int/float, this returns a list of keys or None.
+        """
+        if np is None or not isinstance(self._keys, array):
+            return [self.lower_bound(element) for element in elements]
+        probes = np.asarray(elements)
+        k = self._lower_bound_indices(probes)
+        keys = np.frombuffer(self._keys, dtype=self._keys.typecode)
+        return keys[k], k != 0
+
+    def __contains__(self, element):
+        return self.contains(element)
+
+    def __iter__(self):
+        """Yield keys in sorted order."""
+        keys, n = self._keys, self._size
+        stack = []
+        k = 1
+        while stack or k <= n:
+            if k <= n:
+                stack.append(k)
+                k *= 2
+            else:
+                k = stack.pop()
+                yield keys[k]
+                k = 2 * k + 1
+
+    def __repr__(self):
+        return f"FrozenTree(size={self._size})"
@@ -0,0 +1,284 @@
+"""Opt-in operation counters for the search trees.
+
+instrument(tree) attaches a TreeStats to one tree by shadowing its methods
+with counting wrappers on that instance only. The classes are never touched,
+so a tree that is not instrumented, or one whose stats were detached, runs
+exactly the code it always did: the layer costs nothing while it is off.
+
+Counted per operation (search, insert, delete and range_query):
+
+- comparisons: the key arguments are wrapped in a probe that counts every
+  rich comparison made against it, including those made by bisect.
+- nodes_visited: distinct elements the probe was compared with, which is the
+  nodes visited in a binary tree. B-trees compare against several keys per
+  node, so there it is the number of nodes on the key's root-to-leaf search
+  path, measured before the operation runs.
+- rotations: calls to _rotate_left/_rotate_right or rotate_left/rotate_right.
+- splits: B-tree nodes split, counting every step of a cascade up the tree.
+- underflow_fixes: borrows from and merges with a sibling, every step of a
+  cascade counted.
+- splay_steps: zig, zig-zig and zig-zag steps of a splay; with the top-down
+  engine, half the length of the splayed search path, rounded up.
+
+    with instrument(tree) as stats:
+        tree.insert(5)
+    stats.snapshot()                   # totals and calls per operation
+    stats.histogram('insert', 'rotations')   # {rotations: calls}
+
+Instrumentation covers BinarySearchTree, AVLTree, RedBlackTree, BTree/
+TwoFourTree and SplayTree; SplayCache stores its keys outside the tree and
+is not supported.
+"""
+from bisect import bisect_left
+from collections import Counter
+
+COUNTERS = ('comparisons', 'nodes_visited', 'rotations', 'splits', 'underflow_fixes', 'splay_steps')
+OPERATIONS = {'search': 1, 'insert': 1, 'delete': 1, 'range_query': 2}  # name -> key arguments
+ROTATIONS = ('_rotate_left', '_rotate_right', 'rotate_left', 'rotate_right')
+
+
+def instrument(tree):
+    """Start counting the operations of tree; returns its TreeStats."""
+    return TreeStats(tree)
+
+
+def _key_of(value):
+    return value.key if type(value) is _Probe else value
+
+
+class _Probe:
+    """Stand-in for a key that counts the comparisons made against it."""
+    __slots__ = 'key', '_stats'
+
+    def __init__(self, key, stats):
+        self.key = key
+        self._stats = stats
+
+    def _compared(self, other):
+        stats = self._stats
+        if stats is not None:
+            stats.comparisons += 1
+            if other is not stats._last_compared:
+                stats._last_compared = other
+                if stats._binary:
+                    stats.nodes_visited += 1
+        return _key_of(other)
+
+    def __lt__(self, other):
+        return self.key < self._compared(other)
+
+    def __le__(self, other):
+        return self.key <= self._compared(other)
+
+    def __gt__(self, other):
+        return self.key > self._compared(other)
+
+    def __ge__(self, other):
+        return self.key >= self._compared(other)
+
+    def __eq__(self, other):
+        return self.key == self._compared(other)
+
+    def __ne__(self, other):
+        return self.key != self._compared(other)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    # Trees that unpack their values (IntervalTree) see the key's items
+    def __iter__(self):
+        return iter(self.key)
+
+    def __getitem__(self, index):
+        return self.key[index]
+
+    def __repr__(self):
+        return f"_Probe({self.key!r})"
+
+
+class TreeStats:
+    """Counters of one instrumented tree, in total and per operation call."""
+
+    def __init__(self, tree):
+        if 'search' in vars(tree):
+            raise ValueError("the tree is already instrumented")
+        self.tree = tree
+        self._binary = not hasattr(tree, '_max_keys')
+        self._last_compared = None
+        self._busy = False
+        self._wrapped = []
+        self.reset()
+        for name, key_args in OPERATIONS.items():
+            if hasattr(tree, name):
+                self._wrap(name, self._operation(name, getattr(tree, name), key_args))
+        for name in ROTATIONS:
+            if hasattr(tree, name):
+                self._wrap(name, self._counting('rotations', getattr(tree, name)))
+        if hasattr(tree, '_split_node'):
+            self._wrap('_split_node', self._splitting(tree._split_node))
+        if hasattr(tree, '_fix_underflow'):
+            self._wrap('_fix_underflow', self._fixing_underflow(tree._fix_underflow))
+        if hasattr(tree, '_splay'):
+            self._wrap('_splay', self._bottom_up_splay(tree._splay))
+        if hasattr(tree, '_splay_top_down'):
+            self._wrap('_splay_top_down', self._top_down_splay(tree._splay_top_down))
+
+    def _wrap(self, name, wrapper):
+        setattr(self.tree, name, wrapper)
+        self._wrapped.append(name)
+
+    def detach(self):
+        """Remove the wrappers; the tree runs its uninstrumented methods again."""
+        for name in self._wrapped:
+            delattr(self.tree, name)
+        self._wrapped = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detach()
+
+    def reset(self):
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+        self.calls = Counter()
+        self._histograms = {}
+
+    def snapshot(self):
+        """Return the totals of every counter and the number of calls per operation."""
+        snapshot = {counter: getattr(self, counter) for counter in COUNTERS}
+        snapshot['calls'] = dict(self.calls)
+        return snapshot
+
+    def histogram(self, operation, counter='comparisons'):
+        """Return {count: calls}: how many calls of operation hit each value of counter."""
+        return dict(sorted(self._histograms.get((operation, counter), {}).items()))
+
+    def _operation(self, name, method, key_args):
+        def operation(*args):
+            if self._busy:
+                # Called from inside another operation (delete may search first)
+                return method(*args)
+            self._busy = True
+            before = [getattr(self, counter) for counter in COUNTERS]
+            probes = [_Probe(key, self) for key in args[:key_args]]
+            self._last_compared = None
+            if not self._binary:
+                self.nodes_visited += self._search_path_length(args[0])
+            try:
+                return method(*probes, *args[key_args:])
+            finally:
+                self._busy = False
+                for probe in probes:
+                    probe._stats = None
+                if name == 'insert':
+                    self._unwrap_stored(probes[0])
+                self.calls[name] += 1
+                for counter, start in zip(COUNTERS, before):
+                    histogram = self._histograms.setdefault((name, counter), Counter())
+                    histogram[getattr(self, counter) - start] += 1
+        return operation
+
+    def _counting(self, counter, method):
+        def counted(*args):
+            setattr(self, counter, getattr(self, counter) + 1)
+            return method(*args)
+        return counted
+
+    def _splitting(self, method):
+        def split(node):
+            # Each split passes one key up, so the cascade climbs through the full parents
+            steps, parent = 1, node._parent
+            while parent is not None and len(parent._keys) == self.tree._max_keys:
+                steps, parent = steps + 1, parent._parent
+            self.splits += steps
+            return method(node)
+        return split
+
+    def _fixing_underflow(self, method):
+        def fix(node):
+            # A borrow ends the cascade; a merge takes a key from the parent,
+            # which continues it when the parent is a non-root node left short
+            min_keys = self.tree._min_keys
+            steps, short = 0, node
+            while short is not self.tree._root:
+                steps += 1
+                parent = short._parent
+                index = parent._children.index(short)
+                siblings = parent._children[max(index - 1, 0):index] + parent._children[index + 1:index + 2]
+                if any(len(sibling._keys) > min_keys for sibling in siblings):
+                    break
+                if len(parent._keys) > min_keys:
+                    break
+                short = parent
+            self.underflow_fixes += steps
+            return method(node)
+        return fix
+
+    def _bottom_up_splay(self, method):
+        def splay(node):
+            before = self.rotations
+            method(node)
+            # A zig-zig or zig-zag step rotates twice; only the last step may be a zig
+            self.splay_steps += (self.rotations - before + 1) // 2
+        return splay
+
+    def _top_down_splay(self, method):
+        def splay(root, element):
+            key = _key_of(element)
+            depth, node = 0, root
+            while True:
+                if key < node._element:
+                    node = node._left
+                elif node._element < key:
+                    node = node._right
+                else:
+                    break
+                if node is None:
+                    break
+                depth += 1
+            self.splay_steps += (depth + 1) // 2
+            return method(root, element)
+        return splay
+
+    def _search_path_length(self, key):
+        """Nodes a B-tree descent for key passes through."""
+        count, node = 0, self.tree._root
+        while node is not None:
+            count += 1
+            keys = node._keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key or not node._children:
+                break
+            node = node._children[i]
+        return count
+
+    def _unwrap_stored(self, probe):
+        """Put the plain key back where insert stored its probe."""
+        key = probe.key
+        tree = self.tree
+        if not self._binary:
+            node = tree._root
+            while node is not None:
+                keys = node._keys
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    if keys[i] is probe:
+                        keys[i] = key
+                    return
+                node = node._children[i] if node._children else None
+            return
+        if hasattr(tree, 'root'):  # RedBlackTree: value/left/right, NIL-terminated
+            root, element, left, right = 'root', 'value', 'left', 'right'
+        else:
+            root, element, left, right = '_root', '_element', '_left', '_right'
+        node = getattr(tree, root)
+        while node is not None and getattr(node, left, None) is not node:
+            value = getattr(node, element)
+            if value is probe:
+                setattr(node, element, key)
+                return
+            if key == value:
+                return
+            node = getattr(node, left) if key < value else getattr(node, right)
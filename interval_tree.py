@@ -0,0 +1,188 @@
+"""Interval tree: a RedBlackTree augmented with the max endpoint per subtree.
+
+Values are closed intervals given as (low, high) tuples with low <= high,
+ordered by low and then high; an interval already in the tree is ignored on
+insert. Every node also records max_high, the largest high endpoint in its
+subtree. It is kept current on the insertion path (insert_fix), through
+rotate_left/rotate_right and on the deletion path (delete_fix), so an
+overlap query can skip every subtree that ends before the query starts and
+every right subtree that starts after it ends, visiting O(log n + k) nodes
+for k results.
+"""
+from bisect import bisect_left, bisect_right
+
+import batch_ops
+from redblack_tree_skeleton import NIL, RBNode, RED, RedBlackTree
+
+
+class IntervalNode(RBNode):
+    __slots__ = 'max_high',
+
+    def __init__(self, value, color=RED):
+        low, high = value
+        if high < low:
+            raise ValueError(f"interval {value!r} ends before it starts")
+        super().__init__(value, color)
+        self.max_high = high
+
+
+class IntervalTree(RedBlackTree):
+    """Red-black tree of (low, high) intervals answering overlap queries."""
+
+    _node_class = IntervalNode
+
+    @classmethod
+    def from_sorted(cls, iterable):
+        """Build the tree in O(n) from intervals in ascending (low, high) order."""
+        tree = super().from_sorted(iterable)
+        tree._refresh_all()
+        return tree
+
+    @classmethod
+    def _load_columns(cls, values, columns):
+        tree = super()._load_columns(values, columns)
+        tree._refresh_all()
+        return tree
+
+    def add(self, low, high):
+        """Insert the interval [low, high]."""
+        self.insert((low, high))
+
+    def remove(self, low, high):
+        """Delete the interval [low, high]; returns whether it was present."""
+        return self.delete((low, high))
+
+    def _pull(self, node):
+        """Recompute node.max_high from the node and its children."""
+        high = node.value[1]
+        if node.left is not NIL and node.left.max_high > high:
+            high = node.left.max_high
+        if node.right is not NIL and node.right.max_high > high:
+            high = node.right.max_high
+        node.max_high = high
+
+    def _refresh_all(self):
+        """Recompute max_high bottom-up for every node (after a bulk build)."""
+        stack = []
+        node = self.root
+        last = NIL
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append(node)
+                node = node.left
+            else:
+                top = stack[-1]
+                if top.right is not NIL and top.right is not last:
+                    node = top.right
+                else:
+                    self._pull(top)
+                    last = stack.pop()
+
+    def insert_fix(self, new_node):
+        # The new leaf can only raise max_high along its path to the root
+        high = new_node.max_high
+        node = new_node.parent
+        while node is not NIL and node.max_high < high:
+            node.max_high = high
+            node = node.parent
+        super().insert_fix(new_node)
+
+    def _after_unlink(self, node):
+        # The successor may have moved up into the removed node's place, so
+        # the whole path is refreshed rather than stopping when a value holds
+        while node is not NIL:
+            self._pull(node)
+            node = node.parent
+
+    def rotate_left(self, node):
+        # The node taking over keeps the subtree, and so its max_high
+        high = node.max_high
+        super().rotate_left(node)
+        node.parent.max_high = high
+        self._pull(node)
+
+    def rotate_right(self, node):
+        high = node.max_high
+        super().rotate_right(node)
+        node.parent.max_high = high
+        self._pull(node)
+
+    def iter_overlapping(self, low, high):
+        """Lazily yield the intervals overlapping [low, high] in sorted order."""
+        stack = []
+        node = self.root
+        while stack or node is not NIL:
+            if node is not NIL and node.max_high >= low:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop() if stack else NIL
+                if node is NIL:
+                    return
+                start, end = node.value
+                if start > high:
+                    # Everything to the right starts even later
+                    return
+                if end >= low:
+                    yield node.value
+                node = node.right
+
+    def overlapping(self, low, high):
+        """Return a list of the intervals overlapping [low, high]."""
+        return list(self.iter_overlapping(low, high))
+
+    def iter_containing(self, point):
+        """Lazily yield the intervals containing point (a stabbing query)."""
+        return self.iter_overlapping(point, point)
+
+    def find_containing(self, point):
+        """Return some interval containing point in O(log n), or None."""
+        node = self.root
+        while node is not NIL:
+            low, high = node.value
+            if low <= point <= high:
+                return node.value
+            if node.left is not NIL and node.left.max_high >= point:
+                node = node.left
+            elif low <= point:
+                node = node.right
+            else:
+                return None
+        return None
+
+    def containing_many(self, points):
+        """Stab the tree with a batch of points in one pass.
+
+        Returns one list of containing intervals (in sorted order) per point,
+        in the order the points were given; points may be a NumPy array. The
+        sorted points are split at every node, so each subtree is entered
+        once with only the points that can hit an interval inside it.
+        """
+        probes, order, _ = batch_ops.sort_probes(points)
+        hits = [[] for _ in probes]
+        # A node is pushed to be expanded, then again (flagged) to report
+        # itself once its left subtree is done, which keeps results sorted
+        stack = [(self.root, 0, len(probes), False)] if self.root is not NIL and probes else []
+        while stack:
+            node, lo, hi, report = stack.pop()
+            low, high = node.value
+            if report:
+                for i in range(bisect_left(probes, low, lo, hi), bisect_right(probes, high, lo, hi)):
+                    hits[i].append(node.value)
+                continue
+            # Points above max_high miss the whole subtree
+            hi = bisect_right(probes, node.max_high, lo, hi)
+            if lo == hi:
+                continue
+            right = node.right
+            if right is not NIL:
+                start = bisect_left(probes, low, lo, hi)
+                if start < hi:
+                    stack.append((right, start, hi, False))
+            stack.append((node, lo, hi, True))
+            if node.left is not NIL:
+                stack.append((node.left, lo, hi, False))
+        results = [None] * len(probes)
+        for i, position in enumerate(order):
+            results[position] = hits[i]
+        return results
@@ -0,0 +1,545 @@
+"""Disk-resident B-tree stored as fixed-size pages in a single file.
+
+Page 0 holds the file header; every other page holds one node or is on the
+free list. A node page is an 8-byte page header (leaf flag, key count, next
+free page) followed by the keys as a typed column and, for internal nodes,
+the child page numbers as a uint32 column:
+
+    header   magic b'BTPG', version, key typecode, page size, order, root
+             page, page count, free list head, key count
+    page     flags, key count, next free page | keys | children
+
+Pages are read through a read-only memory map of the file and decoded into
+small node objects that live in a bounded LRU buffer pool. Modified pages
+are marked dirty and written back when they are evicted or on flush(), so
+the file is only consistent after flush() or close(). Page numbers touched
+by an operation stay pinned until it finishes, so the pool can briefly hold
+more pages than its capacity while splits or merges are in flight.
+
+Keys are int64 ('q') or float64 ('d'). With the default order the fan-out
+is as large as a page allows (340 keys for 4 KiB pages), so a billion keys
+fit in four levels.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from tree_file import TreeFileError
+import tree_memory
+
+MAGIC = b'BTPG'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHcxIIIIIQ')
+_PAGE = struct.Struct('<BxHI')
+_LEAF = 1
+_FREE = 2
+_NONE = 0  # page 0 is the header, so it doubles as the null page number
+
+
+class _Page:
+    """Lightweight, nonpublic class for a decoded node page."""
+    __slots__ = '_id', '_keys', '_children'  # streamline memory usage
+
+    def __init__(self, page_id, keys, children):
+        self._id = page_id
+        self._keys = keys
+        self._children = children
+
+
+class BufferPool():
+    """Bounded LRU cache of decoded pages with dirty-page write-back.
+
+    read(page_id) decodes a page from disk and write(page) encodes one back;
+    both are supplied by the owner. Pages used inside begin()/end() are
+    pinned and never evicted before end().
+    """
+
+    def __init__(self, capacity, read, write):
+        if capacity < 1:
+            raise ValueError("the buffer pool needs room for at least one page")
+        self.capacity = capacity
+        self._read = read
+        self._write = write
+        self._pages = OrderedDict()
+        self._dirty = set()
+        self._pinned = set()
+        self._depth = 0
+        self.hits = self.misses = self.evictions = 0
+        self.page_reads = self.page_writes = 0
+
+    def begin(self):
+        """Start an operation; pages it touches are pinned until end()."""
+        self._depth += 1
+
+    def end(self):
+        """Finish an operation, unpinning its pages and trimming the pool."""
+        self._depth -= 1
+        if self._depth == 0:
+            self._pinned.clear()
+            self._evict()
+
+    def get(self, page_id):
+        """Return the decoded page, reading it from disk on a miss."""
+        page = self._pages.get(page_id)
+        if page is not None:
+            self.hits += 1
+            self._pages.move_to_end(page_id)
+        else:
+            self.misses += 1
+            self.page_reads += 1
+            page = self._read(page_id)
+            self._pages[page_id] = page
+        if self._depth:
+            self._pinned.add(page_id)
+        else:
+            self._evict()
+        return page
+
+    def add(self, page):
+        """Cache a newly created page; it is dirty until written back."""
+        self._pages[page._id] = page
+        self.mark_dirty(page)
+
+    def mark_dirty(self, page):
+        """Record that page was modified and must be written back."""
+        self._dirty.add(page._id)
+        if self._depth:
+            self._pinned.add(page._id)
+
+    def discard(self, page_id):
+        """Drop a page without writing it back (it was freed)."""
+        self._pages.pop(page_id, None)
+        self._dirty.discard(page_id)
+        self._pinned.discard(page_id)
+
+    def _evict(self):
+        pages = self._pages
+        while len(pages) > self.capacity:
+            # Least recently used first, skipping pages pinned by the operation
+            for page_id in pages:
+                if page_id not in self._pinned:
+                    break
+            else:
+                return
+            page = pages.pop(page_id)
+            self.evictions += 1
+            if page_id in self._dirty:
+                self._dirty.discard(page_id)
+                self._write(page)
+                self.page_writes += 1
+
+    def flush(self):
+        """Write every dirty page back; they stay cached."""
+        for page_id in sorted(self._dirty):
+            self._write(self._pages[page_id])
+            self.page_writes += 1
+        self._dirty.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'page_reads': self.page_reads,
+            'page_writes': self.page_writes,
+            'cached_pages': len(self._pages),
+            'dirty_pages': len(self._dirty),
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+        self.page_reads = self.page_writes = 0
+
+
+class PagedBTree():
+    """B-tree of int or float keys kept in a paged file behind a buffer pool.
+
+    Opening an existing file reuses its page size, order and key type; the
+    arguments only apply when the file is created.
+    """
+
+    def __init__(self, path, page_size=4096, cache_pages=256, order=None, keytype='q'):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b', buffering=0)
+        try:
+            if exists:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._read_header()
+            else:
+                self._create(page_size, order, keytype)
+        except Exception:
+            self._file.close()
+            raise
+        self._max_keys = self._order - 1
+        self._min_keys = (self._order + 1) // 2 - 1
+        self._pool = BufferPool(cache_pages, self._read_page, self._write_page)
+
+    @staticmethod
+    def max_order(page_size, keytype='q'):
+        """Return the largest order whose nodes fit in one page."""
+        key_size = array(keytype).itemsize
+        return (page_size - _PAGE.size + key_size) // (key_size + 4)
+
+    def _create(self, page_size, order, keytype):
+        if keytype not in ('q', 'd'):
+            raise ValueError("keys must be int64 ('q') or float64 ('d')")
+        largest = self.max_order(page_size, keytype)
+        if order is None:
+            order = largest
+        if not 3 <= order <= largest:
+            raise ValueError(f"order must be between 3 and {largest} for {page_size}-byte pages")
+        self._page_size = page_size
+        self._order = order
+        self._typecode = keytype
+        self._root = _NONE
+        self._page_count = 1
+        self._free = _NONE
+        self._size = 0
+        self._file.truncate(page_size * 16)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._write_header()
+
+    def _read_header(self):
+        if len(self._map) < _HEADER.size:
+            raise TreeFileError("file too short to be a paged B-tree")
+        (magic, version, typecode, self._page_size, self._order, self._root,
+         self._page_count, self._free, self._size) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise TreeFileError("not a paged B-tree file")
+        if version != VERSION:
+            raise TreeFileError(f"unsupported paged B-tree version {version}")
+        self._typecode = typecode.decode()
+
+    def _write_header(self):
+        header = _HEADER.pack(MAGIC, VERSION, self._typecode.encode(), self._page_size,
+                              self._order, self._root, self._page_count, self._free,
+                              self._size)
+        self._file.seek(0)
+        self._file.write(header)
+
+    def _read_page(self, page_id):
+        offset = page_id * self._page_size
+        flags, count, _ = _PAGE.unpack_from(self._map, offset)
+        if flags & _FREE:
+            raise TreeFileError(f"page {page_id} is on the free list")
+        keys = array(self._typecode)
+        start = offset + _PAGE.size
+        stop = start + count * keys.itemsize
+        keys.frombytes(self._map[start:stop])
+        children = array('I')
+        if not flags & _LEAF:
+            children.frombytes(self._map[stop:stop + (count + 1) * 4])
+        return _Page(page_id, keys, children)
+
+    def _write_page(self, page):
+        flags = 0 if page._children else _LEAF
+        data = (_PAGE.pack(flags, len(page._keys), _NONE)
+                + page._keys.tobytes() + page._children.tobytes())
+        self._file.seek(page._id * self._page_size)
+        self._file.write(data)
+
+    def _new_page(self, keys, children):
+        """Allocate a page, reusing the free list first, and cache it as dirty."""
+        if self._free != _NONE:
+            page_id = self._free
+            self._free = _PAGE.unpack_from(self._map, page_id * self._page_size)[2]
+        else:
+            page_id = self._page_count
+            self._page_count += 1
+            needed = self._page_count * self._page_size
+            if needed > len(self._map):
+                # Grow the file geometrically and map the new size
+                self._file.truncate(max(needed, 2 * len(self._map)))
+                self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        page = _Page(page_id, keys, children)
+        self._pool.add(page)
+        return page
+
+    def _free_page(self, page):
+        """Put a page on the free list, writing its free marker straight away."""
+        self._pool.discard(page._id)
+        self._file.seek(page._id * self._page_size)
+        self._file.write(_PAGE.pack(_FREE, 0, self._free))
+        self._pool.page_writes += 1
+        self._free = page._id
+
+    def search(self, key):
+        """Return True if key is in the tree."""
+        page_id = self._root
+        get = self._pool.get
+        while page_id != _NONE:
+            page = get(page_id)
+            keys = page._keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return True
+            page_id = page._children[i] if page._children else _NONE
+        return False
+
+    def insert(self, key):
+        """Insert key; keys already present are ignored."""
+        pool = self._pool
+        pool.begin()
+        try:
+            if self._root == _NONE:
+                self._root = self._new_page(array(self._typecode, [key]), array('I'))._id
+                self._size = 1
+                return
+
+            # Walk down to the leaf, remembering the path for the splits
+            path = []
+            page = pool.get(self._root)
+            while True:
+                keys = page._keys
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    return
+                if not page._children:
+                    break
+                path.append((page, i))
+                page = pool.get(page._children[i])
+
+            keys.insert(i, key)
+            pool.mark_dirty(page)
+            self._size += 1
+
+            # Split overfull pages around their middle key, moving up the path
+            while len(page._keys) > self._max_keys:
+                keys = page._keys
+                middle = (len(keys) - 1) // 2
+                middle_key = keys[middle]
+                right = self._new_page(keys[middle + 1:], page._children[middle + 1:])
+                del keys[middle:]
+                del page._children[middle + 1:]
+                pool.mark_dirty(page)
+                if not path:
+                    self._root = self._new_page(array(self._typecode, [middle_key]),
+                                                array('I', [page._id, right._id]))._id
+                    return
+                page, i = path.pop()
+                page._keys.insert(i, middle_key)
+                page._children.insert(i + 1, right._id)
+                pool.mark_dirty(page)
+        finally:
+            pool.end()
+
+    def delete(self, key):
+        """Delete key; returns whether it was present."""
+        pool = self._pool
+        pool.begin()
+        try:
+            path = []
+            page_id = self._root
+            while page_id != _NONE:
+                page = pool.get(page_id)
+                keys = page._keys
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    break
+                path.append((page, i))
+                page_id = page._children[i] if page._children else _NONE
+            else:
+                return False
+
+            if page._children:
+                # Replace the key with its inorder predecessor and remove that instead
+                path.append((page, i))
+                leaf = pool.get(page._children[i])
+                while leaf._children:
+                    path.append((leaf, len(leaf._children) - 1))
+                    leaf = pool.get(leaf._children[-1])
+                page._keys[i] = leaf._keys.pop()
+                pool.mark_dirty(page)
+                page = leaf
+            else:
+                del page._keys[i]
+            pool.mark_dirty(page)
+            self._size -= 1
+            self._fix_underflow(page, path)
+            return True
+        finally:
+            pool.end()
+
+    def _fix_underflow(self, page, path):
+        """Refill or merge underfull pages from page up along path."""
+        pool = self._pool
+        min_keys = self._min_keys
+        while path and len(page._keys) < min_keys:
+            parent, index = path.pop()
+            siblings = parent._children
+
+            # Try to borrow from left sibling
+            if index > 0:
+                left = pool.get(siblings[index - 1])
+                if len(left._keys) > min_keys:
+                    page._keys.insert(0, parent._keys[index - 1])
+                    parent._keys[index - 1] = left._keys.pop()
+                    if left._children:
+                        page._children.insert(0, left._children.pop())
+                    for modified in (page, left, parent):
+                        pool.mark_dirty(modified)
+                    return
+
+            # Try to borrow from right sibling
+            if index + 1 < len(siblings):
+                right = pool.get(siblings[index + 1])
+                if len(right._keys) > min_keys:
+                    page._keys.append(parent._keys[index])
+                    parent._keys[index] = right._keys.pop(0)
+                    if right._children:
+                        page._children.append(right._children.pop(0))
+                    for modified in (page, right, parent):
+                        pool.mark_dirty(modified)
+                    return
+
+            # Merge with a sibling: the right page of the pair is freed
+            if index > 0:
+                left, right, separator = pool.get(siblings[index - 1]), page, index - 1
+            else:
+                left, right, separator = page, pool.get(siblings[1]), 0
+            left._keys.append(parent._keys.pop(separator))
+            left._keys.extend(right._keys)
+            left._children.extend(right._children)
+            del siblings[separator + 1]
+            pool.mark_dirty(left)
+            pool.mark_dirty(parent)
+            self._free_page(right)
+            page = parent
+
+        if not path and not page._keys:
+            # The root ran out of keys; its only child (if any) takes over
+            self._root = page._children[0] if page._children else _NONE
+            self._free_page(page)
+
+    def iter_range(self, lo=None, hi=None):
+        """Lazily yield keys with lo <= key <= hi in sorted order.
+
+        Either bound may be None for an open end. The tree must not be
+        modified while the iteration is in progress.
+        """
+        get = self._pool.get
+        stack = []
+        page_id = self._root
+        while page_id != _NONE:
+            page = get(page_id)
+            i = bisect_left(page._keys, lo) if lo is not None else 0
+            stack.append((page, i))
+            page_id = page._children[i] if page._children else _NONE
+
+        while stack:
+            page, i = stack.pop()
+            keys = page._keys
+            if not page._children:
+                # A leaf hands over its whole slice at once
+                stop = bisect_right(keys, hi, i) if hi is not None else len(keys)
+                yield from keys[i:stop]
+                if stop < len(keys):
+                    return
+                continue
+            if i == len(keys):
+                continue
+            key = keys[i]
+            if hi is not None and key > hi:
+                return
+            yield key
+            stack.append((page, i + 1))
+            page_id = page._children[i + 1]
+            while page_id != _NONE:
+                page = get(page_id)
+                stack.append((page, 0))
+                page_id = page._children[0] if page._children else _NONE
+
+    def range_query(self, lo, hi):
+        """Return the keys within [lo, hi] as a list."""
+        return list(self.iter_range(lo, hi))
+
+    def iter_inorder(self):
+        """Lazily yield keys in sorted order."""
+        return self.iter_range()
+
+    def height(self):
+        """Return the number of edges from the root page to a leaf, or -1 if empty."""
+        depth = -1
+        page_id = self._root
+        while page_id != _NONE:
+            page = self._pool.get(page_id)
+            depth += 1
+            page_id = page._children[0] if page._children else _NONE
+        return depth
+
+    def stats(self):
+        """Return buffer pool hit/miss/eviction counts and page I/O counters."""
+        stats = self._pool.stats()
+        stats['file_pages'] = self._page_count
+        return stats
+
+    def reset_stats(self):
+        self._pool.reset_stats()
+
+    def memory_report(self, deep=False):
+        """Report the memory of the pages currently decoded in the buffer pool.
+
+        The rest of the tree lives in the file, so nodes counts cached
+        pages only and bytes per key relates the cache to every key in the
+        tree. Keys are unboxed in the page arrays, so deep adds nothing.
+        """
+        def sizeof(page):
+            return sys.getsizeof(page) + sys.getsizeof(page._keys) + sys.getsizeof(page._children)
+
+        pages = self._pool._pages
+        overhead = tree_memory.object_bytes(self) + tree_memory.object_bytes(self._pool) + sys.getsizeof(pages)
+        return tree_memory.report(len(pages), sum(map(sizeof, pages.values())), self._size, overhead,
+                                  () if deep else None)
+
+    def flush(self):
+        """Write back every dirty page and the header."""
+        self._pool.flush()
+        self._write_header()
+
+    def close(self):
+        """Flush and close the file; the tree is unusable afterwards."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def order(self):
+        return self._order
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    def __len__(self):
+        return self._size
+
+    def size(self):
+        return self._size
+
+    def is_empty(self):
+        return self._size == 0
+
+    def __contains__(self, key):
+        return self.search(key)
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def __repr__(self):
+        return f"PagedBTree(size={self._size}, order={self._order}, page_size={self._page_size})"
@@ -1,44 +1,137 @@
+from collections import deque
+from operator import attrgetter
+import sys
+
+import batch_ops
+from frozen_tree import FrozenTree
+import tree_file
+import tree_memory
+
+_node_parts = attrgetter('value', 'left', 'right')
+
+
+RED = True
+BLACK = False
+
+
 class RBNode:
+    __slots__ = 'value', 'color', 'left', 'right', 'parent'  # streamline memory usage
+
         # cnostructor
-    def __init__(self, value, color='red'):
+    def __init__(self, value, color=RED):
         self.value = value
         self.color = color
-        self.left = None
-        self.right = None
-        self.parent = None
+        self.left = NIL
+        self.right = NIL
+        self.parent = NIL
 
     # function to get the grandparent of node
     def grandparent(self):
-        if self.parent is None:
-            return None
         return self.parent.parent
 
     # function to get the sibling of node
     def sibling(self):
-        if self.parent is None:
-            return None
-        if self == self.parent.left:
+        if self.parent is NIL:
+            return NIL
+        if self is self.parent.left:
             return self.parent.right
         return self.parent.left
 
     # function to get the uncle of node
     def uncle(self):
-        if self.parent is None:
-            return None
+        if self.parent is NIL:
+            return NIL
         return self.parent.sibling()
 
+
+# shared black sentinel standing in for every missing child and the root's
+# parent; delete_fix may point its parent somewhere temporarily
+NIL = RBNode.__new__(RBNode)
+NIL.value = None
+NIL.color = BLACK
+NIL.left = NIL.right = NIL.parent = NIL
+
 # function to implement Red Black Tree
 
 
 class RedBlackTree:
+    _node_class = RBNode  # subclasses storing extra data per node swap this
+
         # constructor to initialize the RB tree
     def __init__(self):
-        self.root = None
+        self.root = NIL
+        self._size = 0
+
+    # function to build a valid RB Tree from ascending values in O(n);
+    # the input may be a one-shot iterator and duplicates are skipped
+    @classmethod
+    def from_sorted(cls, iterable):
+        tree = cls()
+        head = tail = NIL
+        count = 0
+        for value in iterable:
+            if tail is not NIL:
+                if value == tail.value:
+                    continue
+                if value < tail.value:
+                    raise ValueError("from_sorted requires values in ascending order")
+            node = cls._node_class(value, BLACK)
+            if tail is NIL:
+                head = node
+            else:
+                tail.right = node
+            tail = node
+            count += 1
+        tree.root = tree._build_balanced(head, count)
+        tree._size = count
+        return tree
+
+    # function to relink a right-chained run of nodes into a balanced subtree;
+    # every level is full except the deepest, whose nodes are colored red
+    def _build_balanced(self, head, count):
+        cursor = head
+        red_depth = (count + 1).bit_length() - 1
+
+        def build(size, depth):
+            nonlocal cursor
+            if size == 0:
+                return NIL
+            half = size // 2
+            left = build(half, depth + 1)
+            node = cursor
+            cursor = node.right
+            node.left = left
+            node.right = build(size - 1 - half, depth + 1)
+            if left is not NIL:
+                left.parent = node
+            if node.right is not NIL:
+                node.right.parent = node
+            if depth == red_depth:
+                node.color = RED
+            return node
+
+        root = build(count, 0)
+        root.parent = NIL
+        return root
+
+    # function to get the number of values in the tree
+    def size(self):
+        return self._size
+
+    # function to check if the tree is empty
+    def is_empty(self):
+        return self._size == 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, value):
+        return self.search(value) is not None
 
     # function to search a value in RB Tree
     def search(self, value):
         curr_node = self.root
-        while curr_node is not None:
+        while curr_node is not NIL:
             if value == curr_node.value:
                 return curr_node
             elif value < curr_node.value:
@@ -47,146 +140,179 @@ class RedBlackTree:
                 curr_node = curr_node.right
         return None
 
-    # function to insert a node in RB Tree, similar to BST insertion
+    # function to insert a node in RB Tree, similar to BST insertion;
+    # values already present are ignored
     def insert(self, value):
-        # Regular insertion
-        new_node = RBNode(value)
-        if self.root is None:
+        nil = NIL
+        parent = nil
+        curr_node = self.root
+        while curr_node is not nil:
+            parent = curr_node
+            if value < curr_node.value:
+                curr_node = curr_node.left
+            elif curr_node.value < value:
+                curr_node = curr_node.right
+            else:
+                return
+
+        new_node = self._node_class(value)
+        new_node.parent = parent
+        if parent is nil:
             self.root = new_node
+        elif value < parent.value:
+            parent.left = new_node
         else:
-            curr_node = self.root
-            while True:
-                if value < curr_node.value:
-                    if curr_node.left is None:
-                        curr_node.left = new_node
-                        new_node.parent = curr_node
-                        break
-                    else:
-                        curr_node = curr_node.left
-                else:
-                    if curr_node.right is None:
-                        curr_node.right = new_node
-                        new_node.parent = curr_node
-                        break
-                    else:
-                        curr_node = curr_node.right
+            parent.right = new_node
+        self._size += 1
         self.insert_fix(new_node)
 
-    # Function to fix RB tree properties after insertion
+    # Function to fix RB tree properties after insertion; parent, grandparent
+    # and uncle are read straight off the links instead of helper calls
     def insert_fix(self, new_node):
-        while new_node.parent and new_node.parent.color == 'red':
-            if new_node.parent == new_node.grandparent().left:
-                uncle = new_node.uncle()
-                if uncle and uncle.color == 'red':
-                    new_node.parent.color = 'black'
-                    uncle.color = 'black'
-                    new_node.grandparent().color = 'red'
-                    new_node = new_node.grandparent()
-                else:
-                    if new_node == new_node.parent.right:
-                        new_node = new_node.parent
-                        self.rotate_left(new_node)
-                    new_node.parent.color = 'black'
-                    new_node.grandparent().color = 'red'
-                    self.rotate_right(new_node.grandparent())
+        parent = new_node.parent
+        while parent.color is RED:
+            grandparent = parent.parent
+            if parent is grandparent.left:
+                uncle = grandparent.right
+                if uncle.color is RED:
+                    parent.color = BLACK
+                    uncle.color = BLACK
+                    grandparent.color = RED
+                    new_node = grandparent
+                    parent = new_node.parent
+                    continue
+                if new_node is parent.right:
+                    self.rotate_left(parent)
+                    new_node, parent = parent, new_node
+                parent.color = BLACK
+                grandparent.color = RED
+                self.rotate_right(grandparent)
             else:
-                uncle = new_node.uncle()
-                if uncle and uncle.color == 'red':
-                    new_node.parent.color = 'black'
-                    uncle.color = 'black'
-                    new_node.grandparent().color = 'red'
-                    new_node = new_node.grandparent()
-                else:
-                    if new_node == new_node.parent.left:
-                        new_node = new_node.parent
-                        self.rotate_right(new_node)
-                    new_node.parent.color = 'black'
-                    new_node.grandparent().color = 'red'
-                    self.rotate_left(new_node.grandparent())
-        self.root.color = 'black'
-
-    # function to delete a value from RB Tree
-    def delete(self, value):
-        node_to_remove = self.search(value)
+                uncle = grandparent.left
+                if uncle.color is RED:
+                    parent.color = BLACK
+                    uncle.color = BLACK
+                    grandparent.color = RED
+                    new_node = grandparent
+                    parent = new_node.parent
+                    continue
+                if new_node is parent.left:
+                    self.rotate_right(parent)
+                    new_node, parent = parent, new_node
+                parent.color = BLACK
+                grandparent.color = RED
+                self.rotate_left(grandparent)
+            break
+        self.root.color = BLACK
 
-        if node_to_remove is None:
-            return
+    # function to delete a value from RB Tree; returns whether it was present
+    def delete(self, value):
+        node = self.search(value)
+        if node is None:
+            return False
 
-        if node_to_remove.left is None or node_to_remove.right is None:
-            self._replace_node(
-                node_to_remove, node_to_remove.left or node_to_remove.right)
+        # the node that is physically unlinked, and the color that leaves the tree
+        removed_color = node.color
+        if node.left is NIL:
+            replacement = node.right
+            self._replace_node(node, replacement)
+        elif node.right is NIL:
+            replacement = node.left
+            self._replace_node(node, replacement)
         else:
-            successor = self._find_min(node_to_remove.right)
-            node_to_remove.value = successor.value
-            self._replace_node(successor, successor.right)
+            successor = self._find_min(node.right)
+            removed_color = successor.color
+            replacement = successor.right
+            if successor.parent is node:
+                replacement.parent = successor
+            else:
+                self._replace_node(successor, replacement)
+                successor.right = node.right
+                successor.right.parent = successor
+            self._replace_node(node, successor)
+            successor.left = node.left
+            successor.left.parent = successor
+            successor.color = node.color
+
+        self._size -= 1
+        self._after_unlink(replacement.parent)
+        if removed_color is BLACK:
+            self.delete_fix(replacement)
+        NIL.parent = NIL
+        return True
 
-        self.delete_fix(node_to_remove)
+    # hook called by delete once the value is unlinked, before any fix-up;
+    # node is the deepest node whose subtree lost a value (NIL if none).
+    # Augmented subclasses refresh their per-node data from there upwards
+    def _after_unlink(self, node):
+        pass
 
-    # function to fix RB Tree properties after deletion
+    # function to fix RB Tree properties after deletion; x is the node that
+    # took the removed node's place (possibly NIL, with its parent set)
     def delete_fix(self, x):
-        while x != self.root and x.color == 'black':
-            if x == x.parent.left:
-                sibling = x.sibling()
-                if sibling.color == 'red':
-                    sibling.color = 'black'
-                    x.parent.color = 'red'
-                    self.rotate_left(x.parent)
-                    sibling = x.sibling()
-                if (sibling.left is None or sibling.left.color == 'black') and (sibling.right is None or sibling.right.color == 'black'):
-                    sibling.color = 'red'
-                    x = x.parent
+        while x is not self.root and x.color is BLACK:
+            parent = x.parent
+            if x is parent.left:
+                sibling = parent.right
+                if sibling.color is RED:
+                    sibling.color = BLACK
+                    parent.color = RED
+                    self.rotate_left(parent)
+                    sibling = parent.right
+                if sibling.left.color is BLACK and sibling.right.color is BLACK:
+                    sibling.color = RED
+                    x = parent
                 else:
-                    if sibling.right is None or sibling.right.color == 'black':
-                        sibling.left.color = 'black'
-                        sibling.color = 'red'
+                    if sibling.right.color is BLACK:
+                        sibling.left.color = BLACK
+                        sibling.color = RED
                         self.rotate_right(sibling)
-                        sibling = x.sibling()
-                    sibling.color = x.parent.color
-                    x.parent.color = 'black'
-                    if sibling.right:
-                        sibling.right.color = 'black'
-                    self.rotate_left(x.parent)
+                        sibling = parent.right
+                    sibling.color = parent.color
+                    parent.color = BLACK
+                    sibling.right.color = BLACK
+                    self.rotate_left(parent)
                     x = self.root
             else:
-                sibling = x.sibling()
-                if sibling.color == 'red':
-                    sibling.color = 'black'
-                    x.parent.color = 'red'
-                    self.rotate_right(x.parent)
-                    sibling = x.sibling()
-                if (sibling.left is None or sibling.left.color == 'black') and (sibling.right is None or sibling.right.color == 'black'):
-                    sibling.color = 'red'
-                    x = x.parent
+                sibling = parent.left
+                if sibling.color is RED:
+                    sibling.color = BLACK
+                    parent.color = RED
+                    self.rotate_right(parent)
+                    sibling = parent.left
+                if sibling.left.color is BLACK and sibling.right.color is BLACK:
+                    sibling.color = RED
+                    x = parent
                 else:
-                    if sibling.left is None or sibling.left.color == 'black':
-                        sibling.right.color = 'black'
-                        sibling.color = 'red'
+                    if sibling.left.color is BLACK:
+                        sibling.right.color = BLACK
+                        sibling.color = RED
                         self.rotate_left(sibling)
-                        sibling = x.sibling()
-                    sibling.color = x.parent.color
-                    x.parent.color = 'black'
-                    if sibling.left:
-                        sibling.left.color = 'black'
-                    self.rotate_right(x.parent)
+                        sibling = parent.left
+                    sibling.color = parent.color
+                    parent.color = BLACK
+                    sibling.left.color = BLACK
+                    self.rotate_right(parent)
                     x = self.root
-        x.color = 'black'
+        x.color = BLACK
 
     # Function for left rotation of RB Tree
     def rotate_left(self, node):
         right_child = node.right
         node.right = right_child.left
 
-        if right_child.left is not None:
+        if right_child.left is not NIL:
             right_child.left.parent = node
 
-        right_child.parent = node.parent
+        parent = node.parent
+        right_child.parent = parent
 
-        if node.parent is None:
+        if parent is NIL:
             self.root = right_child
-        elif node == node.parent.left:
-            node.parent.left = right_child
+        elif node is parent.left:
+            parent.left = right_child
         else:
-            node.parent.right = right_child
+            parent.right = right_child
 
         right_child.left = node
         node.parent = right_child
@@ -196,52 +322,330 @@ class RedBlackTree:
         left_child = node.left
         node.left = left_child.right
 
-        if left_child.right is not None:
+        if left_child.right is not NIL:
             left_child.right.parent = node
 
-        left_child.parent = node.parent
+        parent = node.parent
+        left_child.parent = parent
 
-        if node.parent is None:
+        if parent is NIL:
             self.root = left_child
-        elif node == node.parent.right:
-            node.parent.right = left_child
+        elif node is parent.right:
+            parent.right = left_child
         else:
-            node.parent.left = left_child
+            parent.left = left_child
 
         left_child.right = node
         node.parent = left_child
 
+    # function to check membership of a whole batch in one pass over the tree;
+    # the sorted probes are split at each node so shared path prefixes are
+    # visited once. Returns a NumPy bool mask for array input, else a list
+    def search_many(self, values):
+        return batch_ops.search_many(values, self.root, _node_parts, NIL)
+
+    # function to insert a batch of values in sorted order, returning how
+    # many were new; an empty tree is bulk loaded in O(n) instead
+    def insert_many(self, values):
+        batch = batch_ops.sorted_unique(values)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), before):
+            self._adopt(self.from_sorted(batch_ops.merge_unique(self.iter_inorder(), batch)))
+        else:
+            for value in batch:
+                self.insert(value)
+        return self._size - before
+
+    # function to delete a batch of values, returning how many were present
+    def delete_many(self, values):
+        batch = batch_ops.sorted_unique(values)
+        before = self._size
+        if batch_ops.prefer_rebuild(len(batch), before):
+            self._adopt(self.from_sorted(batch_ops.subtract_sorted(self.iter_inorder(), batch)))
+        else:
+            for value in batch:
+                self.delete(value)
+        return before - self._size
+
+    # function to return a new tree of the values in this tree or other;
+    # other may be any tree or iterable yielding ascending values (repeats
+    # are skipped, and a value out of order raises ValueError in every set
+    # operation, in-place forms included), and the merged inorder streams
+    # are bulk loaded in O(n + m)
+    def union(self, other):
+        return self.from_sorted(batch_ops.merge_unique(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    # function to return a new tree of the values in both trees
+    def intersection(self, other):
+        return self.from_sorted(batch_ops.intersect_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    # function to return a new tree of the values in this tree but not in other
+    def difference(self, other):
+        return self.from_sorted(batch_ops.subtract_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    # function to return a new tree of the values in exactly one of the trees
+    def symmetric_difference(self, other):
+        return self.from_sorted(batch_ops.symmetric_difference_sorted(self.iter_inorder(), list(batch_ops.ascending(other))))
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __xor__(self, other):
+        return self.symmetric_difference(other)
+
+    # in-place variants; |= and -= go through insert_many/delete_many, which
+    # insert or delete one by one when other is small
+    def __ior__(self, other):
+        self.insert_many(list(batch_ops.ascending(other)))
+        return self
+
+    def __iand__(self, other):
+        self._adopt(self.intersection(other))
+        return self
+
+    def __isub__(self, other):
+        self.delete_many(list(batch_ops.ascending(other)))
+        return self
+
+    def __ixor__(self, other):
+        self._adopt(self.symmetric_difference(other))
+        return self
+
+    # function to take over the nodes of another tree
+    def _adopt(self, other):
+        self.root = other.root
+        self._size = other._size
+
     # function to replace an old node with a new node
+    # (NIL included, so delete_fix can walk up from it)
     def _replace_node(self, old_node, new_node):
-        if old_node.parent is None:
+        if old_node.parent is NIL:
             self.root = new_node
+        elif old_node is old_node.parent.left:
+            old_node.parent.left = new_node
         else:
-            if old_node == old_node.parent.left:
-                old_node.parent.left = new_node
-            else:
-                old_node.parent.right = new_node
-        if new_node is not None:
-            new_node.parent = old_node.parent
+            old_node.parent.right = new_node
+        new_node.parent = old_node.parent
 
     # function to find node with minimum value in a subtree
     def _find_min(self, node):
-        while node.left is not None:
+        while node.left is not NIL:
             node = node.left
         return node
 
     # function to perform inorder traversal
     def _inorder_traversal(self, node):
-        if node is not None:
+        if node is not NIL:
             self._inorder_traversal(node.left)
             print(node.value, end=" ")
             self._inorder_traversal(node.right)
 
+    # function to lazily yield values in sorted order using O(height) memory
+    def iter_inorder(self):
+        stack = []
+        node = self.root
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node.value
+                node = node.right
+
+    # function to return all values within the range [min_val, max_val]
+    def range_query(self, min_val, max_val):
+        return list(self.iter_range(min_val, max_val))
+
+    # function to lazily yield values within [min_val, max_val] in sorted
+    # order, skipping left subtrees that lie entirely below min_val
+    def iter_range(self, min_val, max_val):
+        stack = []
+        node = self.root
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append(node)
+                node = node.left if node.value > min_val else NIL
+            else:
+                node = stack.pop()
+                if node.value > max_val:
+                    return
+                if node.value >= min_val:
+                    yield node.value
+                node = node.right
+
+    # function to lazily yield values in descending order using O(height) memory
+    def iter_reverse(self):
+        stack = []
+        node = self.root
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append(node)
+                node = node.right
+            else:
+                node = stack.pop()
+                yield node.value
+                node = node.left
+
+    # function to lazily yield values in preorder (node, left, right)
+    def iter_preorder(self):
+        if self.root is NIL:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            yield node.value
+            if node.right is not NIL:
+                stack.append(node.right)
+            if node.left is not NIL:
+                stack.append(node.left)
+
+    # function to lazily yield values in postorder (left, right, node)
+    def iter_postorder(self):
+        stack = []
+        node = self.root
+        last = None
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append(node)
+                node = node.left
+            else:
+                top = stack[-1]
+                if top.right is not NIL and top.right is not last:
+                    node = top.right
+                else:
+                    yield top.value
+                    last = stack.pop()
+
+    # function to lazily yield values breadth-first, down to max_depth if given
+    def iter_level_order(self, max_depth=None):
+        if self.root is NIL:
+            return
+        queue = deque([self.root])
+        depth = 0
+        while queue:
+            expand = max_depth is None or depth < max_depth
+            for _ in range(len(queue)):
+                node = queue.popleft()
+                yield node.value
+                if expand:
+                    if node.left is not NIL:
+                        queue.append(node.left)
+                    if node.right is not NIL:
+                        queue.append(node.right)
+            if not expand:
+                return
+            depth += 1
+
+    # function to lazily yield one list of values per level, down to max_depth if given
+    def iter_levels(self, max_depth=None):
+        level = [self.root] if self.root is not NIL else []
+        depth = 0
+        while level and (max_depth is None or depth <= max_depth):
+            yield [node.value for node in level]
+            next_level = []
+            for node in level:
+                if node.left is not NIL:
+                    next_level.append(node.left)
+                if node.right is not NIL:
+                    next_level.append(node.right)
+            level = next_level
+            depth += 1
+
+    # function to write the tree to a binary snapshot file (see tree_file)
+    def dump(self, path):
+        tree_file.dump(self, path)
+
+    # function to load a snapshot written by dump(); mmap=True returns a
+    # read-only MappedTree served straight off the file, and pickled keys
+    # load only with allow_pickle=True (see tree_file.load)
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        return tree_file.load(cls, path, mmap=mmap, allow_pickle=allow_pickle)
+
+    # function to collect the inorder node depths and packed color bits
+    def _dump_columns(self):
+        depths = []
+        reds = []
+        stack = []
+        node = self.root
+        depth = 0
+        while stack or node is not NIL:
+            if node is not NIL:
+                stack.append((node, depth))
+                node = node.left
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                depths.append(depth)
+                reds.append(node.color)
+                node = node.right
+                depth += 1
+        return {b'DPTH': tree_file.compact_uints(depths), b'COLR': tree_file.pack_bits(reds)}
+
+    # function to rebuild the exact tree from inorder values, depths and
+    # colors in O(n); the stack holds the right spine built so far
+    @classmethod
+    def _load_columns(cls, values, columns):
+        depths = columns.get(b'DPTH')
+        colors = columns.get(b'COLR')
+        if depths is None or colors is None or len(depths) != len(values):
+            return cls.from_sorted(values)
+        tree = cls()
+        tree._size = len(values)
+        stack = []
+        reds = tree_file.unpack_bits(colors, len(values))
+        for value, depth, red in zip(values, depths, reds):
+            node = cls._node_class(value, red)
+            child = NIL
+            while stack and stack[-1][1] > depth:
+                child = stack.pop()[0]
+            node.left = child
+            if child is not NIL:
+                child.parent = node
+            if stack:
+                node.parent = stack[-1][0]
+                node.parent.right = node
+            else:
+                tree.root = node
+            stack.append((node, depth))
+        return tree
+
+    # function to report node count, bytes per node, total bytes and bytes
+    # per key, walking the nodes iteratively; the shared NIL sentinel is
+    # counted once as overhead and keys only with deep=True
+    def memory_report(self, deep=False):
+        def children(node):
+            return (child for child in (node.left, node.right) if child is not NIL)
+
+        root = self.root if self.root is not NIL else None
+        nodes, node_bytes = tree_memory.walk(root, children)
+        overhead = tree_memory.object_bytes(self) + sys.getsizeof(NIL)
+        return tree_memory.report(nodes, node_bytes, self._size, overhead,
+                                  self.iter_inorder() if deep else None)
+
+    # function to take an immutable Eytzinger-ordered FrozenTree snapshot
+    def freeze(self):
+        return FrozenTree(self.iter_inorder())
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
+
 
     def display(self, node=None, indent="", last='updown'):
         """Prints the Red-Black Tree in a structured format."""
         if node is None:
             node = self.root
-        if node is not None:
+        if node is not NIL:
             updown = '── '
             if last == 'up':
                 branch = '┌' + updown
@@ -249,13 +653,12 @@ class RedBlackTree:
                 branch = '└' + updown
             else:
                 branch = '── '
-            color = 'R' if node.color == 'red' else 'B'
+            color = 'R' if node.color is RED else 'B'
             print(indent + branch + f"{node.value}({color})")
             indent += "   " if last == 'up' else "│  " if last == 'down' else "   "
-            if node.left or node.right:
-                if node.right:
-                    self.display(node.right, indent, last='up')
-                if node.left:
-                    self.display(node.left, indent, last='down')
+            if node.right is not NIL:
+                self.display(node.right, indent, last='up')
+            if node.left is not NIL:
+                self.display(node.left, indent, last='down')
 
 
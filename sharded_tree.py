@@ -0,0 +1,360 @@
+"""Sorted key set range-partitioned over trees held by worker processes.
+
+ShardedTree keeps its keys in shards, each an AVLTree or RedBlackTree that
+owns one contiguous key range and lives in one of a fixed pool of worker
+processes (a worker may host several shards). Batches are sorted once, cut
+at the shard boundaries and sent to every worker involved before any reply
+is awaited, so the workers run their part of insert_many, delete_many,
+search_many or range_query in parallel. Shards hold disjoint, ordered
+ranges, so concatenating their answers in shard order is already the
+merged sorted result.
+
+The first batch is cut into one shard per worker. Whenever an insert leaves
+a shard with more than max_shard_size keys it is split into pieces of about
+half that size; the first piece stays put and the others are bulk loaded on
+the workers holding the fewest keys, which keeps the load spread out.
+Whenever a delete leaves a shard below min_shard_size keys (empty shards
+included) it is merged into its smaller neighbour, as long as the pair fits
+in max_shard_size: the smaller of the two hands its keys to the other, so
+range queries and batches stop fanning out over near-empty shards.
+
+Keys travel between processes by pickling, so only batches of thousands of
+keys or more gain from the parallelism.
+"""
+from bisect import bisect_left, bisect_right
+import multiprocessing
+import os
+
+from avl_tree_skeleton import AVLTree
+import batch_ops
+from redblack_tree_skeleton import RedBlackTree
+
+DEFAULT_MAX_SHARD_SIZE = 1_000_000
+
+_TREES = {'avl': AVLTree, 'redblack': RedBlackTree}
+
+
+# Commands run inside a worker on one of its shards
+
+def _create(shards, cls, shard_id, keys):
+    shards[shard_id] = cls.from_sorted(keys)
+    return len(keys)
+
+
+def _insert_many(shards, cls, shard_id, keys):
+    tree = shards[shard_id]
+    return tree.insert_many(keys), tree.size()
+
+
+def _delete_many(shards, cls, shard_id, keys):
+    tree = shards[shard_id]
+    return tree.delete_many(keys), tree.size()
+
+
+def _search_many(shards, cls, shard_id, keys):
+    return shards[shard_id].search_many(keys)
+
+
+def _range_query(shards, cls, shard_id, low, high):
+    return shards[shard_id].range_query(low, high)
+
+
+def _keys(shards, cls, shard_id):
+    return list(shards[shard_id].iter_inorder())
+
+
+def _take(shards, cls, shard_id):
+    """Remove a shard, returning its keys."""
+    return list(shards.pop(shard_id).iter_inorder())
+
+
+def _split(shards, cls, shard_id, pieces):
+    """Keep the lowest of pieces equal parts and return the others' keys."""
+    keys = list(shards[shard_id].iter_inorder())
+    parts = [keys[len(keys) * i // pieces:len(keys) * (i + 1) // pieces] for i in range(pieces)]
+    shards[shard_id] = cls.from_sorted(parts[0])
+    return parts[1:]
+
+
+_COMMANDS = {
+    'create': _create,
+    'insert_many': _insert_many,
+    'delete_many': _delete_many,
+    'search_many': _search_many,
+    'range_query': _range_query,
+    'keys': _keys,
+    'split': _split,
+    'take': _take,
+}
+
+
+def _serve(connection, kind):
+    """Worker loop: run batches of (command, jobs) until told to stop with None."""
+    cls = _TREES[kind]
+    shards = {}
+    while True:
+        message = connection.recv()
+        if message is None:
+            connection.close()
+            return
+        command, jobs = message
+        try:
+            run = _COMMANDS[command]
+            results = [run(shards, cls, *job) for job in jobs]
+        except Exception as error:
+            connection.send((False, error))
+        else:
+            connection.send((True, results))
+
+
+class ShardedTree():
+    """Sorted set of keys spread over range-partitioned shards in worker processes."""
+
+    KINDS = tuple(_TREES)
+
+    def __init__(self, workers=None, kind='avl', max_shard_size=DEFAULT_MAX_SHARD_SIZE, min_shard_size=None):
+        """Start workers processes (default: one per CPU) holding kind trees.
+
+        min_shard_size is the low-water mark below which a shard is merged
+        into a neighbour, max_shard_size // 16 by default; 0 never merges.
+        """
+        if kind not in _TREES:
+            raise ValueError(f"kind must be one of {self.KINDS}")
+        if max_shard_size < 2:
+            raise ValueError("a shard must be allowed at least two keys")
+        if min_shard_size is None:
+            min_shard_size = max_shard_size // 16
+        if not 0 <= min_shard_size < max_shard_size:
+            raise ValueError("min_shard_size must be at least 0 and below max_shard_size")
+        workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context()
+        self._connections = []
+        self._processes = []
+        for _ in range(workers):
+            connection, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child, kind), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        self.kind = kind
+        self.max_shard_size = max_shard_size
+        self.min_shard_size = min_shard_size
+        self._bounds = []  # the lowest key of every shard but the first
+        self._shards = []  # (shard id, worker) in key order
+        self._sizes = []
+        self._load = [0] * workers  # keys held per worker
+        self._next_id = 0
+        self._size = 0
+
+    def _run(self, command, jobs):
+        """Run (worker, job) pairs, every worker in parallel; returns results in job order."""
+        batches = {}
+        for position, (worker, job) in enumerate(jobs):
+            batches.setdefault(worker, []).append((position, job))
+        for worker, batch in batches.items():
+            self._connections[worker].send((command, [job for _, job in batch]))
+        results = [None] * len(jobs)
+        error = None
+        for worker, batch in batches.items():
+            ok, answer = self._connections[worker].recv()
+            if not ok:
+                error = answer
+                continue
+            for (position, _), result in zip(batch, answer):
+                results[position] = result
+        if error is not None:
+            raise error
+        return results
+
+    def _route(self, keys):
+        """Cut ascending keys at the shard bounds: [(shard index, start, stop), ...], empty cuts skipped."""
+        cuts = [0] + [bisect_left(keys, bound) for bound in self._bounds] + [len(keys)]
+        return [(index, cuts[index], cuts[index + 1])
+                for index in range(len(self._shards)) if cuts[index] < cuts[index + 1]]
+
+    def _batch_jobs(self, routed, keys):
+        return [(self._shards[index][1], (self._shards[index][0], keys[start:stop]))
+                for index, start, stop in routed]
+
+    def _new_shard(self):
+        shard_id = self._next_id
+        self._next_id += 1
+        worker = min(range(len(self._load)), key=self._load.__getitem__)
+        return shard_id, worker
+
+    def _place(self, parts):
+        """Create one shard per key list on the least loaded workers; returns their (id, worker)."""
+        placed = []
+        jobs = []
+        for keys in parts:
+            shard_id, worker = self._new_shard()
+            self._load[worker] += len(keys)
+            placed.append((shard_id, worker))
+            jobs.append((worker, (shard_id, keys)))
+        self._run('create', jobs)
+        return placed
+
+    def insert_many(self, elements):
+        """Insert a batch of keys, returning how many were new."""
+        batch = batch_ops.sorted_unique(elements)
+        if not batch:
+            return 0
+        if not self._shards:
+            return self._load_first(batch)
+        routed = self._route(batch)
+        results = self._run('insert_many', self._batch_jobs(routed, batch))
+        added = 0
+        for (index, _, _), (new, size) in zip(routed, results):
+            added += new
+            self._load[self._shards[index][1]] += size - self._sizes[index]
+            self._sizes[index] = size
+        self._size += added
+        self._split_oversized()
+        return added
+
+    def _load_first(self, batch):
+        pieces = max(min(len(self._load), len(batch)), -(-len(batch) // (self.max_shard_size // 2)))
+        parts = [batch[len(batch) * i // pieces:len(batch) * (i + 1) // pieces] for i in range(pieces)]
+        self._shards = self._place(parts)
+        self._bounds = [part[0] for part in parts[1:]]
+        self._sizes = [len(part) for part in parts]
+        self._size = len(batch)
+        return len(batch)
+
+    def _split_oversized(self):
+        """Split every shard above max_shard_size into pieces of about half that size."""
+        half = self.max_shard_size // 2
+        oversized = [index for index, size in enumerate(self._sizes) if size > self.max_shard_size]
+        if not oversized:
+            return
+        jobs = [(self._shards[index][1], (self._shards[index][0], -(-self._sizes[index] // half)))
+                for index in oversized]
+        split_off = self._run('split', jobs)
+        # Work from the right so the indices of shards still to update stay valid
+        for index, parts in reversed(list(zip(oversized, split_off))):
+            moved = sum(map(len, parts))
+            self._load[self._shards[index][1]] -= moved
+            self._sizes[index] -= moved
+            self._shards[index + 1:index + 1] = self._place(parts)
+            self._bounds[index:index] = [part[0] for part in parts]
+            self._sizes[index + 1:index + 1] = [len(part) for part in parts]
+
+    def delete_many(self, elements):
+        """Delete a batch of keys, returning how many were present."""
+        batch = batch_ops.sorted_unique(elements)
+        if not batch or not self._shards:
+            return 0
+        routed = self._route(batch)
+        results = self._run('delete_many', self._batch_jobs(routed, batch))
+        removed = 0
+        for (index, _, _), (gone, size) in zip(routed, results):
+            removed += gone
+            self._load[self._shards[index][1]] -= gone
+            self._sizes[index] = size
+        self._size -= removed
+        self._merge_undersized()
+        return removed
+
+    def _merge_undersized(self):
+        """Merge every shard below min_shard_size into its smaller neighbour while the pair fits."""
+        index = 0
+        while index < len(self._shards) and len(self._shards) > 1:
+            if self._sizes[index] >= self.min_shard_size:
+                index += 1
+                continue
+            neighbours = [n for n in (index - 1, index + 1) if 0 <= n < len(self._shards)]
+            partner = min(neighbours, key=self._sizes.__getitem__)
+            if self._sizes[index] + self._sizes[partner] > self.max_shard_size:
+                index += 1
+                continue
+            index = min(index, partner)
+            self._merge_pair(index)  # the merged shard is checked again
+
+    def _merge_pair(self, first):
+        """Merge shards first and first + 1; the smaller hands its keys to the larger."""
+        second = first + 1
+        keep, drop = (first, second) if self._sizes[first] >= self._sizes[second] else (second, first)
+        (keep_id, keep_worker), (drop_id, drop_worker) = self._shards[keep], self._shards[drop]
+        keys = self._run('take', [(drop_worker, (drop_id,))])[0]
+        size = self._sizes[keep]
+        if keys:
+            _, size = self._run('insert_many', [(keep_worker, (keep_id, keys))])[0]
+        self._load[drop_worker] -= len(keys)
+        self._load[keep_worker] += len(keys)
+        self._shards[first] = (keep_id, keep_worker)
+        self._sizes[first] = size
+        del self._shards[second], self._sizes[second], self._bounds[first]
+
+    def search_many(self, elements):
+        """Return the membership of every key, in input order.
+
+        Returns a NumPy bool mask for array input, otherwise a list.
+        """
+        probes, order, array_input = batch_ops.sort_probes(elements)
+        found = [False] * len(probes)
+        if self._shards and probes:
+            routed = self._route(probes)
+            results = self._run('search_many', self._batch_jobs(routed, probes))
+            for (_, start, _), hits in zip(routed, results):
+                for offset, hit in enumerate(hits):
+                    found[order[start + offset]] = hit
+        return batch_ops.as_result(found, array_input)
+
+    def search(self, element):
+        """Return True if element is in the tree."""
+        return self.search_many([element])[0]
+
+    def range_query(self, min_val, max_val):
+        """Return every key within [min_val, max_val] in sorted order, asking the shards in parallel."""
+        if max_val < min_val or not self._shards:
+            return []
+        first = bisect_right(self._bounds, min_val)
+        last = bisect_right(self._bounds, max_val)
+        parts = self._run('range_query', [(self._shards[index][1], (self._shards[index][0], min_val, max_val))
+                                          for index in range(first, last + 1)])
+        return [key for part in parts for key in part]
+
+    def iter_inorder(self):
+        """Lazily yield every key in sorted order, fetching one shard at a time."""
+        for shard_id, worker in self._shards:
+            yield from self._run('keys', [(worker, (shard_id,))])[0]
+
+    def shard_sizes(self):
+        """Return the number of keys of every shard, in key order."""
+        return list(self._sizes)
+
+    def worker_loads(self):
+        """Return the number of keys held by every worker process."""
+        return list(self._load)
+
+    def size(self):
+        return self._size
+
+    def is_empty(self):
+        return self._size == 0
+
+    def close(self):
+        """Stop the worker processes; the tree is unusable afterwards."""
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                connection.send(None)
+            process.join()
+            connection.close()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, element):
+        return self.search(element)
+
+    def __iter__(self):
+        return self.iter_inorder()
@@ -0,0 +1,57 @@
+"""Linear-time bulk loading shared by the from_sorted() of the linked binary trees.
+
+link_sorted chains one new node per distinct element through _right, and
+build_balanced relinks such a chain into a perfectly balanced subtree,
+setting _left/_right/_parent. Each tree passes its own node class and a
+finish(node, size) callback that fills in what its nodes keep beyond the
+links (subtree size, height), called once the node's children are in place.
+"""
+
+
+def link_sorted(iterable, make_node):
+    """Chain new nodes through _right, returning (head, count).
+
+    The input may be a one-shot iterator; it is consumed once and never
+    copied into a list. Duplicate elements are skipped.
+    """
+    head = tail = None
+    count = 0
+    for element in iterable:
+        if tail is not None:
+            if element == tail._element:
+                continue
+            if element < tail._element:
+                raise ValueError("from_sorted requires elements in ascending order")
+        node = make_node(element)
+        if tail is None:
+            head = node
+        else:
+            tail._right = node
+        tail = node
+        count += 1
+    return head, count
+
+
+def build_balanced(head, count, finish):
+    """Relink a _right-chained run of count nodes into a balanced subtree and return its root."""
+    cursor = head
+
+    def build(size):
+        nonlocal cursor
+        if size == 0:
+            return None
+        half = size // 2
+        left = build(half)
+        node = cursor
+        cursor = node._right
+        node._left = left
+        node._right = build(size - 1 - half)
+        if left is not None:
+            left._parent = node
+        if node._right is not None:
+            node._right._parent = node
+        finish(node, size)
+        return node
+
+    # Recursion depth is only log2(count)
+    return build(count)
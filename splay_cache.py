@@ -0,0 +1,175 @@
+"""Capacity-bounded key -> value cache on top of SplayTree.
+
+Every get/put splays its key to the root, so hot keys stay near the top and
+the tree never grows past capacity entries: once a put goes over, one cold
+entry is evicted. Two policies pick it:
+
+- 'lru' evicts the least recently used key, tracked in an OrderedDict
+  alongside the tree.
+- 'deep' evicts a leaf reached from the root by always stepping into the
+  larger subtree. Nodes far from the root of a splay tree are the ones not
+  touched lately, so this approximates LRU without any per-key bookkeeping.
+
+Evicted entries are unlinked in place, without splaying, so eviction leaves
+the hot top of the tree alone. Subtree sizes and parent pointers are kept
+current, so either splaying engine can be used.
+"""
+from collections import OrderedDict
+
+from splay_tree_skeleton import SplayTree
+
+_MISSING = object()
+
+
+class SplayCache(SplayTree):
+    """Splay tree of at most capacity keys, each holding a value."""
+
+    class _Node(SplayTree._Node):
+        __slots__ = '_value',
+
+        def __init__(self, element, parent=None, left=None, right=None):
+            super().__init__(element, parent, left, right)
+            self._value = None
+
+    POLICIES = ('lru', 'deep')
+
+    def __init__(self, capacity, policy='lru', engine='bottom_up'):
+        if capacity < 1:
+            raise ValueError("the cache needs room for at least one entry")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}")
+        super().__init__(engine)
+        self.capacity = capacity
+        self.policy = policy
+        self._recency = OrderedDict() if policy == 'lru' else None
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the value cached for key (splaying it to the root), or default."""
+        if self._root is not None and self.search(key):
+            self.hits += 1
+            if self._recency is not None:
+                self._recency.move_to_end(key)
+            return self._root._value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Cache value under key, evicting a cold entry if the cache is full."""
+        size = self._size
+        super().insert(key)
+        self._root._value = value
+        if self._recency is not None:
+            self._recency[key] = None
+            self._recency.move_to_end(key)
+        if self._size > size:
+            while self._size > self.capacity:
+                self._evict()
+
+    def get_or_compute(self, key, fn):
+        """Return the cached value for key, or cache and return fn(key) on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = fn(key)
+            self.put(key, value)
+        return value
+
+    def insert(self, key):
+        """Cache key with the value None."""
+        self.put(key, None)
+
+    def delete(self, key):
+        """Drop key from the cache; returns whether it was present."""
+        if not super().delete(key):
+            return False
+        if self._recency is not None:
+            del self._recency[key]
+        return True
+
+    def clear(self):
+        super().clear()
+        if self._recency is not None:
+            self._recency.clear()
+
+    def split(self, element):
+        raise TypeError("a SplayCache cannot be split")
+
+    def join(self, other_tree):
+        raise TypeError("a SplayCache cannot be joined")
+
+    def _evict(self):
+        """Remove one cold entry chosen by the policy."""
+        if self._recency is not None:
+            key, _ = self._recency.popitem(last=False)
+            path = []
+            node = self._root
+            while node._element != key:
+                path.append(node)
+                node = node._left if key < node._element else node._right
+        else:
+            path = []
+            node = self._root
+            while True:
+                left, right = node._left, node._right
+                if left is None and right is None:
+                    break
+                path.append(node)
+                if right is None or (left is not None and left._count > right._count):
+                    node = left
+                else:
+                    node = right
+        self._unlink(path, node)
+        self.evictions += 1
+
+    def _unlink(self, path, node):
+        """Remove node, reached from the root through path, without splaying."""
+        if node._left is not None and node._right is not None:
+            # Move the in-order successor's entry here and remove that node,
+            # which has no left child
+            path.append(node)
+            successor = node._right
+            while successor._left is not None:
+                path.append(successor)
+                successor = successor._left
+            node._element, node._value = successor._element, successor._value
+            node = successor
+        child = node._left if node._left is not None else node._right
+        parent = path[-1] if path else None
+        if parent is None:
+            self._root = child
+        elif parent._left is node:
+            parent._left = child
+        else:
+            parent._right = child
+        self._set_parent(child, parent)
+        for ancestor in path:
+            ancestor._count -= 1
+        node._left = node._right = node._parent = None
+        self._size -= 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': self._size,
+            'capacity': self.capacity,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
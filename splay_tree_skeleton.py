@@ -1,27 +1,145 @@
+from collections import deque
+import random
+
+from frozen_tree import FrozenTree
+import sorted_build
+import tree_file
+import tree_memory
+
+
+class _Extreme:
+    """Probe that compares below (or above) every element, to splay the min (or max)."""
+    __slots__ = '_below',
+
+    def __init__(self, below):
+        self._below = below
+
+    def __lt__(self, other):
+        return self._below
+
+    def __gt__(self, other):
+        return not self._below
+
+
+_LOWEST = _Extreme(True)
+_HIGHEST = _Extreme(False)
+
+
 class SplayTree:
     class _Node:
         """Lightweight, nonpublic class for storing a node."""
-        __slots__ = '_element', '_parent', '_left', '_right'
+        __slots__ = '_element', '_parent', '_left', '_right', '_count'
         
         def __init__(self, element, parent=None, left=None, right=None):
             self._element = element
             self._parent = parent
             self._left = left
             self._right = right
+            self._count = 1  # number of nodes in this subtree
     
-    def __init__(self):
-        """Create an initially empty splay tree."""
+    ENGINES = ('bottom_up', 'top_down')
+    SPLAY_POLICIES = ('always', 'semi', 'depth', 'random')
+
+    def __init__(self, engine='bottom_up', splay_policy='always', min_depth=16, probability=0.25):
+        """Create an initially empty splay tree.
+
+        engine picks how accesses are splayed: 'bottom_up' descends first
+        and then rotates the node up through its parent pointers, while
+        'top_down' restructures in the same single pass that searches
+        (Sleator-Tarjan) and never reads or maintains parent pointers.
+
+        splay_policy picks when search restructures. 'always' splays every
+        access. 'semi' semi-splays (bottom_up only): zig-zig steps rotate
+        the parent up and carry on from there, roughly halving the path
+        instead of bringing the node to the root. 'depth' splays only
+        accesses at least min_depth edges below the root, and 'random'
+        splays an access with the given probability. Inserts and deletes
+        always splay.
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine must be one of {self.ENGINES}")
         self._root = None
         self._size = 0
+        self._top_down = engine == 'top_down'
+        self._policy = 'always'
+        self.splay_policy = splay_policy
+        self.min_depth = min_depth
+        self.probability = probability
+        self._random = random.Random()
+
+    @property
+    def engine(self):
+        """The splaying engine, 'bottom_up' or 'top_down'; may be switched at any time."""
+        return 'top_down' if self._top_down else 'bottom_up'
+
+    @engine.setter
+    def engine(self, engine):
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine must be one of {self.ENGINES}")
+        if engine == 'top_down' and self._policy == 'semi':
+            raise ValueError("semi-splaying needs the bottom_up engine")
+        if self._top_down and engine == 'bottom_up':
+            self._relink_parents()
+        self._top_down = engine == 'top_down'
+
+    @property
+    def splay_policy(self):
+        """When search splays: 'always', 'semi', 'depth' or 'random'."""
+        return self._policy
+
+    @splay_policy.setter
+    def splay_policy(self, policy):
+        if policy not in self.SPLAY_POLICIES:
+            raise ValueError(f"splay_policy must be one of {self.SPLAY_POLICIES}")
+        if policy == 'semi' and self._top_down:
+            raise ValueError("semi-splaying needs the bottom_up engine")
+        self._policy = policy
+
+    def _relink_parents(self):
+        """Point every _parent at the right node again after top-down splaying."""
+        if self._root is None:
+            return
+        self._root._parent = None
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for child in (node._left, node._right):
+                if child is not None:
+                    child._parent = node
+                    stack.append(child)
+    
+    @classmethod
+    def from_sorted(cls, iterable):
+        """Build a perfectly balanced tree from ascending elements in O(n).
+
+        The input may be a one-shot iterator; it is consumed once and never
+        copied into a list. Duplicate elements are skipped, like insert().
+        """
+        tree = cls()
+        head, count = sorted_build.link_sorted(iterable, cls._Node)
+        tree._root = sorted_build.build_balanced(head, count, tree._set_count)
+        tree._size = count
+        return tree
+
+    @staticmethod
+    def _set_count(node, size):
+        node._count = size
     
     def _set_parent(self, child, parent):
         """Helper to set parent-child relationship."""
         if child is not None:
             child._parent = parent
     
+    def _subtree_size(self, node):
+        return node._count if node is not None else 0
+
+    def _update_count(self, node):
+        node._count = 1 + self._subtree_size(node._left) + self._subtree_size(node._right)
+
     def _rotate_right(self, node):
         """Rotate right around node."""
         left_child = node._left
+        left_child._count = node._count
         node._left = left_child._right
         self._set_parent(node._left, node)
         
@@ -35,11 +153,14 @@ class SplayTree:
         
         left_child._right = node
         node._parent = left_child
+        node._count = (1 + (node._left._count if node._left is not None else 0)
+                       + (node._right._count if node._right is not None else 0))
         return left_child
     
     def _rotate_left(self, node):
         """Rotate left around node."""
         right_child = node._right
+        right_child._count = node._count
         node._right = right_child._left
         self._set_parent(node._right, node)
         
@@ -53,6 +174,8 @@ class SplayTree:
         
         right_child._left = node
         node._parent = right_child
+        node._count = (1 + (node._left._count if node._left is not None else 0)
+                       + (node._right._count if node._right is not None else 0))
         return right_child
     
     def _splay(self, node):
@@ -87,14 +210,163 @@ class SplayTree:
                     self._rotate_left(parent)
                     self._rotate_right(grandparent)
     
+    def _semi_splay(self, node):
+        """Semi-splay node towards the root.
+
+        Zig-zag steps are the same as in a splay, but a zig-zig step only
+        rotates the parent over the grandparent and continues from the
+        parent, so node ends up about half as deep rather than at the root.
+        """
+        while node._parent is not None:
+            parent = node._parent
+            grandparent = parent._parent
+            if grandparent is None:
+                if node is parent._left:
+                    self._rotate_right(parent)
+                else:
+                    self._rotate_left(parent)
+                return
+            if node is parent._left:
+                if parent is grandparent._left:
+                    self._rotate_right(grandparent)
+                    node = parent
+                else:
+                    self._rotate_right(parent)
+                    self._rotate_left(grandparent)
+            elif parent is grandparent._right:
+                self._rotate_left(grandparent)
+                node = parent
+            else:
+                self._rotate_left(parent)
+                self._rotate_right(grandparent)
+
+    def _splay_top_down(self, root, element):
+        """Splay element (or the last node on its search path) to the top of root's subtree.
+
+        Single top-down pass: nodes passed on the way down are hung off the
+        right spine of a left tree or the left spine of a right tree, with a
+        rotation first on zig-zig steps, and the three parts are reassembled
+        at the end. Returns the new subtree root; parent pointers are ignored.
+        Subtree sizes are fixed up with one more walk down each spine.
+        """
+        header = self._Node(None)
+        left_max = right_min = header
+        left_count = right_count = 0  # sizes of the left and right trees so far
+        node = root
+        while True:
+            if element < node._element:
+                child = node._left
+                if child is None:
+                    break
+                if element < child._element:
+                    # Zig-zig: rotate right before linking
+                    node._left = inner = child._right
+                    child._right = node
+                    node._count = (1 + (inner._count if inner is not None else 0)
+                                   + (node._right._count if node._right is not None else 0))
+                    node = child
+                    if node._left is None:
+                        break
+                # Park the size of the right tree linked so far in the count;
+                # the true size is filled in once the right tree is complete
+                right_min._left = node
+                right_min = node
+                node._count = right_count
+                right_count += 1 + (node._right._count if node._right is not None else 0)
+                node = node._left
+            elif node._element < element:
+                child = node._right
+                if child is None:
+                    break
+                if child._element < element:
+                    # Zig-zig: rotate left before linking
+                    node._right = inner = child._left
+                    child._left = node
+                    node._count = (1 + (inner._count if inner is not None else 0)
+                                   + (node._left._count if node._left is not None else 0))
+                    node = child
+                    if node._right is None:
+                        break
+                left_max._right = node
+                left_max = node
+                node._count = left_count
+                left_count += 1 + (node._left._count if node._left is not None else 0)
+                node = node._right
+            else:
+                break
+        left_max._right = node._left
+        right_min._left = node._right
+
+        # Each spine node holds everything linked after it plus the middle
+        # node's subtree on that side
+        left_count += node._left._count if node._left is not None else 0
+        if left_max is not header:
+            linked = header._right
+            while True:
+                linked._count = left_count - linked._count
+                if linked is left_max:
+                    break
+                linked = linked._right
+        right_count += node._right._count if node._right is not None else 0
+        if right_min is not header:
+            linked = header._left
+            while True:
+                linked._count = right_count - linked._count
+                if linked is right_min:
+                    break
+                linked = linked._left
+
+        node._left = header._right
+        node._right = header._left
+        node._count = 1 + left_count + right_count
+        return node
+
     def search(self, element):
         """Search for an element and splay it to root if found."""
+        if self._policy != 'always':
+            return self._search_by_policy(element)
+        if self._top_down:
+            if self._root is None:
+                return False
+            self._root = self._splay_top_down(self._root, element)
+            return self._root._element == element
         node = self._find_node(element)
         if node is not None:
             self._splay(node)
             return True
         return False
     
+    def _search_by_policy(self, element):
+        """Descend without restructuring, then splay only if the policy says so."""
+        node = self._root
+        last_node = None
+        depth = -1
+        while node is not None:
+            depth += 1
+            if element == node._element:
+                break
+            last_node = node
+            node = node._left if element < node._element else node._right
+        else:
+            # Not found: the last node on the path is the one restructured
+            node = last_node
+            if node is None:
+                return False
+        policy = self._policy
+        if policy == 'semi':
+            self._semi_splay(node)
+            return node._element == element
+        if policy == 'depth':
+            wanted = depth >= self.min_depth
+        else:
+            wanted = self._random.random() < self.probability
+        if wanted:
+            if self._top_down:
+                self._root = self._splay_top_down(self._root, node._element)
+            else:
+                self._splay(node)
+        return node._element == element
+
     def _find_node(self, element):
         """Find and return the node containing element."""
         current = self._root
@@ -121,6 +393,9 @@ class SplayTree:
             self._root = self._Node(element)
             self._size = 1
             return
+        if self._top_down:
+            self._insert_top_down(element)
+            return
         
         # Find insertion point
         current = self._root
@@ -143,12 +418,38 @@ class SplayTree:
             parent._left = new_node
         else:
             parent._right = new_node
+        ancestor = parent
+        while ancestor is not None:
+            ancestor._count += 1
+            ancestor = ancestor._parent
         
         self._size += 1
         self._splay(new_node)
     
+    def _insert_top_down(self, element):
+        """Splay the insertion point up, then put the new node above it as root."""
+        root = self._splay_top_down(self._root, element)
+        if root._element == element:
+            self._root = root
+            return
+        node = self._Node(element)
+        if element < root._element:
+            node._left = root._left
+            node._right = root
+            root._left = None
+        else:
+            node._right = root._right
+            node._left = root
+            root._right = None
+        self._update_count(root)
+        self._update_count(node)
+        self._root = node
+        self._size += 1
+
     def delete(self, element):
         """Delete an element from the tree."""
+        if self._top_down:
+            return self._delete_top_down(element)
         node = self._find_node(element)
         if node is None:
             return False
@@ -185,14 +486,37 @@ class SplayTree:
             # Attach right subtree
             self._root._right = right_subtree
             self._set_parent(right_subtree, self._root)
+            self._update_count(self._root)
         
         self._size -= 1
         return True
     
+    def _delete_top_down(self, element):
+        """Splay element to the root, then join its two subtrees."""
+        if self._root is None:
+            return False
+        root = self._splay_top_down(self._root, element)
+        if root._element != element:
+            self._root = root
+            return False
+        if root._left is None:
+            self._root = root._right
+        else:
+            # Every element on the left is smaller, so this splays its maximum up
+            self._root = self._splay_top_down(root._left, _HIGHEST)
+            self._root._right = root._right
+            self._update_count(self._root)
+        root._left = root._right = root._parent = None
+        self._size -= 1
+        return True
+
     def find_min(self):
         """Find and return the minimum element."""
         if self._root is None:
             return None
+        if self._top_down:
+            self._root = self._splay_top_down(self._root, _LOWEST)
+            return self._root._element
         
         current = self._root
         while current._left is not None:
@@ -205,6 +529,9 @@ class SplayTree:
         """Find and return the maximum element."""
         if self._root is None:
             return None
+        if self._top_down:
+            self._root = self._splay_top_down(self._root, _HIGHEST)
+            return self._root._element
         
         current = self._root
         while current._right is not None:
@@ -213,6 +540,46 @@ class SplayTree:
         self._splay(current)
         return current._element
     
+    def rank(self, element):
+        """Return the number of elements strictly less than element.
+
+        The element, or the last node on its search path, is splayed to the
+        root, so the answer is read off the root's left subtree size.
+        """
+        if self._root is None:
+            return 0
+        if self._top_down:
+            self._root = self._splay_top_down(self._root, element)
+        else:
+            node = self._find_node(element)
+            if node is not None:
+                self._splay(node)
+        root = self._root
+        below = self._subtree_size(root._left)
+        return below + 1 if root._element < element else below
+
+    def select(self, k):
+        """Return the k-th smallest element (0-based) and splay it to the root."""
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError("select index out of range")
+        node = self._root
+        while True:
+            left_count = self._subtree_size(node._left)
+            if k < left_count:
+                node = node._left
+            elif k == left_count:
+                break
+            else:
+                k -= left_count + 1
+                node = node._right
+        if self._top_down:
+            self._root = self._splay_top_down(self._root, node._element)
+        else:
+            self._splay(node)
+        return node._element
+
     def size(self):
         """Return the number of elements in the tree."""
         return self._size
@@ -226,54 +593,167 @@ class SplayTree:
         return self._height_helper(self._root)
     
     def _height_helper(self, node):
-        """Recursive helper for height calculation."""
+        """Iterative helper for height calculation."""
         if node is None:
             return -1
-        return 1 + max(self._height_helper(node._left), 
-                      self._height_helper(node._right))
+        best = 0
+        stack = [(node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > best:
+                best = depth
+            if node._left is not None:
+                stack.append((node._left, depth + 1))
+            if node._right is not None:
+                stack.append((node._right, depth + 1))
+        return best
     
     def inorder_traversal(self):
         """Return inorder traversal of the tree."""
-        result = []
-        self._inorder_helper(self._root, result)
-        return result
-    
-    def _inorder_helper(self, node, result):
-        """Recursive helper for inorder traversal."""
-        if node is not None:
-            self._inorder_helper(node._left, result)
-            result.append(node._element)
-            self._inorder_helper(node._right, result)
+        return list(self.iter_inorder())
     
     def preorder_traversal(self):
         """Return preorder traversal of the tree."""
-        result = []
-        self._preorder_helper(self._root, result)
-        return result
+        return list(self.iter_preorder())
     
-    def _preorder_helper(self, node, result):
-        """Recursive helper for preorder traversal."""
-        if node is not None:
-            result.append(node._element)
-            self._preorder_helper(node._left, result)
-            self._preorder_helper(node._right, result)
+    def iter_inorder(self):
+        """Lazily yield elements in sorted order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._right
+
+    def range_query(self, min_val, max_val):
+        """Return all elements within the range [min_val, max_val]."""
+        return list(self.iter_range(min_val, max_val))
+
+    def iter_range(self, min_val, max_val):
+        """Lazily yield elements within [min_val, max_val] in sorted order.
+
+        Like the other iterators this reads the tree without splaying.
+        """
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                # Only smaller elements live to the left, skip them if out of range
+                node = node._left if node._element > min_val else None
+            else:
+                node = stack.pop()
+                if node._element > max_val:
+                    return
+                if node._element >= min_val:
+                    yield node._element
+                node = node._right
+
+    def iter_reverse(self):
+        """Lazily yield elements in descending order using O(height) memory."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._right
+            else:
+                node = stack.pop()
+                yield node._element
+                node = node._left
+
+    def iter_preorder(self):
+        """Lazily yield elements in preorder (node, left, right)."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield node._element
+            if node._right is not None:
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+
+    def iter_postorder(self):
+        """Lazily yield elements in postorder (left, right, node)."""
+        stack = []
+        node = self._root
+        last = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node._left
+            else:
+                top = stack[-1]
+                if top._right is not None and top._right is not last:
+                    node = top._right
+                else:
+                    yield top._element
+                    last = stack.pop()
+
+    def iter_level_order(self, max_depth=None):
+        """Lazily yield elements breadth-first, down to max_depth if given."""
+        if self._root is None:
+            return
+        queue = deque([self._root])
+        depth = 0
+        while queue:
+            expand = max_depth is None or depth < max_depth
+            for _ in range(len(queue)):
+                node = queue.popleft()
+                yield node._element
+                if expand:
+                    if node._left is not None:
+                        queue.append(node._left)
+                    if node._right is not None:
+                        queue.append(node._right)
+            if not expand:
+                return
+            depth += 1
+    
+    def iter_levels(self, max_depth=None):
+        """Lazily yield one list of elements per level, down to max_depth if given."""
+        level = [self._root] if self._root is not None else []
+        depth = 0
+        while level and (max_depth is None or depth <= max_depth):
+            yield [node._element for node in level]
+            next_level = []
+            for node in level:
+                if node._left is not None:
+                    next_level.append(node._left)
+                if node._right is not None:
+                    next_level.append(node._right)
+            level = next_level
+            depth += 1
     
     def split(self, element):
         """Split the tree at element, returning two trees."""
         if self._root is None:
-            return SplayTree(), SplayTree()
+            return self._empty_like(), self._empty_like()
         
-        # Find the element or closest node
-        node = self._find_node(element)
+        # Bring the element or closest node to the root
+        if self._top_down:
+            self._root = self._splay_top_down(self._root, element)
+        else:
+            node = self._find_node(element)
+            if node is not None:
+                # _find_node only splays on a miss
+                self._splay(node)
         
         # Create two new trees
-        left_tree = SplayTree()
-        right_tree = SplayTree()
+        left_tree = self._empty_like()
+        right_tree = self._empty_like()
         
-        if self._root._element <= element:
+        root = self._root
+        if root._element <= element:
             # Root goes to left tree
-            left_tree._root = self._root
-            right_tree._root = self._root._right
+            left_tree._root = root
+            right_tree._root = root._right
             
             if left_tree._root is not None:
                 left_tree._root._right = None
@@ -283,8 +763,8 @@ class SplayTree:
                 right_tree._root._parent = None
         else:
             # Root goes to right tree
-            right_tree._root = self._root
-            left_tree._root = self._root._left
+            right_tree._root = root
+            left_tree._root = root._left
             
             if right_tree._root is not None:
                 right_tree._root._left = None
@@ -293,9 +773,10 @@ class SplayTree:
             if left_tree._root is not None:
                 left_tree._root._parent = None
         
-        # Update sizes
-        left_tree._size = self._count_nodes(left_tree._root)
-        right_tree._size = self._count_nodes(right_tree._root)
+        # Update sizes; only the old root lost a subtree
+        self._update_count(root)
+        left_tree._size = self._subtree_size(left_tree._root)
+        right_tree._size = self._subtree_size(right_tree._root)
         
         # Clear original tree
         self._root = None
@@ -308,6 +789,10 @@ class SplayTree:
         if self._root is None:
             self._root = other_tree._root
             self._size = other_tree._size
+            if other_tree._top_down and not self._top_down:
+                self._relink_parents()
+            other_tree._root = None
+            other_tree._size = 0
             return
         
         if other_tree._root is None:
@@ -318,18 +803,33 @@ class SplayTree:
         
         # Attach other tree as right subtree
         self._root._right = other_tree._root
-        self._set_parent(other_tree._root, self._root)
+        self._root._count += other_tree._size
+        if not self._top_down:
+            if other_tree._top_down:
+                other_tree._relink_parents()
+            self._set_parent(other_tree._root, self._root)
         self._size += other_tree._size
         
         # Clear other tree
         other_tree._root = None
         other_tree._size = 0
     
+    def _empty_like(self):
+        """Return an empty tree using the same engine and splay policy."""
+        return type(self)(self.engine, self.splay_policy, self.min_depth, self.probability)
+
     def _count_nodes(self, node):
         """Count nodes in subtree rooted at node."""
-        if node is None:
-            return 0
-        return 1 + self._count_nodes(node._left) + self._count_nodes(node._right)
+        count = 0
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node._left is not None:
+                stack.append(node._left)
+            if node._right is not None:
+                stack.append(node._right)
+        return count
     
     def clear(self):
         """Clear the tree."""
@@ -344,22 +844,20 @@ class SplayTree:
         self._display_helper(self._root, 0)
     
     def _display_helper(self, node, depth):
-        """Recursive helper for display."""
-        if node is None:
-            return
-        
-        # Display right subtree first (higher values)
-        if node._right is not None:
-            self._display_helper(node._right, depth + 1)
-        
-        # Display current node
-        indent = "    " * depth
-        label = "  <- root" if node == self._root else ""
-        print(f"{indent}* {node._element}{label}")
-        
-        # Display left subtree
-        if node._left is not None:
-            self._display_helper(node._left, depth + 1)
+        """Iterative helper for display (reverse inorder, higher values first)."""
+        stack = []
+        while stack or node is not None:
+            if node is not None:
+                stack.append((node, depth))
+                node = node._right
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                indent = "    " * depth
+                label = "  <- root" if node == self._root else ""
+                print(f"{indent}* {node._element}{label}")
+                node = node._left
+                depth += 1
     
     def __len__(self):
         return self._size
@@ -367,8 +865,97 @@ class SplayTree:
     def __contains__(self, element):
         return self.search(element)
     
+    def dump(self, path):
+        """Write the tree to a binary snapshot file (see tree_file)."""
+        tree_file.dump(self, path)
+    
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        """Load a snapshot written by dump(); mmap=True returns a read-only MappedTree.
+
+        Pickled keys load only with allow_pickle=True; see tree_file.load.
+        """
+        return tree_file.load(cls, path, mmap=mmap, allow_pickle=allow_pickle)
+    
+    def _dump_columns(self):
+        return {b'DPTH': tree_file.compact_uints(self._inorder_depths())}
+    
+    def _inorder_depths(self):
+        """Yield the depth of every node in inorder."""
+        stack = []
+        node = self._root
+        depth = 0
+        while stack or node is not None:
+            if node is not None:
+                stack.append((node, depth))
+                node = node._left
+                depth += 1
+            else:
+                node, depth = stack.pop()
+                yield depth
+                node = node._right
+                depth += 1
+    
+    @classmethod
+    def _load_columns(cls, keys, columns):
+        depths = columns.get(b'DPTH')
+        if depths is None or len(depths) != len(keys):
+            return cls.from_sorted(keys)
+        tree = cls()
+        tree._root = tree._link_by_depth(keys, depths)
+        tree._size = len(keys)
+        return tree
+    
+    def _link_by_depth(self, keys, depths):
+        """Rebuild the exact shape given by inorder elements and node depths in O(n).
+
+        The stack holds the right spine built so far; nodes deeper than the
+        incoming one are popped, complete with their subtree sizes, and the
+        shallowest of them becomes its left child.
+        """
+        def finish(node):
+            self._update_count(node)
+            return node
+
+        stack = []
+        root = None
+        for element, depth in zip(keys, depths):
+            node = self._Node(element)
+            child = None
+            while stack and stack[-1][1] > depth:
+                child = finish(stack.pop()[0])
+            node._left = child
+            if child is not None:
+                child._parent = node
+            if stack:
+                node._parent = stack[-1][0]
+                node._parent._right = node
+            else:
+                root = node
+            stack.append((node, depth))
+        while stack:
+            finish(stack.pop()[0])
+        return root
+    
+    def memory_report(self, deep=False):
+        """Report node count, bytes per node, total bytes and bytes per key.
+
+        The nodes are walked iteratively. Keys are shared with the caller
+        and only measured with deep=True (see tree_memory).
+        """
+        nodes, node_bytes = tree_memory.walk(self._root, lambda node: (node._left, node._right))
+        return tree_memory.report(nodes, node_bytes, self._size, tree_memory.object_bytes(self),
+                                  self.iter_inorder() if deep else None)
+
+    def freeze(self):
+        """Return an immutable Eytzinger-ordered FrozenTree snapshot of the elements."""
+        return FrozenTree(self.iter_inorder())
+    
     def __iter__(self):
-        return iter(self.inorder_traversal())
+        return self.iter_inorder()
+
+    def __reversed__(self):
+        return self.iter_reverse()
     
     def __str__(self):
         if self.is_empty():
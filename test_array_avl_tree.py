@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from array_avl_tree import ArrayAVLTree
+
+
+def check(tree):
+    """Assert ordering, parent links, heights and balance over the arrays; return the node count."""
+    keys, left, right, parent, height = tree._keys, tree._left, tree._right, tree._parent, tree._height
+
+    def walk(node, above, low, high):
+        if node == -1:
+            return 0, 0
+        assert parent[node] == above
+        assert low is None or low < keys[node]
+        assert high is None or keys[node] < high
+        left_height, left_count = walk(left[node], node, low, keys[node])
+        right_height, right_count = walk(right[node], node, keys[node], high)
+        assert abs(left_height - right_height) <= 1
+        assert height[node] == 1 + max(left_height, right_height)
+        return height[node], 1 + left_count + right_count
+
+    _, count = walk(tree._root, -1, None, None)
+    assert count == tree.size() == len(tree)
+    return count
+
+
+def free_ids(tree):
+    ids = []
+    node = tree._free
+    while node != -1:
+        ids.append(node)
+        node = tree._left[node]
+    return ids
+
+
+@pytest.mark.parametrize("keytype", [None, 'q', 'd'])
+def test_random_inserts_and_deletes_keep_the_tree_balanced(keytype):
+    rng = random.Random(1)
+    tree = ArrayAVLTree(keytype)
+    reference = set()
+    convert = float if keytype == 'd' else int
+    for step in range(4000):
+        key = convert(rng.randrange(800))
+        if rng.random() < 0.6:
+            tree.insert(key)
+            reference.add(key)
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        if step % 500 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    for key in range(800):
+        assert (convert(key) in tree) == (key in reference)
+
+
+def test_deleted_ids_are_reused_before_the_arrays_grow():
+    tree = ArrayAVLTree('q')
+    for key in range(1000):
+        tree.insert(key)
+    for key in range(0, 1000, 2):
+        tree.delete(key)
+    assert len(free_ids(tree)) == 500 and len(tree._left) == 1000
+    for key in range(1000, 1500):
+        tree.insert(key)
+    assert free_ids(tree) == [] and len(tree._left) == 1000
+    check(tree)
+    assert list(tree) == list(range(1, 1000, 2)) + list(range(1000, 1500))
+
+
+def test_sequential_inserts_stay_logarithmic():
+    tree = ArrayAVLTree()
+    for key in range(4095):
+        tree.insert(key)
+    check(tree)
+    assert tree.height() <= 13
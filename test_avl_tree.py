@@ -0,0 +1,173 @@
+import random
+
+import pytest
+
+from avl_tree_skeleton import AVLTree
+
+
+def check(tree):
+    """Assert ordering, parent links, heights, balance and subtree counts; return the node count."""
+
+    def walk(node, parent, low, high):
+        if node is None:
+            return 0, 0
+        assert node._parent is parent
+        assert low is None or low < node._element
+        assert high is None or node._element < high
+        left_height, left_count = walk(node._left, node, low, node._element)
+        right_height, right_count = walk(node._right, node, node._element, high)
+        assert abs(left_height - right_height) <= 1
+        assert node._height == 1 + max(left_height, right_height)
+        assert node._count == 1 + left_count + right_count
+        return node._height, node._count
+
+    _, count = walk(tree._root, None, None, None)
+    assert count == tree.size()
+    return count
+
+
+def build(keys):
+    tree = AVLTree()
+    for key in keys:
+        tree.insert(key)
+    return tree
+
+
+def test_random_inserts_and_deletes_keep_the_tree_balanced():
+    rng = random.Random(1)
+    tree = AVLTree()
+    reference = set()
+    for step in range(4000):
+        key = rng.randrange(800)
+        if rng.random() < 0.6:
+            tree.insert(key)
+            reference.add(key)
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        if step % 500 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    for key in range(800):
+        assert tree.search(key) == (key in reference)
+
+
+def test_delete_reports_whether_the_element_was_present():
+    tree = AVLTree.from_sorted([1, 3, 5])
+    assert tree.delete(3) is True
+    assert tree.delete(3) is False
+    assert tree.delete(4) is False
+    assert AVLTree().delete(1) is False
+    assert list(tree) == [1, 5] and check(tree) == 2
+
+
+def test_sequential_inserts_stay_logarithmic():
+    tree = build(range(4095))
+    check(tree)
+    assert tree.height() <= 13
+
+
+def test_from_sorted_is_balanced_and_rejects_unsorted_input():
+    tree = AVLTree.from_sorted(iter(range(0, 1000, 3)))
+    check(tree)
+    assert list(tree) == list(range(0, 1000, 3))
+    with pytest.raises(ValueError):
+        AVLTree.from_sorted([1, 3, 2])
+
+
+def test_order_statistics_match_a_sorted_list():
+    rng = random.Random(2)
+    keys = sorted(rng.sample(range(10_000), 600))
+    tree = build(rng.sample(keys, len(keys)))
+    for i, key in enumerate(keys):
+        assert tree.select(i) == key
+        assert tree.rank(key) == i
+    for _ in range(100):
+        low, high = sorted(rng.sample(range(10_000), 2))
+        inside = [key for key in keys if low <= key <= high]
+        assert tree.count_range(low, high) == len(inside)
+        assert list(tree.iter_range(low, high)) == inside
+
+
+@pytest.mark.parametrize("pivot", [-1, 0, 137, 138, 500, 998, 999, 2000])
+def test_split_then_join_restores_the_tree(pivot):
+    keys = list(range(0, 1000, 2))
+    tree = AVLTree.from_sorted(keys)
+    left, right = tree.split(pivot)
+    assert tree.size() == 0
+    check(left)
+    check(right)
+    assert list(left) == [key for key in keys if key <= pivot]
+    assert list(right) == [key for key in keys if key > pivot]
+    if left.size() and right.size():
+        largest = left.select(left.size() - 1)
+        left.delete(largest)
+        joined = AVLTree.join(left, largest, right)
+        check(joined)
+        assert list(joined) == keys
+
+
+def test_join_rejects_misordered_operands():
+    with pytest.raises(ValueError):
+        AVLTree.join(build([1, 5]), 3, build([7]))
+
+
+def test_delete_range_and_extract_below():
+    rng = random.Random(3)
+    keys = sorted(rng.sample(range(5000), 1500))
+    tree = build(rng.sample(keys, len(keys)))
+    assert tree.delete_range(1000, 2000) == sum(1000 <= key <= 2000 for key in keys)
+    check(tree)
+    below = tree.extract_below(3000)
+    check(tree)
+    check(below)
+    assert list(below) == [key for key in keys if key < 1000 or 2000 < key < 3000]
+    assert list(tree) == [key for key in keys if key >= 3000]
+
+
+def test_batches_match_single_operations():
+    rng = random.Random(4)
+    tree = AVLTree.from_sorted(range(0, 3000, 3))
+    probes = [rng.randrange(3000) for _ in range(500)]
+    assert tree.search_many(probes) == [key % 3 == 0 for key in probes]
+    tree.insert_many(rng.sample(range(3000), 800))
+    tree.delete_many(rng.sample(range(3000), 800))
+    check(tree)
+
+
+@pytest.mark.parametrize("op, expected", [
+    ("union", [1, 3, 5, 7, 9, 12]),
+    ("intersection", [7]),
+    ("difference", [1, 5, 9]),
+    ("symmetric_difference", [1, 3, 5, 9, 12]),
+    ("__ior__", [1, 3, 5, 7, 9, 12]),
+    ("__iand__", [7]),
+    ("__isub__", [1, 5, 9]),
+    ("__ixor__", [1, 3, 5, 9, 12]),
+])
+def test_set_operations(op, expected):
+    tree = AVLTree.from_sorted([1, 5, 7, 9])
+    result = getattr(tree, op)(AVLTree.from_sorted([3, 7, 12]))
+    check(result)
+    assert list(result) == expected
+    # The list form has the same contract
+    assert list(getattr(AVLTree.from_sorted([1, 5, 7, 9]), op)([3, 3, 7, 12])) == expected
+    with pytest.raises(ValueError):
+        getattr(AVLTree.from_sorted([1, 5]), op)([12, 1, 7])
+
+
+def test_large_random_set_operations_stay_balanced():
+    rng = random.Random(5)
+    first = set(rng.sample(range(20_000), 3000))
+    second = set(rng.sample(range(20_000), 300))
+    tree = AVLTree.from_sorted(sorted(first))
+    other = AVLTree.from_sorted(sorted(second))
+    for op, expected in (("union", first | second), ("intersection", first & second),
+                         ("difference", first - second), ("symmetric_difference", first ^ second)):
+        result = getattr(tree, op)(other)
+        check(result)
+        assert list(result) == sorted(expected)
+    check(tree)
+    check(other)
+    assert list(tree) == sorted(first)
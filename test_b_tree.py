@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from b_tree import BTree
+from two_four_tree_skeleton import TwoFourTree
+
+
+def check(tree):
+    """Assert key order, fill limits, parent links and equal leaf depth; return the key count."""
+    leaf_depths = set()
+    count = 0
+    stack = [(tree._root, None, 0, None, None)] if tree._root is not None else []
+    while stack:
+        node, parent, depth, low, high = stack.pop()
+        keys = node._keys
+        assert node._parent is parent
+        assert keys == sorted(set(keys))
+        assert len(keys) <= tree.order - 1
+        if parent is not None:
+            assert len(keys) >= (tree.order + 1) // 2 - 1
+        assert keys
+        assert low is None or low < keys[0]
+        assert high is None or keys[-1] < high
+        count += len(keys)
+        if node._children:
+            assert len(node._children) == len(keys) + 1
+            bounds = [low] + keys + [high]
+            for i, child in enumerate(node._children):
+                stack.append((child, node, depth + 1, bounds[i], bounds[i + 1]))
+        else:
+            leaf_depths.add(depth)
+    assert len(leaf_depths) <= 1
+    assert count == tree.size() == len(tree)
+    return count
+
+
+@pytest.mark.parametrize("order", [3, 4, 5, 8, 64])
+def test_random_inserts_and_deletes_keep_the_invariants(order):
+    rng = random.Random(order)
+    tree = BTree(order)
+    reference = set()
+    for step in range(4000):
+        key = rng.randrange(800)
+        if rng.random() < 0.6:
+            tree.insert(key)
+            reference.add(key)
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        if step % 500 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    assert list(reversed(tree)) == sorted(reference, reverse=True)
+    for key in range(800):
+        assert (key in tree) == (key in reference)
+
+
+@pytest.mark.parametrize("order", [3, 4, 7, 64])
+def test_deleting_everything_leaves_an_empty_tree(order):
+    rng = random.Random(1)
+    keys = rng.sample(range(10_000), 1500)
+    tree = BTree(order)
+    for key in keys:
+        tree.insert(key)
+    check(tree)
+    for key in rng.sample(keys, len(keys)):
+        assert tree.delete(key)
+    check(tree)
+    assert tree.is_empty() and tree._root is None
+
+
+@pytest.mark.parametrize("order", [3, 4, 5, 64])
+@pytest.mark.parametrize("count", [0, 1, 2, 5, 63, 64, 65, 1000, 4097])
+def test_from_sorted_builds_a_valid_packed_tree(order, count):
+    tree = BTree.from_sorted(iter(range(count)), order)
+    check(tree)
+    assert list(tree) == list(range(count))
+    tree.insert(count)
+    tree.delete(0)
+    check(tree)
+
+
+def test_from_sorted_skips_repeats():
+    assert list(BTree.from_sorted([1, 1, 2, 3, 3], 4)) == [1, 2, 3]
+
+
+def test_range_queries_match_a_sorted_list():
+    rng = random.Random(2)
+    keys = sorted(rng.sample(range(5000), 700))
+    tree = BTree(5)
+    for key in rng.sample(keys, len(keys)):
+        tree.insert(key)
+    for _ in range(100):
+        low, high = sorted(rng.sample(range(5000), 2))
+        assert tree.range_query(low, high) == [key for key in keys if low <= key <= high]
+    assert sorted(tree.iter_preorder()) == keys
+    assert [key for level in tree.iter_levels() for key in level] == list(tree.iter_level_order())
+
+
+def test_two_four_tree_is_a_b_tree_of_order_four():
+    tree = TwoFourTree()
+    assert tree.order == 4
+    for key in random.Random(3).sample(range(1000), 500):
+        tree.insert(key)
+    check(tree)
+    with pytest.raises(ValueError):
+        TwoFourTree(5)
+    with pytest.raises(ValueError):
+        BTree(2)
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from binary_tree import BinarySearchTree
+
+
+def check(tree):
+    """Assert ordering, parent links and subtree counts of every node."""
+    count = 0
+    stack = [(tree._root, None, None, None)]
+    while stack:
+        node, parent, low, high = stack.pop()
+        if node is None:
+            continue
+        count += 1
+        assert node._parent is parent
+        assert low is None or low < node._element
+        assert high is None or node._element < high
+        left = node._left._count if node._left is not None else 0
+        right = node._right._count if node._right is not None else 0
+        assert node._count == 1 + left + right
+        stack.append((node._left, node, low, node._element))
+        stack.append((node._right, node, node._element, high))
+    assert count == tree.size() == len(tree)
+
+
+def preorder(node):
+    if node is None:
+        return []
+    return [node._element] + preorder(node._left) + preorder(node._right)
+
+
+def test_random_inserts_and_deletes_keep_the_invariants():
+    rng = random.Random(1)
+    tree = BinarySearchTree()
+    reference = set()
+    for _ in range(3000):
+        key = rng.randrange(500)
+        if rng.random() < 0.6:
+            tree.insert(key)
+            reference.add(key)
+        else:
+            tree.delete(key)
+            reference.discard(key)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    assert list(reversed(tree)) == sorted(reference, reverse=True)
+    for key in range(500):
+        assert (key in tree) == (key in reference)
+
+
+def test_from_sorted_is_balanced_and_skips_repeats():
+    tree = BinarySearchTree.from_sorted(iter([1, 1, 2, 3, 3, 3, 4, 5, 6, 7, 8]))
+    check(tree)
+    assert list(tree) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert tree.height() == 3
+    with pytest.raises(ValueError):
+        BinarySearchTree.from_sorted([2, 1])
+
+
+def test_order_statistics_match_a_sorted_list():
+    rng = random.Random(2)
+    keys = sorted(rng.sample(range(10_000), 700))
+    tree = BinarySearchTree()
+    for key in rng.sample(keys, len(keys)):
+        tree.insert(key)
+    for i, key in enumerate(keys):
+        assert tree.select(i) == key
+        assert tree.rank(key) == i
+    for _ in range(100):
+        low, high = sorted(rng.sample(range(10_000), 2))
+        inside = [key for key in keys if low <= key <= high]
+        assert tree.count_range(low, high) == len(inside)
+        assert tree.range_query(low, high) == inside
+    assert tree.median() == keys[(len(keys) - 1) // 2]
+
+
+def test_iterative_traversals_match_the_recursive_definition():
+    rng = random.Random(3)
+    tree = BinarySearchTree()
+    for key in rng.sample(range(1000), 300):
+        tree.insert(key)
+    assert list(tree.iter_preorder()) == preorder(tree._root)
+    assert list(tree.iter_postorder())[-1] == tree._root._element
+    levels = list(tree.iter_levels())
+    assert [key for level in levels for key in level] == list(tree.iter_level_order())
+    assert len(levels) == tree.height() + 1
+
+
+def test_degenerate_chain_does_not_hit_the_recursion_limit():
+    tree = BinarySearchTree()
+    for key in range(5000):
+        tree.insert(key)
+    assert tree.height() == 4999
+    assert sum(1 for _ in tree.iter_postorder()) == 5000
+    assert next(tree.iter_reverse()) == 4999
+
+
+def test_batches_match_single_operations():
+    rng = random.Random(4)
+    tree = BinarySearchTree.from_sorted(range(0, 2000, 2))
+    probes = [rng.randrange(2000) for _ in range(500)]
+    assert tree.search_many(probes) == [key % 2 == 0 for key in probes]
+    assert tree.insert_many([1, 3, 3, 0]) == 2
+    assert tree.delete_many(range(0, 100)) == 52
+    check(tree)
+    assert list(tree) == list(range(100, 2000, 2))
+
+
+def test_search_many_accepts_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    tree = BinarySearchTree.from_sorted([1, 4, 9])
+    mask = tree.search_many(np.array([9, 2, 4]))
+    assert mask.dtype == bool and mask.tolist() == [True, False, True]
+
+
+@pytest.mark.parametrize("op, expected", [
+    ("__or__", [1, 3, 5, 7, 9, 12]),
+    ("__and__", [7]),
+    ("__sub__", [1, 5, 9]),
+    ("__xor__", [1, 3, 5, 9, 12]),
+    ("__ior__", [1, 3, 5, 7, 9, 12]),
+    ("__iand__", [7]),
+    ("__isub__", [1, 5, 9]),
+    ("__ixor__", [1, 3, 5, 9, 12]),
+])
+def test_set_operations_share_one_input_contract(op, expected):
+    tree = BinarySearchTree.from_sorted([1, 5, 7, 9])
+    result = getattr(tree, op)([3, 3, 7, 12])
+    check(result)
+    assert list(result) == expected
+    with pytest.raises(ValueError):
+        getattr(BinarySearchTree.from_sorted([1, 5]), op)([12, 1, 7])
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from bplus_tree import BPlusTree
+
+
+def check(tree):
+    """Assert routing, fill limits, parent links, equal leaf depth and the leaf chain."""
+    leaves = []
+    stack = [(tree._root, None, 0, None, None)]
+    depths = set()
+    while stack:
+        node, parent, depth, low, high = stack.pop()
+        keys = node._keys
+        assert node._parent is parent
+        assert keys == sorted(set(keys))
+        assert len(keys) <= tree.order - 1
+        assert not keys or low is None or low <= keys[0]
+        assert not keys or high is None or keys[-1] < high
+        if type(node) is tree._Leaf:
+            assert len(node._values) == len(keys)
+            if parent is not None:
+                assert len(keys) >= tree._min_leaf_keys
+            depths.add(depth)
+            leaves.append(node)
+        else:
+            assert len(node._children) == len(keys) + 1
+            if parent is not None:
+                assert len(keys) >= tree._min_keys
+            bounds = [low] + keys + [high]
+            # Pushed right to left so leaves come off the stack in key order
+            for i in reversed(range(len(node._children))):
+                stack.append((node._children[i], node, depth + 1, bounds[i], bounds[i + 1]))
+    assert len(depths) == 1
+    assert leaves[0]._prev is None and leaves[-1]._next is None
+    for before, after in zip(leaves, leaves[1:]):
+        assert before._next is after and after._prev is before
+    assert sum(len(leaf._keys) for leaf in leaves) == tree.size() == len(tree)
+
+
+@pytest.mark.parametrize("order", [3, 4, 5, 16, 64])
+def test_random_sets_and_deletes_behave_like_a_dict(order):
+    rng = random.Random(order)
+    tree = BPlusTree(order)
+    reference = {}
+    for step in range(4000):
+        key = rng.randrange(800)
+        if rng.random() < 0.6:
+            tree[key] = step
+            reference[key] = step
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.pop(key, None)
+        if step % 500 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree.items()) == sorted(reference.items())
+    assert list(tree.values()) == [reference[key] for key in sorted(reference)]
+    assert list(reversed(tree)) == sorted(reference, reverse=True)
+    for key in range(800):
+        assert tree.get(key) == reference.get(key)
+        assert (key in tree) == (key in reference)
+
+
+@pytest.mark.parametrize("order", [3, 4, 64])
+def test_deleting_everything_leaves_an_empty_tree(order):
+    rng = random.Random(1)
+    keys = rng.sample(range(10_000), 1500)
+    tree = BPlusTree(order)
+    for key in keys:
+        tree.insert(key, -key)
+    for key in rng.sample(keys, len(keys)):
+        del tree[key]
+    check(tree)
+    assert tree.is_empty() and tree.find_min() is None
+    with pytest.raises(KeyError):
+        del tree[keys[0]]
+    with pytest.raises(KeyError):
+        tree[keys[0]]
+
+
+@pytest.mark.parametrize("order", [3, 4, 64])
+@pytest.mark.parametrize("count", [1, 2, 63, 64, 65, 1000, 4097])
+def test_from_items_builds_a_valid_tree(order, count):
+    tree = BPlusTree.from_items(((key, str(key)) for key in range(count)), order)
+    check(tree)
+    assert list(tree.items()) == [(key, str(key)) for key in range(count)]
+    tree[count] = 'new'
+    tree.delete(0)
+    check(tree)
+
+
+def test_from_items_keeps_the_last_value_of_a_repeated_key():
+    tree = BPlusTree.from_items([(1, 'a'), (1, 'b'), (2, 'c')], 4)
+    assert list(tree.items()) == [(1, 'b'), (2, 'c')]
+
+
+def test_scans_in_both_directions_match_a_sorted_list():
+    rng = random.Random(2)
+    keys = sorted(rng.sample(range(5000), 700))
+    tree = BPlusTree(5)
+    for key in rng.sample(keys, len(keys)):
+        tree[key] = key * 2
+    for _ in range(100):
+        low, high = sorted(rng.sample(range(-10, 5010), 2))
+        inside = [(key, key * 2) for key in keys if low <= key <= high]
+        assert list(tree.scan(low, high)) == inside
+        assert list(tree.scan(low, high, reverse=True)) == inside[::-1]
+    assert list(tree.scan(None, keys[10])) == [(key, key * 2) for key in keys[:11]]
+    assert list(tree.scan(keys[-3], None, reverse=True)) == [(key, key * 2) for key in keys[:-4:-1]]
+    assert (tree.find_min(), tree.find_max()) == (keys[0], keys[-1])
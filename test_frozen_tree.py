@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from avl_tree_skeleton import AVLTree
+from frozen_tree import FrozenTree
+
+
+def lower_bound(keys, element):
+    return next((key for key in keys if key >= element), None)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 7, 8, 100, 1023, 1024, 1025])
+def test_queries_match_a_sorted_list(count):
+    rng = random.Random(count)
+    keys = sorted(rng.sample(range(10 * count + 10), count))
+    frozen = FrozenTree(keys)
+    assert len(frozen) == count and list(frozen) == keys
+    for element in range(-1, 10 * count + 12):
+        assert (element in frozen) == (element in keys)
+        assert frozen.lower_bound(element) == lower_bound(keys, element)
+
+
+@pytest.mark.parametrize("keys", [
+    [x * 3 for x in range(500)],
+    [x / 4 for x in range(-200, 200)],
+    [f"k{x:03}" for x in range(300)],
+])
+def test_batched_queries_match_single_ones(keys):
+    frozen = AVLTree.from_sorted(keys).freeze()
+    probes = keys[::7] + [keys[0]] + keys[-3:]
+    if isinstance(keys[0], str):
+        probes += ["a", "k0505", "z"]
+    else:
+        probes += [keys[0] - 1, keys[-1] + 1, keys[1] - 0.5]
+    mask = frozen.contains_many(probes)
+    assert [bool(found) for found in mask] == [frozen.contains(probe) for probe in probes]
+    bounds = frozen.lower_bound_many(probes)
+    if isinstance(bounds, tuple):
+        found_keys, found = bounds
+        bounds = [found_keys[i].item() if found[i] else None for i in range(len(probes))]
+    assert bounds == [frozen.lower_bound(probe) for probe in probes]
+
+
+def test_buffer_exposes_the_eytzinger_layout():
+    frozen = FrozenTree(range(7))
+    assert list(frozen.buffer[1:]) == [3, 1, 5, 0, 2, 4, 6]
+    assert frozen.buffer.readonly
+    with pytest.raises(TypeError):
+        FrozenTree(["a"]).buffer
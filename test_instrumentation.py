@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from avl_tree_skeleton import AVLTree
+from b_tree import BTree
+from binary_tree import BinarySearchTree
+from instrumentation import COUNTERS, _Probe, instrument
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+from two_four_tree_skeleton import TwoFourTree
+
+CLASSES = [BinarySearchTree, AVLTree, RedBlackTree, TwoFourTree, BTree,
+           SplayTree, lambda: SplayTree('top_down')]
+
+
+def stored_keys(tree):
+    return list(tree.iter_inorder())
+
+
+@pytest.mark.parametrize("make", CLASSES)
+def test_instrumented_tree_behaves_like_a_plain_one(make):
+    rng = random.Random(1)
+    plain, counted = make(), make()
+    operations = [(rng.choice(('insert', 'insert', 'delete', 'search')), rng.randrange(300))
+                  for _ in range(2000)]
+    with instrument(counted) as stats:
+        for name, key in operations:
+            # search returns a node in some trees; compare what it says
+            assert bool(getattr(counted, name)(key)) == bool(getattr(plain, name)(key))
+        assert counted.range_query(50, 150) == plain.range_query(50, 150)
+    assert 'search' not in vars(counted)
+    assert stored_keys(counted) == stored_keys(plain)
+    assert not any(type(key) is _Probe for key in stored_keys(counted))
+    snapshot = stats.snapshot()
+    assert snapshot['calls']['range_query'] == 1
+    assert sum(snapshot['calls'].values()) == len(operations) + 1
+    assert snapshot['comparisons'] > 0 and snapshot['nodes_visited'] > 0
+    for counter in COUNTERS:
+        histogram = stats.histogram('insert', counter)
+        assert sum(histogram.values()) == snapshot['calls'].get('insert', 0)
+        assert sum(value * calls for value, calls in histogram.items()) <= snapshot[counter]
+
+
+def test_search_in_a_chain_counts_every_node_on_the_path():
+    tree = BinarySearchTree()
+    for key in range(10):
+        tree.insert(key)
+    with instrument(tree) as stats:
+        tree.search(9)
+    assert stats.nodes_visited == 10
+    assert stats.histogram('search', 'nodes_visited') == {10: 1}
+
+
+def test_structural_counters_match_the_tree_kind():
+    avl, btree, splay = AVLTree(), BTree(4), SplayTree()
+    with instrument(avl) as avl_stats, instrument(btree) as btree_stats, instrument(splay) as splay_stats:
+        for key in range(100):
+            avl.insert(key)
+            btree.insert(key)
+            splay.insert(key)
+        for key in range(100):
+            btree.delete(key)
+        splay.search(0)
+    assert avl_stats.rotations > 0 and avl_stats.splits == 0
+    assert btree_stats.splits > 0 and btree_stats.underflow_fixes > 0 and btree_stats.rotations == 0
+    assert splay_stats.splay_steps > 0
+
+
+def shape(btree):
+    """Nodes and height of a B-tree."""
+    nodes, height, level = 0, 0, [btree._root] if btree._root else []
+    while level:
+        nodes, height = nodes + len(level), height + 1
+        level = [child for node in level for child in node._children]
+    return nodes, height
+
+
+def test_split_and_underflow_cascades_count_every_step():
+    tree = BTree(3)
+    with instrument(tree) as stats:
+        for key in range(2000):
+            tree.insert(key)
+        # Every split adds a node, and each root split a new root as well
+        nodes, height = shape(tree)
+        assert stats.splits == nodes - height
+        for key in random.Random(1).sample(range(2000), 2000):
+            nodes, height = shape(tree)
+            before = stats.underflow_fixes
+            tree.delete(key)
+            after_nodes, after_height = shape(tree)
+            merges = nodes - after_nodes - (height - after_height)
+            assert merges <= stats.underflow_fixes - before <= merges + 1
+    assert stats.splits > 1000 and stats.underflow_fixes > 1000
+
+
+def test_a_tree_is_instrumented_at_most_once():
+    tree = AVLTree()
+    stats = instrument(tree)
+    with pytest.raises(ValueError):
+        instrument(tree)
+    stats.detach()
+    instrument(tree).detach()
+    stats.reset()
+    assert stats.snapshot() == dict.fromkeys(COUNTERS, 0) | {'calls': {}}
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from interval_tree import IntervalTree
+from redblack_tree_skeleton import NIL
+from test_redblack_tree import check
+
+
+def check_max_high(tree):
+    """Assert every node's max_high is the largest high endpoint of its subtree."""
+
+    def walk(node):
+        if node is NIL:
+            return None
+        highs = [node.value[1]] + [high for high in (walk(node.left), walk(node.right)) if high is not None]
+        assert node.max_high == max(highs)
+        return node.max_high
+
+    walk(tree.root)
+
+
+def random_interval(rng):
+    low = rng.randrange(1000)
+    return low, low + rng.randrange(60)
+
+
+def test_random_adds_and_removes_keep_max_high_current():
+    rng = random.Random(1)
+    tree = IntervalTree()
+    reference = set()
+    for step in range(3000):
+        interval = random_interval(rng)
+        if rng.random() < 0.6 or not reference:
+            tree.add(*interval)
+            reference.add(interval)
+        else:
+            interval = rng.choice(sorted(reference))
+            assert tree.remove(*interval)
+            reference.discard(interval)
+        if step % 300 == 0:
+            check(tree)
+            check_max_high(tree)
+    check(tree)
+    check_max_high(tree)
+    assert list(tree) == sorted(reference)
+
+
+def test_queries_match_a_linear_scan():
+    rng = random.Random(2)
+    intervals = sorted({random_interval(rng) for _ in range(800)})
+    tree = IntervalTree.from_sorted(intervals)
+    check_max_high(tree)
+    for _ in range(200):
+        low = rng.randrange(-20, 1080)
+        high = low + rng.randrange(40)
+        assert tree.overlapping(low, high) == [(a, b) for a, b in intervals if a <= high and b >= low]
+        hit = tree.find_containing(low)
+        if hit is None:
+            assert not any(a <= low <= b for a, b in intervals)
+        else:
+            assert hit[0] <= low <= hit[1]
+    points = [rng.randrange(-20, 1080) for _ in range(300)]
+    assert tree.containing_many(points) == [list(tree.iter_containing(point)) for point in points]
+
+
+def test_backwards_interval_is_rejected():
+    with pytest.raises(ValueError):
+        IntervalTree().add(5, 1)
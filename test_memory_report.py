@@ -0,0 +1,73 @@
+import gc
+import random
+import sys
+import tracemalloc
+
+import pytest
+
+from array_avl_tree import ArrayAVLTree
+from avl_tree_skeleton import AVLTree
+from b_tree import BTree
+from binary_tree import BinarySearchTree
+from bplus_tree import BPlusTree
+from frozen_tree import FrozenTree
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+from two_four_tree_skeleton import TwoFourTree
+
+BUILDERS = {
+    'BinarySearchTree': BinarySearchTree,
+    'AVLTree': AVLTree,
+    'RedBlackTree': RedBlackTree,
+    'SplayTree': SplayTree,
+    'TwoFourTree': TwoFourTree,
+    'BTree': BTree,
+    'BPlusTree': BPlusTree,
+    'ArrayAVLTree': lambda: ArrayAVLTree('q'),
+}
+
+
+@pytest.mark.parametrize("name", BUILDERS)
+def test_report_agrees_with_tracemalloc(name):
+    keys = random.Random(1).sample(range(1 << 20, 1 << 21), 20_000)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tree = BUILDERS[name]()
+        for key in keys:
+            tree.insert(key)
+        gc.collect()
+        measured = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    report = tree.memory_report()
+    assert report['keys'] == len(keys)
+    assert report['total_bytes'] == report['node_bytes'] + report['overhead_bytes']
+    assert report['key_bytes'] is None
+    assert report['total_bytes'] == pytest.approx(measured, rel=0.05)
+
+
+@pytest.mark.parametrize("make", [BinarySearchTree, RedBlackTree, BTree, BPlusTree])
+def test_deep_report_counts_each_distinct_key_once(make):
+    keys = [f"key-{x:05}" for x in range(1000)]
+    tree = make()
+    for key in keys + keys[:100]:
+        tree.insert(key)
+    shallow, deep = tree.memory_report(), tree.memory_report(deep=True)
+    key_bytes = sum(map(sys.getsizeof, keys))
+    if make is BPlusTree:
+        key_bytes += sys.getsizeof(None)  # every value is the shared None
+    assert deep['key_bytes'] == key_bytes
+    assert deep['total_bytes'] == shallow['total_bytes'] + key_bytes
+
+
+def test_frozen_and_empty_trees():
+    frozen = FrozenTree(range(1000))
+    report = frozen.memory_report()
+    assert (report['nodes'], report['keys']) == (1001, 1000)
+    assert report['node_bytes'] == sys.getsizeof(frozen._keys)
+    assert frozen.memory_report(deep=True)['key_bytes'] == 0
+    for make in BUILDERS.values():
+        report = make().memory_report()
+        assert report['keys'] == 0 and report['bytes_per_key'] == 0.0
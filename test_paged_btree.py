@@ -0,0 +1,186 @@
+import random
+
+import pytest
+
+from paged_btree import BufferPool, PagedBTree, _NONE
+from tree_file import TreeFileError
+
+
+class Page:
+    def __init__(self, page_id, data):
+        self._id = page_id
+        self.data = data
+
+
+class Disk:
+    """In-memory page store that records every read and write."""
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.reads = []
+        self.writes = []
+
+    def read(self, page_id):
+        self.reads.append(page_id)
+        return Page(page_id, self.pages[page_id])
+
+    def write(self, page):
+        self.writes.append(page._id)
+        self.pages[page._id] = page.data
+
+
+def test_pool_evicts_least_recently_used_and_writes_back_only_dirty_pages():
+    disk = Disk({i: f"v{i}" for i in range(10)})
+    pool = BufferPool(3, disk.read, disk.write)
+    for page_id in (0, 1, 2):
+        pool.get(page_id)
+    pool.get(0)  # 1 is now the least recently used
+    page = pool.get(2)
+    page.data = "changed"
+    pool.mark_dirty(page)
+    pool.get(3)
+    assert list(pool._pages) == [0, 2, 3]
+    assert disk.writes == []
+    pool.get(4)
+    pool.get(5)  # evicts 0, then the dirty 2
+    assert list(pool._pages) == [3, 4, 5]
+    assert disk.writes == [2] and disk.pages[2] == "changed"
+    assert pool.get(2).data == "changed"
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 7, 4)
+    assert (stats['page_writes'], stats['dirty_pages']) == (1, 0)
+
+
+def test_pool_keeps_pinned_pages_until_the_operation_ends():
+    disk = Disk({i: i for i in range(10)})
+    pool = BufferPool(2, disk.read, disk.write)
+    pool.begin()
+    for page_id in range(5):
+        page = pool.get(page_id)
+        pool.mark_dirty(page)
+    assert len(pool._pages) == 5 and disk.writes == []
+    pool.end()
+    assert list(pool._pages) == [3, 4]
+    assert sorted(disk.writes) == [0, 1, 2]
+    pool.flush()
+    assert sorted(disk.writes) == [0, 1, 2, 3, 4]
+    assert pool.stats()['dirty_pages'] == 0
+
+
+def test_pool_discard_drops_a_dirty_page_without_writing_it():
+    disk = Disk({0: 'a', 1: 'b'})
+    pool = BufferPool(1, disk.read, disk.write)
+    pool.add(Page(7, 'new'))
+    pool.discard(7)
+    pool.get(0)
+    pool.get(1)
+    assert disk.writes == []
+    with pytest.raises(ValueError):
+        BufferPool(0, disk.read, disk.write)
+
+
+def check(tree):
+    """Assert key order, fill limits and equal leaf depth over every page; return the key count."""
+    count = 0
+    depths = set()
+    stack = [(tree._root, 0, None, None)] if tree._root != _NONE else []
+    while stack:
+        page_id, depth, low, high = stack.pop()
+        page = tree._pool.get(page_id)
+        keys = list(page._keys)
+        assert keys == sorted(set(keys))
+        assert 0 < len(keys) <= tree.order - 1
+        if page_id != tree._root:
+            assert len(keys) >= (tree.order + 1) // 2 - 1
+        assert low is None or low < keys[0]
+        assert high is None or keys[-1] < high
+        count += len(keys)
+        if page._children:
+            assert len(page._children) == len(keys) + 1
+            bounds = [low] + keys + [high]
+            for i, child in enumerate(page._children):
+                stack.append((child, depth + 1, bounds[i], bounds[i + 1]))
+        else:
+            depths.add(depth)
+    assert len(depths) <= 1
+    assert count == tree.size()
+    return count
+
+
+@pytest.mark.parametrize("order, cache_pages", [(4, 3), (5, 8), (16, 2)])
+def test_random_operations_under_heavy_eviction(tmp_path, order, cache_pages):
+    rng = random.Random(order)
+    path = tmp_path / "tree.pages"
+    reference = set()
+    with PagedBTree(path, page_size=512, cache_pages=cache_pages, order=order) as tree:
+        for step in range(3000):
+            key = rng.randrange(1000)
+            if rng.random() < 0.6:
+                tree.insert(key)
+                reference.add(key)
+            else:
+                tree.delete(key)
+                reference.discard(key)
+            if step % 500 == 0:
+                check(tree)
+                assert len(tree._pool._pages) <= cache_pages
+        check(tree)
+        stats = tree.stats()
+        assert stats['evictions'] > 0 and stats['page_writes'] > 0
+        assert list(tree) == sorted(reference)
+    with PagedBTree(path) as tree:
+        assert (tree.order, tree.page_size) == (order, 512)
+        check(tree)
+        assert list(tree) == sorted(reference)
+        for key in range(1000):
+            assert (key in tree) == (key in reference)
+
+
+def test_dirty_pages_reach_the_file_only_when_evicted_or_flushed(tmp_path):
+    path = tmp_path / "tree.pages"
+    tree = PagedBTree(path, page_size=512, cache_pages=1000, order=8)
+    for key in range(500):
+        tree.insert(key)
+    assert tree.stats()['page_writes'] == 0
+    assert tree.stats()['dirty_pages'] == tree.stats()['cached_pages']
+    tree.flush()
+    assert tree.stats()['dirty_pages'] == 0
+    with PagedBTree(path) as reopened:
+        assert list(reopened) == list(range(500))
+    tree.close()
+
+
+def test_freed_pages_are_reused(tmp_path):
+    with PagedBTree(tmp_path / "tree.pages", page_size=512, cache_pages=4, order=4) as tree:
+        for key in range(2000):
+            tree.insert(key)
+        pages = tree.stats()['file_pages']
+        for key in range(2000):
+            tree.delete(key)
+        assert tree.is_empty() and tree.height() == -1
+        for key in range(2000):
+            tree.insert(key)
+        assert tree.stats()['file_pages'] == pages
+        check(tree)
+
+
+def test_float_keys_and_range_queries(tmp_path):
+    rng = random.Random(7)
+    keys = sorted({rng.uniform(-100, 100) for _ in range(800)})
+    with PagedBTree(tmp_path / "tree.pages", page_size=256, cache_pages=4, keytype='d') as tree:
+        for key in rng.sample(keys, len(keys)):
+            tree.insert(key)
+        for _ in range(50):
+            low, high = sorted((rng.uniform(-110, 110), rng.uniform(-110, 110)))
+            assert tree.range_query(low, high) == [key for key in keys if low <= key <= high]
+
+
+def test_invalid_files_and_arguments_are_rejected(tmp_path):
+    bogus = tmp_path / "bogus"
+    bogus.write_bytes(b"x" * 4096)
+    with pytest.raises(TreeFileError):
+        PagedBTree(bogus)
+    with pytest.raises(ValueError):
+        PagedBTree(tmp_path / "a", keytype='i')
+    with pytest.raises(ValueError):
+        PagedBTree(tmp_path / "b", page_size=256, order=1000)
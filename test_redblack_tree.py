@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from redblack_tree_skeleton import BLACK, NIL, RED, RedBlackTree
+
+
+def check(tree):
+    """Assert ordering, parent links and the red-black rules; return the black height."""
+    assert tree.root.color is BLACK
+    assert NIL.color is BLACK and NIL.parent is NIL
+
+    def walk(node, parent, low, high):
+        if node is NIL:
+            return 1, 0
+        assert node.parent is parent
+        assert low is None or low < node.value
+        assert high is None or node.value < high
+        if node.color is RED:
+            assert node.left.color is BLACK and node.right.color is BLACK
+        left_black, left_count = walk(node.left, node, low, node.value)
+        right_black, right_count = walk(node.right, node, node.value, high)
+        assert left_black == right_black
+        return left_black + (node.color is BLACK), 1 + left_count + right_count
+
+    black_height, count = walk(tree.root, NIL, None, None)
+    assert count == tree.size() == len(tree)
+    return black_height
+
+
+def test_random_inserts_and_deletes_keep_the_red_black_rules():
+    rng = random.Random(1)
+    tree = RedBlackTree()
+    reference = set()
+    for step in range(4000):
+        key = rng.randrange(800)
+        if rng.random() < 0.6:
+            tree.insert(key)
+            reference.add(key)
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        if step % 500 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    assert list(reversed(tree)) == sorted(reference, reverse=True)
+    for key in range(800):
+        assert (key in tree) == (key in reference)
+
+
+def test_deleting_everything_leaves_an_empty_tree():
+    rng = random.Random(2)
+    keys = rng.sample(range(10_000), 1000)
+    tree = RedBlackTree()
+    for key in keys:
+        tree.insert(key)
+    for key in rng.sample(keys, len(keys)):
+        assert tree.delete(key)
+    check(tree)
+    assert tree.root is NIL and tree.is_empty()
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 7, 8, 100, 1023, 1024])
+def test_from_sorted_builds_a_valid_tree(count):
+    tree = RedBlackTree.from_sorted(iter(range(count)))
+    check(tree)
+    assert list(tree) == list(range(count))
+    tree.insert(count)
+    tree.delete(0)
+    check(tree)
+
+
+def test_from_sorted_skips_repeats_and_rejects_unsorted_input():
+    assert list(RedBlackTree.from_sorted([1, 1, 2, 2, 3])) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        RedBlackTree.from_sorted([1, 3, 2])
+
+
+def test_batches_match_single_operations():
+    rng = random.Random(3)
+    tree = RedBlackTree.from_sorted(range(0, 3000, 3))
+    probes = [rng.randrange(3000) for _ in range(500)]
+    assert tree.search_many(probes) == [key % 3 == 0 for key in probes]
+    reference = set(range(0, 3000, 3))
+    added = rng.sample(range(3000), 800)
+    assert tree.insert_many(added) == len(set(added) - reference)
+    reference |= set(added)
+    removed = rng.sample(range(3000), 800)
+    assert tree.delete_many(removed) == len(set(removed) & reference)
+    reference -= set(removed)
+    check(tree)
+    assert list(tree) == sorted(reference)
+
+
+@pytest.mark.parametrize("op, expected", [
+    ("__or__", [1, 3, 5, 7, 9, 12]),
+    ("__and__", [7]),
+    ("__sub__", [1, 5, 9]),
+    ("__xor__", [1, 3, 5, 9, 12]),
+    ("__ior__", [1, 3, 5, 7, 9, 12]),
+    ("__iand__", [7]),
+    ("__isub__", [1, 5, 9]),
+    ("__ixor__", [1, 3, 5, 9, 12]),
+])
+def test_set_operations_share_one_input_contract(op, expected):
+    result = getattr(RedBlackTree.from_sorted([1, 5, 7, 9]), op)(RedBlackTree.from_sorted([3, 7, 12]))
+    check(result)
+    assert list(result) == expected
+    assert list(getattr(RedBlackTree.from_sorted([1, 5, 7, 9]), op)([3, 3, 7, 12])) == expected
+    with pytest.raises(ValueError):
+        getattr(RedBlackTree.from_sorted([1, 5]), op)([12, 1, 7])
+
+
+def test_range_and_traversals():
+    rng = random.Random(4)
+    keys = sorted(rng.sample(range(5000), 400))
+    tree = RedBlackTree.from_sorted(keys)
+    for _ in range(50):
+        low, high = sorted(rng.sample(range(5000), 2))
+        assert tree.range_query(low, high) == [key for key in keys if low <= key <= high]
+    assert sorted(tree.iter_preorder()) == keys
+    assert list(tree.iter_postorder())[-1] == tree.root.value
+    assert [key for level in tree.iter_levels() for key in level] == list(tree.iter_level_order())
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from sharded_tree import ShardedTree
+
+
+def check(tree):
+    """Assert the bookkeeping matches the shards' contents and the size limits hold."""
+    parts = [tree._run('keys', [(worker, (shard_id,))])[0] for shard_id, worker in tree._shards]
+    assert [len(part) for part in parts] == tree.shard_sizes()
+    assert sum(tree.shard_sizes()) == sum(tree.worker_loads()) == len(tree)
+    assert len(tree._bounds) == max(len(parts) - 1, 0)
+    for bound, before, after in zip(tree._bounds, parts, parts[1:]):
+        assert not before or before[-1] < bound
+        assert not after or bound <= after[0]
+    assert all(size <= tree.max_shard_size for size in tree.shard_sizes())
+    return [key for part in parts for key in part]
+
+
+@pytest.mark.parametrize("kind", ShardedTree.KINDS)
+def test_random_batches_match_a_set(kind):
+    rng = random.Random(1)
+    reference = set()
+    with ShardedTree(workers=2, kind=kind, max_shard_size=64, min_shard_size=8) as tree:
+        for _ in range(40):
+            batch = [rng.randrange(2000) for _ in range(rng.randrange(1, 200))]
+            if rng.random() < 0.6:
+                assert tree.insert_many(batch) == len(set(batch) - reference)
+                reference |= set(batch)
+            else:
+                assert tree.delete_many(batch) == len(set(batch) & reference)
+                reference -= set(batch)
+            assert check(tree) == sorted(reference)
+        probes = [rng.randrange(-10, 2010) for _ in range(500)]
+        assert tree.search_many(probes) == [probe in reference for probe in probes]
+        for _ in range(20):
+            low, high = sorted(rng.sample(range(-10, 2010), 2))
+            assert tree.range_query(low, high) == sorted(key for key in reference if low <= key <= high)
+        assert list(tree) == sorted(reference)
+
+
+def test_oversized_shards_split_and_undersized_ones_merge():
+    with ShardedTree(workers=2, max_shard_size=100, min_shard_size=20) as tree:
+        tree.insert_many(range(1000))
+        shards = len(tree.shard_sizes())
+        assert shards >= 10
+        assert max(tree.worker_loads()) - min(tree.worker_loads()) <= 100
+        tree.delete_many([key for key in range(1000) if key % 10])
+        check(tree)
+        assert len(tree) == 100 and len(tree.shard_sizes()) < shards
+        assert all(size >= 20 for size in tree.shard_sizes())
+        tree.delete_many(range(0, 1000, 20))
+        check(tree)
+        # Shards still below the mark only remain when no neighbour has room
+        sizes = tree.shard_sizes()
+        for index, size in enumerate(sizes):
+            if size < 20:
+                neighbours = sizes[max(index - 1, 0):index] + sizes[index + 1:index + 2]
+                assert all(size + other > 100 for other in neighbours)
+        tree.delete_many(range(1000))
+        assert tree.is_empty() and check(tree) == []
+        assert tree.insert_many([5, 3]) == 2 and list(tree) == [3, 5]
+
+
+def test_merging_can_be_turned_off():
+    with ShardedTree(workers=2, max_shard_size=100, min_shard_size=0) as tree:
+        tree.insert_many(range(1000))
+        shards = len(tree.shard_sizes())
+        tree.delete_many(range(999))
+        assert len(tree.shard_sizes()) == shards and list(tree) == [999]
+
+
+def test_search_many_accepts_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    with ShardedTree(workers=1) as tree:
+        tree.insert_many(np.arange(0, 100, 3))
+        mask = tree.search_many(np.array([3, 4, 99]))
+        assert mask.dtype == bool and mask.tolist() == [True, False, True]
+        assert 3 in tree and 4 not in tree
+
+
+def test_invalid_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        ShardedTree(kind='splay')
+    with pytest.raises(ValueError):
+        ShardedTree(max_shard_size=1)
+    with pytest.raises(ValueError):
+        ShardedTree(max_shard_size=10, min_shard_size=10)
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import random
+
+import pytest
+
+from splay_cache import SplayCache
+from splay_tree_skeleton import SplayTree
+from test_splay_tree import check
+
+
+def values(cache):
+    """{key: value} read off the nodes without splaying."""
+    found = {}
+    stack = [cache._root]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            found[node._element] = node._value
+            stack.extend((node._left, node._right))
+    return found
+
+
+@pytest.mark.parametrize("engine", SplayTree.ENGINES)
+def test_lru_policy_matches_a_reference_lru(engine):
+    rng = random.Random(1)
+    cache = SplayCache(50, 'lru', engine)
+    reference = OrderedDict()
+    for step in range(5000):
+        key = rng.randrange(120)
+        if rng.random() < 0.5:
+            cache[key] = step
+            reference[key] = step
+            reference.move_to_end(key)
+            if len(reference) > 50:
+                reference.popitem(last=False)
+        else:
+            assert cache.get(key) == reference.get(key)
+            if key in reference:
+                reference.move_to_end(key)
+        if step % 500 == 0:
+            check(cache)
+    check(cache)
+    assert values(cache) == dict(reference)
+    assert list(cache._recency) == list(reference)
+
+
+@pytest.mark.parametrize("engine", SplayTree.ENGINES)
+def test_deep_policy_stays_within_capacity(engine):
+    rng = random.Random(2)
+    cache = SplayCache(64, 'deep', engine)
+    stored = {}
+    new_keys = 0
+    for step in range(5000):
+        key = rng.randrange(300)
+        if rng.random() < 0.5:
+            new_keys += key not in values(cache)
+            cache.put(key, -step)
+            stored[key] = -step
+            assert cache.size() <= 64
+        else:
+            value = cache.get(key)
+            assert value is None or value == stored[key]
+        if step % 500 == 0:
+            check(cache)
+    check(cache)
+    assert all(stored[key] == value for key, value in values(cache).items())
+    assert cache.stats()['evictions'] == new_keys - cache.size()
+
+
+def test_get_or_compute_and_stats():
+    cache = SplayCache(2)
+    calls = []
+    compute = (lambda key: calls.append(key) or key * 10)
+    assert cache.get_or_compute(1, compute) == 10
+    assert cache.get_or_compute(1, compute) == 10
+    assert cache.get_or_compute(2, compute) == 20
+    assert cache.get_or_compute(3, compute) == 30
+    assert calls == [1, 2, 3]
+    assert 1 not in values(cache)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 3, 1, 2)
+    del cache[2]
+    with pytest.raises(KeyError):
+        cache[2]
+    with pytest.raises(KeyError):
+        del cache[2]
+
+
+def test_cache_refuses_tree_surgery_and_bad_arguments():
+    cache = SplayCache(4)
+    with pytest.raises(TypeError):
+        cache.split(1)
+    with pytest.raises(TypeError):
+        cache.join(SplayCache(4))
+    with pytest.raises(ValueError):
+        SplayCache(0)
+    with pytest.raises(ValueError):
+        SplayCache(4, 'fifo')
@@ -0,0 +1,145 @@
+import itertools
+import random
+
+import pytest
+
+from splay_tree_skeleton import SplayTree
+
+CONFIGURATIONS = [
+    (engine, policy)
+    for engine, policy in itertools.product(SplayTree.ENGINES, SplayTree.SPLAY_POLICIES)
+    if not (engine == 'top_down' and policy == 'semi')
+]
+
+
+def check(tree):
+    """Assert ordering and subtree counts, and parent links when the engine keeps them."""
+    count = 0
+    stack = [(tree._root, None, None, None)]
+    while stack:
+        node, parent, low, high = stack.pop()
+        if node is None:
+            continue
+        count += 1
+        if tree.engine == 'bottom_up':
+            assert node._parent is parent
+        assert low is None or low < node._element
+        assert high is None or node._element < high
+        left = node._left._count if node._left is not None else 0
+        right = node._right._count if node._right is not None else 0
+        assert node._count == 1 + left + right
+        stack.append((node._left, node, low, node._element))
+        stack.append((node._right, node, node._element, high))
+    assert count == tree.size() == len(tree)
+
+
+@pytest.mark.parametrize("engine, policy", CONFIGURATIONS)
+def test_random_operations_keep_counts_and_order(engine, policy):
+    rng = random.Random(CONFIGURATIONS.index((engine, policy)))
+    tree = SplayTree(engine, policy, min_depth=4, probability=0.5)
+    reference = set()
+    for step in range(4000):
+        key = rng.randrange(600)
+        action = rng.random()
+        if action < 0.4:
+            tree.insert(key)
+            reference.add(key)
+            assert tree._root._element == key
+        elif action < 0.65:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        elif action < 0.9:
+            assert tree.search(key) == (key in reference)
+        elif reference:
+            ordered = sorted(reference)
+            k = rng.randrange(len(ordered))
+            assert tree.select(k) == ordered[k]
+            assert tree.rank(ordered[k]) == k
+            assert tree.rank(key) == sum(1 for other in ordered if other < key)
+        if step % 400 == 0:
+            check(tree)
+    check(tree)
+    assert list(tree) == sorted(reference)
+    assert list(reversed(tree)) == sorted(reference, reverse=True)
+    if reference:
+        assert (tree.find_min(), tree.find_max()) == (min(reference), max(reference))
+        check(tree)
+
+
+@pytest.mark.parametrize("engine", SplayTree.ENGINES)
+def test_always_splaying_moves_the_found_key_to_the_root(engine):
+    tree = SplayTree(engine)
+    for key in random.Random(1).sample(range(500), 500):
+        tree.insert(key)
+    for key in (0, 499, 250, 17):
+        assert tree.search(key)
+        assert tree._root._element == key
+    assert tree.select(100) == 100 and tree._root._element == 100
+
+
+def test_depth_policy_leaves_shallow_accesses_alone():
+    tree = SplayTree.from_sorted(range(1023))
+    tree.splay_policy = 'depth'
+    tree.min_depth = 20
+    root = tree._root
+    for key in range(0, 1023, 7):
+        assert tree.search(key)
+    assert tree._root is root
+    check(tree)
+
+
+@pytest.mark.parametrize("engine", SplayTree.ENGINES)
+@pytest.mark.parametrize("pivot", [-1, 0, 250, 251, 999, 2000])
+def test_split_then_join_restores_the_tree(engine, pivot):
+    keys = list(range(0, 1000, 2))
+    tree = SplayTree(engine)
+    for key in random.Random(pivot).sample(keys, len(keys)):
+        tree.insert(key)
+    left, right = tree.split(pivot)
+    assert tree.size() == 0
+    check(left)
+    check(right)
+    assert list(left) == [key for key in keys if key <= pivot]
+    assert list(right) == [key for key in keys if key > pivot]
+    assert left.engine == engine
+    left.join(right)
+    check(left)
+    assert list(left) == keys and right.size() == 0
+
+
+def test_switching_engines_mid_stream_relinks_parents():
+    rng = random.Random(2)
+    tree = SplayTree('top_down')
+    for key in rng.sample(range(2000), 1000):
+        tree.insert(key)
+    tree.engine = 'bottom_up'
+    check(tree)
+    for key in rng.sample(range(2000), 500):
+        tree.delete(key)
+    tree.engine = 'top_down'
+    for key in rng.sample(range(2000), 500):
+        tree.search(key)
+    tree.engine = 'bottom_up'
+    check(tree)
+
+
+def test_invalid_configurations_are_rejected():
+    with pytest.raises(ValueError):
+        SplayTree('sideways')
+    with pytest.raises(ValueError):
+        SplayTree(splay_policy='never')
+    with pytest.raises(ValueError):
+        SplayTree('top_down', 'semi')
+    tree = SplayTree('bottom_up', 'semi')
+    with pytest.raises(ValueError):
+        tree.engine = 'top_down'
+    with pytest.raises(IndexError):
+        tree.select(0)
+
+
+def test_from_sorted_builds_a_balanced_tree():
+    tree = SplayTree.from_sorted(iter([1, 1, 2, 3, 4, 5, 6, 7]))
+    check(tree)
+    assert list(tree) == [1, 2, 3, 4, 5, 6, 7] and tree.height() == 2
+    with pytest.raises(ValueError):
+        SplayTree.from_sorted([3, 2])
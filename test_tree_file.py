@@ -0,0 +1,187 @@
+import random
+import struct
+from fractions import Fraction
+
+import pytest
+
+from avl_tree_skeleton import AVLTree
+from b_tree import BTree
+from binary_tree import BinarySearchTree
+from interval_tree import IntervalTree
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+import tree_file
+from tree_file import TreeFileError
+from two_four_tree_skeleton import TwoFourTree
+
+CLASSES = [BinarySearchTree, AVLTree, RedBlackTree, SplayTree, TwoFourTree, BTree]
+
+
+def build(cls, keys):
+    tree = cls()
+    for key in keys:
+        tree.insert(key)
+    return tree
+
+
+def shape(tree):
+    """The balance metadata a snapshot stores, as comparable values."""
+    return {tag: list(column) for tag, column in tree._dump_columns().items()}
+
+
+@pytest.mark.parametrize("cls", CLASSES)
+@pytest.mark.parametrize("keys", [
+    [],
+    list(range(-500, 500, 7)),
+    [x / 8 for x in range(-300, 300)],
+    [f"key{x:04}" for x in range(400)],
+    [(x % 7, str(x)) for x in range(300)],
+    [b"\x00" * (x % 5) + bytes([x % 256]) for x in range(200)],
+    [2 ** 70 + x for x in range(100)],
+])
+def test_dump_then_load_restores_keys_and_shape(tmp_path, cls, keys):
+    keys = sorted(set(keys))
+    tree = build(cls, random.Random(len(keys)).sample(keys, len(keys)))
+    path = tmp_path / "tree.snap"
+    tree.dump(path)
+    loaded = cls.load(path)
+    assert type(loaded) is cls
+    assert list(loaded) == keys
+    assert shape(loaded) == shape(tree)
+    loaded.insert(keys[0] if keys else 0)
+    assert loaded.size() == max(len(keys), 1)
+
+
+@pytest.mark.parametrize("source", CLASSES)
+@pytest.mark.parametrize("target", CLASSES)
+def test_a_snapshot_loads_into_any_tree_class(tmp_path, source, target):
+    keys = list(range(0, 600, 3))
+    path = tmp_path / "tree.snap"
+    build(source, keys).dump(path)
+    loaded = target.load(path)
+    assert type(loaded) is target and list(loaded) == keys
+
+
+def test_interval_tree_round_trip_keeps_max_high(tmp_path):
+    from test_interval_tree import check_max_high
+
+    rng = random.Random(1)
+    tree = IntervalTree()
+    for _ in range(500):
+        low = rng.randrange(1000)
+        tree.add(low, low + rng.randrange(50))
+    tree.dump(tmp_path / "intervals.snap")
+    loaded = IntervalTree.load(tmp_path / "intervals.snap")
+    check_max_high(loaded)
+    assert list(loaded) == list(tree) and shape(loaded) == shape(tree)
+    assert loaded.overlapping(100, 200) == tree.overlapping(100, 200)
+
+
+@pytest.mark.parametrize("keys", [list(range(-1000, 1000, 3)), [x / 3 for x in range(-500, 500)]])
+def test_memory_mapped_load_answers_queries(tmp_path, keys):
+    path = tmp_path / "tree.snap"
+    AVLTree.from_sorted(keys).dump(path)
+    with AVLTree.load(path, mmap=True) as mapped:
+        assert len(mapped) == len(keys)
+        assert (mapped.find_min(), mapped.find_max()) == (keys[0], keys[-1])
+        for k in (0, 17, len(keys) - 1):
+            assert mapped.select(k) == keys[k]
+            assert mapped.rank(keys[k]) == k
+            assert keys[k] in mapped
+        low, high = keys[100], keys[300]
+        assert mapped.range_query(low, high) == keys[100:301]
+        assert mapped.count_range(low, high) == 201
+        assert mapped.count_range(high, low) == 0
+        assert mapped.lower_bound(keys[-1] + 1) is None
+
+
+def test_memory_mapped_load_needs_a_numeric_key_column(tmp_path):
+    path = tmp_path / "tree.snap"
+    AVLTree.from_sorted(["a", "b"]).dump(path)
+    with pytest.raises(TreeFileError):
+        AVLTree.load(path, mmap=True)
+
+
+def test_pickled_keys_load_only_when_allowed(tmp_path):
+    keys = [Fraction(x, 7) for x in range(50)]
+    path = tmp_path / "tree.snap"
+    RedBlackTree.from_sorted(keys).dump(path)
+    with pytest.raises(TreeFileError, match="allow_pickle"):
+        RedBlackTree.load(path)
+    assert list(RedBlackTree.load(path, allow_pickle=True)) == keys
+
+
+def test_corruption_is_detected(tmp_path):
+    path = tmp_path / "tree.snap"
+    BTree.from_sorted(range(1000)).dump(path)
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(TreeFileError, match="checksum"):
+        BTree.load(path)
+    path.write_bytes(b"NOPE" + bytes(data[4:]))
+    with pytest.raises(TreeFileError):
+        BTree.load(path)
+    path.write_bytes(b"BT")
+    with pytest.raises(TreeFileError):
+        BTree.load(path)
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_a_key_count_that_disagrees_with_the_key_column_is_rejected(tmp_path, mmap):
+    path = tmp_path / "tree.snap"
+    AVLTree.from_sorted(range(100)).dump(path)
+    data = bytearray(path.read_bytes())
+    struct.pack_into('<Q', data, 8, 101)
+    path.write_bytes(bytes(data))
+    with pytest.raises(TreeFileError, match="101 keys"):
+        tree_file.load(AVLTree, path, mmap=mmap, verify=False)
+
+
+@pytest.mark.parametrize("keys", [
+    [0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 64, -2 ** 100],
+    [(), (1, (2, ("x", b"y")), None), (True, False), (0.5, "é")],
+])
+def test_tagged_keys_round_trip(keys):
+    assert tree_file.decode_keys(tree_file.encode_keys(keys)) == keys
+
+
+def test_malformed_tagged_keys_are_rejected():
+    payload = tree_file.encode_keys([("abc", 1)])
+    with pytest.raises(TreeFileError):
+        tree_file._column(payload[:-3], 'k', 0, len(payload) - 3)
+    with pytest.raises(TreeFileError):
+        tree_file._column(payload[:-12], 'k', 0, len(payload) - 12)
+    with pytest.raises(TreeFileError):
+        tree_file.decode_keys(b"?")
+
+
+@pytest.mark.parametrize("largest, width", [(0, 1), (255, 1), (256, 2), (65535, 2), (65536, 4),
+                                            (2 ** 32 - 1, 4), (2 ** 32, 8)])
+def test_compact_uints_picks_the_narrowest_standard_width(largest, width):
+    column = tree_file.compact_uints([0, largest])
+    assert column.itemsize == width
+    assert tree_file.column_code(column) == {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}[width]
+
+
+def test_key_columns_are_stored_little_endian(tmp_path):
+    keys = [-2, 1, 300, 2 ** 40]
+    path = tmp_path / "tree.snap"
+    AVLTree.from_sorted(keys).dump(path)
+    data = path.read_bytes()
+    _, count, sections = tree_file._parse(data, True)
+    code, offset, length = sections[b'KEYS']
+    assert (code, count) == ('q', 4)
+    assert data[offset:offset + length] == struct.pack('<4q', *keys)
+
+
+def test_a_big_endian_host_byteswaps_columns(tmp_path, monkeypatch):
+    keys = list(range(0, 3000, 5))
+    tree = build(AVLTree, random.Random(2).sample(keys, len(keys)))
+    monkeypatch.setattr(tree_file, "_SWAP", True)
+    path = tmp_path / "tree.snap"
+    tree.dump(path)
+    loaded = AVLTree.load(path)
+    assert list(loaded) == keys and shape(loaded) == shape(tree)
+    with pytest.raises(TreeFileError):
+        AVLTree.load(path, mmap=True)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import tree_server
+from tree_client import ServerError, TreeClient
+from tree_server import TreeServer
+
+ALL_KINDS = {kind: kind for kind in tree_server.KINDS}
+
+
+def run(trees, body, line_limit=tree_server.LINE_LIMIT):
+    """Serve trees on a free TCP port and run body(server, port) against it."""
+    async def main():
+        server = TreeServer(trees, line_limit=line_limit)
+        listener = await server.serve_tcp('127.0.0.1', 0)
+        async with listener:
+            return await body(server, listener.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+async def exchange(port, requests, raw=b''):
+    """Write every request (and raw bytes) before reading anything; return the reply lines."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = b''.join(json.dumps(request).encode() + b'\n' for request in requests) + raw
+    writer.write(payload)
+    writer.write_eof()
+    replies = []
+    while line := await reader.readline():
+        replies.append(json.loads(line))
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def test_pipelined_replies_come_back_in_request_order():
+    rng = random.Random(1)
+    requests, expected, present = [], [], set()
+    for _ in range(2000):
+        key = rng.randrange(100)
+        verb = rng.choice(('PUT', 'GET', 'DEL'))
+        requests.append([verb, 'avl', key])
+        if verb == 'PUT':
+            expected.append(['OK', key not in present])
+            present.add(key)
+        elif verb == 'GET':
+            expected.append(['OK', key in present])
+        else:
+            expected.append(['OK', key in present])
+            present.discard(key)
+
+    async def body(server, port):
+        return await exchange(port, requests)
+
+    assert run({'avl': 'avl'}, body) == expected
+
+
+def test_range_streams_in_chunks_between_its_neighbours():
+    keys = list(range(0, 3 * tree_server.CHUNK + 10))
+
+    async def body(server, port):
+        return await exchange(port, [['MPUT', 'rb', keys], ['RANGE', 'rb', 5, 10 ** 6],
+                                     ['GET', 'rb', 7], ['RANGE', 'missing', 0, 1], ['TREES']])
+
+    replies = run({'rb': 'redblack'}, body)
+    assert replies[0] == ['OK', len(keys)]
+    chunks = [payload for status, payload in replies[1:] if status == 'MORE']
+    assert all(len(chunk) <= tree_server.CHUNK for chunk in chunks)
+    assert [key for chunk in chunks for key in chunk] == keys[5:]
+    tail = replies[1 + len(chunks):]
+    assert tail[0] == ['OK', len(keys) - 5]
+    assert tail[1] == ['OK', True]
+    assert tail[2][0] == 'ERR'
+    assert tail[3] == ['OK', {'rb': 'redblack'}]
+
+
+def test_an_overlong_line_is_answered_with_err_in_order():
+    async def body(server, port):
+        overlong = b'["PUT","avl","' + b'x' * 5000 + b'"]\n'
+        replies = await exchange(port, [['PUT', 'avl', 1]], overlong + b'["GET","avl",1]\n')
+        assert server._trees['avl'].size() == 1
+        return replies
+
+    replies = run({'avl': 'avl'}, body, line_limit=1024)
+    assert replies[0] == ['OK', True]
+    assert replies[1][0] == 'ERR' and 'longer than 1024' in replies[1][1]
+    assert replies[2] == ['OK', True]
+
+
+def test_malformed_requests_keep_the_connection_usable():
+    async def body(server, port):
+        return await exchange(port, [{'not': 'a list'}, [], ['NOPE'], ['GET', 'kv'], ['PUT', 'kv', 1],
+                                     ['CREATE', 'kv', 'avl'], ['CREATE', 'x', 'heap'], ['RANK', 'b', 3],
+                                     ['PUT', 'kv', 1, 'one']], b'{broken\n')
+
+    replies = run({'kv': 'bplus', 'b': 'btree'}, body)
+    assert [status for status, _ in replies] == ['ERR'] * 8 + ['OK', 'ERR']
+
+
+def test_a_deeply_nested_request_is_answered_with_err():
+    async def body(server, port):
+        return await exchange(port, [['TREES']], b'[' * 100_000 + b']' * 100_000 + b'\n["TREES"]\n')
+
+    replies = run({'avl': 'avl'}, body)
+    assert replies[0] == ['OK', {'avl': 'avl'}]
+    assert replies[1][0] == 'ERR' and replies[1][1].startswith('RecursionError')
+    assert replies[2] == ['OK', {'avl': 'avl'}]
+
+
+def test_delete_reports_whether_the_key_was_there():
+    async def body(server, port):
+        return await exchange(port, [[verb, name, key] for name in ALL_KINDS
+                                     for verb, key in (('DEL', 5), ('PUT', 5), ('DEL', 5), ('DEL', 5))
+                                     if name != 'bplus'])
+
+    replies = run(ALL_KINDS, body)
+    assert replies == [['OK', False], ['OK', True], ['OK', True], ['OK', False]] * (len(ALL_KINDS) - 1)
+
+
+def test_client_pool_answers_concurrent_callers():
+    async def body(server, port):
+        async with await TreeClient.connect(port=port, size=3, window=2) as client:
+            keys = random.Random(2).sample(range(100_000), 3000)
+            assert all(await asyncio.gather(*(client.put('avl', key) for key in keys)))
+            found = await asyncio.gather(*(client.get('avl', key) for key in keys[:500] + [-1, -2]))
+            assert found == [True] * 500 + [False, False]
+            assert await client.rank('avl', max(keys) + 1) == 3000
+            # Stop reading a long range early; the connection keeps serving
+            async for key in client.range('avl', 0, 10 ** 9):
+                if key > 1000:
+                    break
+            assert await client.mget('avl', sorted(keys)[:3] + [-5]) == [True, True, True, False]
+            assert await client.range_query('avl', 0, 10 ** 9) == sorted(keys)
+            assert await client.mdel('avl', keys[:1000] + [-1]) == 1000
+            await client.create('kv', 'bplus')
+            assert await client.mput('kv', [[1, 'a'], [2, 'b']]) == 2
+            assert [entry async for entry in client.range('kv', 0, 5)] == [[1, 'a'], [2, 'b']]
+            with pytest.raises(ServerError):
+                await client.get('nope', 1)
+            with pytest.raises(ServerError):
+                await client.range_query('nope', 1, 2)
+
+    run({'avl': 'avl'}, body)
+
+
+def test_client_fails_a_reply_longer_than_its_line_limit():
+    async def body(server, port):
+        client = await TreeClient.connect(port=port, size=1, line_limit=256)
+        try:
+            await client.mput('avl', list(range(1000)))
+            with pytest.raises(ConnectionError):
+                await client.range_query('avl', 0, 1000)
+            with pytest.raises(ConnectionError):
+                await client.get('avl', 1)
+        finally:
+            await client.close()
+
+    run({'avl': 'avl'}, body)
@@ -0,0 +1,247 @@
+"""Asyncio client for tree_server, with a pool of pipelined connections.
+
+    client = await TreeClient.connect(port=7400, size=4)
+    await client.put('users', 42)
+    await client.mget('users', [1, 2, 42])   # [False, False, True]
+    async for key in client.range('users', 0, 100):
+        ...
+    await client.close()
+
+Every connection is pipelined: a request is written as soon as it is made
+and its reply is matched to it by position, since the server answers in
+request order. Requests are spread over the pool's connections round-robin,
+so many coroutines can share one client. A range is consumed as it streams
+in; its chunks wait in a queue of at most `window` entries, and once that is
+full the connection stops reading, which pushes back on the server through
+the socket. Replies queued behind an unread range on the same connection
+wait with it.
+"""
+import asyncio
+from collections import deque
+import itertools
+import json
+
+from tree_server import DEFAULT_PORT, LINE_LIMIT
+
+
+class ServerError(Exception):
+    """The server answered a request with ERR."""
+
+
+class _Range():
+    """Chunks of one streaming range on their way from a connection to the reader."""
+
+    def __init__(self, window):
+        self._queue = asyncio.Queue(window)
+        self._abandoned = False
+        self._error = None
+
+    async def put(self, chunk):
+        if not self._abandoned:
+            await self._queue.put(chunk)
+
+    async def get(self):
+        if self._error is not None and self._queue.empty():
+            return self._error
+        return await self._queue.get()
+
+    def fail(self, error):
+        """End the range with error once the chunks already received are read."""
+        if self._abandoned:
+            return
+        if self._queue.full():
+            self._error = error
+        else:
+            self._queue.put_nowait(error)
+
+    def abandon(self):
+        """Drop the rest of the range; the connection keeps reading past it."""
+        self._abandoned = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+class _Connection():
+    """One pipelined connection: writes requests, routes replies to their waiters in order."""
+
+    def __init__(self, reader, writer, window):
+        self._reader = reader
+        self._writer = writer
+        self._window = window
+        self._waiting = deque()  # Futures, or _Ranges, in request order
+        self._task = asyncio.ensure_future(self._read_replies())
+
+    def request(self, message):
+        """Send message; returns a Future for its reply."""
+        future = asyncio.get_running_loop().create_future()
+        self._send(message, future)
+        return future
+
+    def stream(self, message):
+        """Send a RANGE message; returns a _Range that receives its chunks, then None."""
+        stream = _Range(self._window)
+        self._send(message, stream)
+        return stream
+
+    def _send(self, message, waiter):
+        if self._task.done():
+            raise ConnectionError("connection to the tree server is closed")
+        self._waiting.append(waiter)
+        self._writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+    async def drain(self):
+        await self._writer.drain()
+
+    async def _read_replies(self):
+        error = ConnectionError("connection to the tree server was lost")
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                status, payload = json.loads(line)
+                waiter = self._waiting[0]
+                if isinstance(waiter, _Range):
+                    if status == 'MORE':
+                        await waiter.put(payload)
+                        continue
+                    self._waiting.popleft()
+                    await waiter.put(ServerError(payload) if status == 'ERR' else None)
+                    continue
+                self._waiting.popleft()
+                if waiter.cancelled():
+                    continue
+                if status == 'OK':
+                    waiter.set_result(payload)
+                else:
+                    waiter.set_exception(ServerError(payload))
+        except (ConnectionError, asyncio.IncompleteReadError) as lost:
+            error = lost
+        except ValueError as overrun:
+            # readline() past the limit; the rest of the stream can't be matched up
+            error = ConnectionError(f"reply from the tree server too long: {overrun}")
+            self._writer.close()
+        finally:
+            while self._waiting:
+                waiter = self._waiting.popleft()
+                if isinstance(waiter, _Range):
+                    waiter.fail(error)
+                elif not waiter.done():
+                    waiter.set_exception(error)
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+class TreeClient():
+    """Pool of pipelined connections to one tree_server."""
+
+    def __init__(self, connections):
+        self._connections = connections
+        self._next = itertools.cycle(connections)
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=DEFAULT_PORT, unix=None, size=4, window=8,
+                      line_limit=LINE_LIMIT):
+        """Open size connections over TCP, or to the Unix socket unix when given.
+
+        window is the number of range chunks buffered per connection
+        before it stops reading from the server. line_limit bounds the
+        length of a reply line, such as a large MGET answer; a longer one
+        closes its connection.
+        """
+        if size < 1:
+            raise ValueError("a pool needs at least one connection")
+        connections = []
+        for _ in range(size):
+            if unix:
+                reader, writer = await asyncio.open_unix_connection(unix, limit=line_limit)
+            else:
+                reader, writer = await asyncio.open_connection(host, port, limit=line_limit)
+            connections.append(_Connection(reader, writer, window))
+        return cls(connections)
+
+    async def _call(self, *message):
+        connection = next(self._next)
+        reply = connection.request(list(message))
+        await connection.drain()
+        return await reply
+
+    async def get(self, tree, key):
+        """The value of key in a bplus tree; for the other kinds, whether key is present."""
+        return await self._call('GET', tree, key)
+
+    async def put(self, tree, key, *value):
+        """Insert key (mapped to value in a bplus tree); returns whether it was new."""
+        return await self._call('PUT', tree, key, *value)
+
+    async def delete(self, tree, key):
+        """Delete key; returns whether it was present."""
+        return await self._call('DEL', tree, key)
+
+    async def rank(self, tree, key):
+        """The number of keys less than key."""
+        return await self._call('RANK', tree, key)
+
+    async def mget(self, tree, keys):
+        return await self._call('MGET', tree, list(keys))
+
+    async def mput(self, tree, items):
+        """Insert keys ([key, value] pairs for a bplus tree); returns how many were new."""
+        return await self._call('MPUT', tree, list(items))
+
+    async def mdel(self, tree, keys):
+        """Delete keys; returns how many were present."""
+        return await self._call('MDEL', tree, list(keys))
+
+    async def trees(self):
+        """{name: kind} of the trees the server hosts."""
+        return await self._call('TREES')
+
+    async def create(self, tree, kind):
+        return await self._call('CREATE', tree, kind)
+
+    async def range(self, tree, low, high):
+        """Yield the keys within [low, high] ([key, value] pairs for bplus) as they stream in."""
+        chunks = self.range_chunks(tree, low, high)
+        try:
+            async for chunk in chunks:
+                for entry in chunk:
+                    yield entry
+        finally:
+            await chunks.aclose()
+
+    async def range_chunks(self, tree, low, high):
+        """Yield a range in the chunks the server sends it in."""
+        connection = next(self._next)
+        stream = connection.stream(['RANGE', tree, low, high])
+        try:
+            await connection.drain()
+            while True:
+                chunk = await stream.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            # A reader that stops early must not leave the connection blocked
+            stream.abandon()
+
+    async def range_query(self, tree, low, high):
+        """Return the whole range as one list."""
+        return [entry async for chunk in self.range_chunks(tree, low, high) for entry in chunk]
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self._connections))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
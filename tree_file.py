@@ -0,0 +1,431 @@
+"""Compact, versioned binary snapshot format shared by every tree class.
+
+Layout (little-endian, every section 8-byte aligned so typed columns can be
+viewed straight off a memory map):
+
+    header   magic b'BTRF', format version, tree kind, key count
+    section  tag, typecode, byte length, payload (padded to 8 bytes);
+             the typecode is a struct code with its standard size
+             (B/H/I/Q unsigned 8/16/32/64-bit, b/h/i/q signed, f/d float),
+             'p' for a pickle or 'x' for raw bytes
+    ...
+    footer   CRC32 of everything before it
+
+Columns are stored little-endian at those fixed widths whatever the host,
+so a file reads back the same on every platform; big-endian hosts byteswap
+on the way in and out.
+
+The 'KEYS' section holds the keys in ascending order, either as a raw 'q'
+(int64) or 'd' (float64) column, as tagged values ('k': str, bytes, int,
+float, bool, None and tuples of these, each a type byte followed by its
+fixed-width or length-prefixed little-endian data) or, for any other key
+type, as a pickled list ('p'). A pickle runs code when it is loaded, so
+load() refuses 'p' sections unless allow_pickle=True is passed.
+
+Further sections carry the balance metadata of the tree that wrote the
+file: inorder node depths ('DPTH'), AVL heights ('HGHT'), packed red-black
+color bits ('COLR') or the B-tree node layout and order ('NKEY', 'ORDR').
+They let a tree of the same kind be rebuilt with its exact shape in
+linear time; any other tree class rebuilds from the keys alone with
+from_sorted().
+"""
+import mmap as _mmap
+import os
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+from frozen_tree import key_typecode
+
+MAGIC = b'BTRF'
+VERSION = 1
+
+KINDS = {
+    'BinarySearchTree': 1,
+    'AVLTree': 2,
+    'RedBlackTree': 3,
+    'SplayTree': 4,
+    'TwoFourTree': 5,
+    'IntervalTree': 6,
+    'BTree': 7,
+}
+
+_HEADER = struct.Struct('<4sHHQ')
+_SECTION = struct.Struct('<4sc3xQ')
+_FOOTER = struct.Struct('<I')
+
+# Array typecodes that may have each column type's width on a given platform
+_ARRAY_CODES = {
+    'b': 'b', 'h': 'h', 'i': 'il', 'q': 'ql',
+    'B': 'B', 'H': 'H', 'I': 'IL', 'Q': 'QL',
+    'f': 'f', 'd': 'd',
+}
+_SWAP = sys.byteorder != 'little'
+
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+_LENGTH = struct.Struct('<I')
+
+
+class TreeFileError(ValueError):
+    """Raised when a snapshot file is malformed or fails its checksum."""
+
+
+def array_code(code):
+    """Return the array typecode whose items have the standard width of column type code."""
+    width = struct.calcsize('<' + code)
+    for candidate in _ARRAY_CODES[code]:
+        if array(candidate).itemsize == width:
+            return candidate
+    raise TreeFileError(f"no {width}-byte array type for column type {code!r} on this platform")
+
+
+def column_code(column):
+    """Return the fixed-width column type that stores the items of an array."""
+    if column.typecode in 'fd':
+        return 'f' if column.itemsize == 4 else 'd'
+    code = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}[column.itemsize]
+    return code.upper() if column.typecode.isupper() else code
+
+
+def compact_uints(values):
+    """Return an unsigned array of values using the narrowest fixed-width column type."""
+    values = list(values)
+    largest = max(values, default=0)
+    for code in 'BHI':
+        if largest < 1 << (8 * struct.calcsize('<' + code)):
+            return array(array_code(code), values)
+    return array(array_code('Q'), values)
+
+
+def _column_bytes(column):
+    """The items of an array as little-endian bytes."""
+    if _SWAP and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def encode_keys(keys):
+    """Encode keys as tagged values; raises TypeError for a type that has no tag."""
+    out = bytearray()
+    stack = list(reversed(keys))
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is str:
+            data = value.encode('utf-8')
+            out += b's' + _LENGTH.pack(len(data)) + data
+        elif kind is int:
+            if -1 << 63 <= value < 1 << 63:
+                out += b'i' + _INT64.pack(value)
+            else:
+                data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+                out += b'I' + _LENGTH.pack(len(data)) + data
+        elif kind is float:
+            out += b'f' + _FLOAT64.pack(value)
+        elif kind is bytes:
+            out += b'y' + _LENGTH.pack(len(value)) + value
+        elif kind is tuple:
+            out += b't' + _LENGTH.pack(len(value))
+            stack.extend(reversed(value))
+        elif kind is bool:
+            out += b'T' if value else b'F'
+        elif value is None:
+            out += b'n'
+        else:
+            raise TypeError(f"{kind.__name__} keys have no tagged encoding")
+    return bytes(out)
+
+
+def decode_keys(payload):
+    """Inverse of encode_keys, returning the list of keys."""
+    keys = []
+    tuples = []  # [items, remaining] of the tuples being filled, innermost last
+    position = 0
+    end = len(payload)
+    while position < end:
+        tag = payload[position:position + 1]
+        position += 1
+        if tag == b'i':
+            value, = _INT64.unpack_from(payload, position)
+            position += 8
+        elif tag == b's' or tag == b'y' or tag == b'I':
+            length, = _LENGTH.unpack_from(payload, position)
+            position += 4
+            data = bytes(payload[position:position + length])
+            if len(data) != length:
+                raise TreeFileError("truncated key")
+            position += length
+            if tag == b's':
+                value = data.decode('utf-8')
+            elif tag == b'y':
+                value = data
+            else:
+                value = int.from_bytes(data, 'little', signed=True)
+        elif tag == b'f':
+            value, = _FLOAT64.unpack_from(payload, position)
+            position += 8
+        elif tag == b't':
+            length, = _LENGTH.unpack_from(payload, position)
+            position += 4
+            if length:
+                tuples.append([[], length])
+                continue
+            value = ()
+        elif tag == b'T' or tag == b'F':
+            value = tag == b'T'
+        elif tag == b'n':
+            value = None
+        else:
+            raise TreeFileError(f"unknown key tag {tag!r}")
+        # Hand the value to the innermost open tuple, closing every tuple it completes
+        while tuples:
+            items = tuples[-1]
+            items[0].append(value)
+            items[1] -= 1
+            if items[1]:
+                break
+            value = tuple(tuples.pop()[0])
+        else:
+            keys.append(value)
+    if tuples:
+        raise TreeFileError("truncated key")
+    return keys
+
+
+def pack_bits(flags):
+    """Pack an iterable of booleans into bytes, least significant bit first."""
+    packed = bytearray()
+    byte = bit = 0
+    for flag in flags:
+        if flag:
+            byte |= 1 << bit
+        bit += 1
+        if bit == 8:
+            packed.append(byte)
+            byte = bit = 0
+    if bit:
+        packed.append(byte)
+    return bytes(packed)
+
+
+def unpack_bits(packed, count):
+    """Inverse of pack_bits, yielding count booleans."""
+    for i in range(count):
+        yield bool(packed[i >> 3] >> (i & 7) & 1)
+
+
+def dump(tree, path):
+    """Write tree to path; the file is replaced atomically."""
+    keys = list(tree.iter_inorder())
+    typecode = key_typecode(keys)
+    if typecode is not None:
+        column = array(array_code(typecode), keys)
+        sections = [(b'KEYS', typecode, _column_bytes(column))]
+    else:
+        try:
+            sections = [(b'KEYS', 'k', encode_keys(keys))]
+        except TypeError:
+            sections = [(b'KEYS', 'p', pickle.dumps(keys, protocol=pickle.HIGHEST_PROTOCOL))]
+    for tag, column in tree._dump_columns().items():
+        if isinstance(column, array):
+            sections.append((tag, column_code(column), _column_bytes(column)))
+        else:
+            sections.append((tag, 'x', bytes(column)))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as handle:
+        checksum = 0
+        chunk = _HEADER.pack(MAGIC, VERSION, KINDS[type(tree).__name__], len(keys))
+        handle.write(chunk)
+        checksum = zlib.crc32(chunk, checksum)
+        for tag, code, payload in sections:
+            padding = b'\0' * (-len(payload) % 8)
+            for chunk in (_SECTION.pack(tag, code.encode(), len(payload)), payload, padding):
+                handle.write(chunk)
+                checksum = zlib.crc32(chunk, checksum)
+        handle.write(_FOOTER.pack(checksum))
+    os.replace(temporary, path)
+
+
+def _parse(buffer, verify):
+    """Return (kind, count, {tag: (typecode, offset, length)}) for a snapshot buffer."""
+    size = len(buffer)
+    if size < _HEADER.size + _FOOTER.size:
+        raise TreeFileError("file too short to be a tree snapshot")
+    magic, version, kind, count = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise TreeFileError("not a tree snapshot file")
+    if version != VERSION:
+        raise TreeFileError(f"unsupported snapshot version {version}")
+    end = size - _FOOTER.size
+    if verify:
+        with memoryview(buffer) as view:
+            checksum = zlib.crc32(view[:end])
+        if checksum != _FOOTER.unpack_from(buffer, end)[0]:
+            raise TreeFileError("snapshot checksum mismatch")
+
+    sections = {}
+    offset = _HEADER.size
+    while offset < end:
+        if offset + _SECTION.size > end:
+            raise TreeFileError("truncated section header")
+        tag, code, length = _SECTION.unpack_from(buffer, offset)
+        offset += _SECTION.size
+        if offset + length > end:
+            raise TreeFileError("truncated section payload")
+        sections[tag] = (code.decode(), offset, length)
+        offset += length + (-length % 8)
+    if b'KEYS' not in sections:
+        raise TreeFileError("snapshot has no key column")
+    return kind, count, sections
+
+
+def _column(buffer, code, offset, length, allow_pickle=False):
+    payload = buffer[offset:offset + length]
+    if code == 'k':
+        try:
+            return decode_keys(payload)
+        except (struct.error, UnicodeDecodeError) as error:
+            raise TreeFileError(f"malformed key section: {error}") from None
+    if code == 'p':
+        if not allow_pickle:
+            raise TreeFileError("the keys are pickled and loading them would run code from the "
+                                "file; pass allow_pickle=True only for files you trust")
+        return pickle.loads(payload)
+    if code == 'x':
+        return bytes(payload)
+    if code not in _ARRAY_CODES:
+        raise TreeFileError(f"unknown column type {code!r}")
+    column = array(array_code(code))
+    if length % column.itemsize:
+        raise TreeFileError("column length is not a multiple of its item width")
+    column.frombytes(payload)
+    if _SWAP and column.itemsize > 1:
+        column.byteswap()
+    return column
+
+
+def load(cls, path, mmap=False, verify=True, allow_pickle=False):
+    """Load a snapshot written by dump().
+
+    With mmap=False a tree of type cls is rebuilt in linear time, reusing
+    the stored shape when the file was written by the same tree class.
+    With mmap=True the file is memory-mapped and a read-only MappedTree is
+    returned that answers queries straight off the key column, without
+    materializing any nodes; this needs an int or float key column.
+
+    Keys of types without a tagged encoding are stored pickled. Unpickling
+    can run arbitrary code and the checksum only detects corruption, it
+    does not authenticate the file, so such files load only with
+    allow_pickle=True, which must never be passed for untrusted files.
+    """
+    with open(path, 'rb') as handle:
+        if mmap:
+            return _load_mapped(handle, verify)
+        data = handle.read()
+    kind, count, sections = _parse(data, verify)
+    keys = _column(data, *sections.pop(b'KEYS'), allow_pickle=allow_pickle)
+    if len(keys) != count:
+        raise TreeFileError(f"header says {count} keys but the key column holds {len(keys)}")
+    if kind == KINDS.get(cls.__name__):
+        columns = {tag: _column(data, *section) for tag, section in sections.items()}
+        return cls._load_columns(keys, columns)
+    return cls.from_sorted(keys)
+
+
+def _load_mapped(handle, verify):
+    mapped = _mmap.mmap(handle.fileno(), 0, access=_mmap.ACCESS_READ)
+    try:
+        kind, count, sections = _parse(mapped, verify)
+        code, offset, length = sections[b'KEYS']
+        if code not in ('q', 'd'):
+            raise TreeFileError("only int and float key columns can be memory-mapped")
+        if _SWAP:
+            raise TreeFileError("memory-mapped columns are little-endian; load without mmap on this host")
+        if length != count * struct.calcsize('<' + code):
+            raise TreeFileError(f"header says {count} keys but the key column is {length} bytes long")
+    except Exception:
+        mapped.close()
+        raise
+    keys = memoryview(mapped)[offset:offset + length].cast(code)
+    return MappedTree(mapped, keys, count)
+
+
+class MappedTree():
+    """Read-only sorted key set served directly from a memory-mapped snapshot."""
+
+    def __init__(self, mapped, keys, count):
+        self._mmap = mapped
+        self._keys = keys
+        self._size = count
+
+    def close(self):
+        """Release the memory map; the object is unusable afterwards."""
+        self._keys.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def size(self):
+        return self._size
+
+    def is_empty(self):
+        return self._size == 0
+
+    def contains(self, element):
+        index = bisect_left(self._keys, element)
+        return index < self._size and self._keys[index] == element
+
+    def __contains__(self, element):
+        return self.contains(element)
+
+    def rank(self, element):
+        """Return the number of keys strictly less than element."""
+        return bisect_left(self._keys, element)
+
+    def select(self, k):
+        """Return the k-th smallest key (0-based)."""
+        return self._keys[k]
+
+    def lower_bound(self, element):
+        """Return the smallest key >= element, or None if there is none."""
+        index = bisect_left(self._keys, element)
+        return self._keys[index] if index < self._size else None
+
+    def find_min(self):
+        return self._keys[0] if self._size else None
+
+    def find_max(self):
+        return self._keys[-1] if self._size else None
+
+    def iter_range(self, min_val, max_val):
+        """Lazily yield keys within [min_val, max_val] in sorted order."""
+        keys = self._keys
+        for index in range(bisect_left(keys, min_val), bisect_right(keys, max_val)):
+            yield keys[index]
+
+    def range_query(self, min_val, max_val):
+        return list(self.iter_range(min_val, max_val))
+
+    def count_range(self, min_val, max_val):
+        if max_val < min_val:
+            return 0
+        return bisect_right(self._keys, max_val) - bisect_left(self._keys, min_val)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __repr__(self):
+        return f"MappedTree(size={self._size})"
@@ -0,0 +1,80 @@
+"""Helpers shared by the memory_report() methods of the trees.
+
+Sizes come from sys.getsizeof: what CPython allocates for each object
+itself, including the spare capacity of lists and arrays, but not the
+objects they point to. Keys are normally shared with the caller, so they
+are counted only on request (deep), and then each distinct key object is
+counted once, recursing into tuples, lists, sets and dicts. Keys stored
+unboxed in a typed array are part of the structure's own bytes already.
+"""
+import sys
+
+
+def object_bytes(obj):
+    """Size of obj plus its instance dict, if it has one."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(vars(obj))
+    return size
+
+
+def walk(root, children, sizeof=sys.getsizeof):
+    """Count the nodes under root and add up sizeof(node), iteratively.
+
+    children(node) returns the node's children; None entries are skipped.
+    Returns (node count, total bytes).
+    """
+    if root is None:
+        return 0, 0
+    count = total = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        total += sizeof(node)
+        for child in children(node):
+            if child is not None:
+                stack.append(child)
+    return count, total
+
+
+def deep_bytes(objects):
+    """Total size of the distinct objects reachable from objects through containers."""
+    seen = set()
+    total = 0
+    for obj in objects:
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (tuple, list, set, frozenset)):
+                stack.extend(obj)
+    return total
+
+
+def report(nodes, node_bytes, keys, overhead_bytes, deep_keys=None):
+    """Build the dict returned by memory_report().
+
+    nodes and node_bytes describe the structure (node objects plus any
+    per-node lists or arrays), keys is the number of keys held and
+    overhead_bytes the fixed cost of the tree object and any sentinel.
+    deep_keys, when given, iterates over the key objects to measure them.
+    """
+    key_bytes = deep_bytes(deep_keys) if deep_keys is not None else None
+    total = node_bytes + overhead_bytes + (key_bytes or 0)
+    return {
+        'nodes': nodes,
+        'keys': keys,
+        'node_bytes': node_bytes,
+        'bytes_per_node': node_bytes / nodes if nodes else 0.0,
+        'overhead_bytes': overhead_bytes,
+        'key_bytes': key_bytes,
+        'total_bytes': total,
+        'bytes_per_key': total / keys if keys else 0.0,
+    }
@@ -0,0 +1,307 @@
+"""Asyncio server that hosts named trees and speaks a pipelined line protocol.
+
+Every request and every response is one line holding a JSON array, so keys
+may be any JSON scalar. A client may send any number of requests without
+waiting; the responses come back in request order on the same connection.
+
+    ["GET", tree, key]          ["OK", value]   value for a bplus tree, else true/false
+    ["PUT", tree, key, value]   ["OK", new]     value is optional except for bplus
+    ["DEL", tree, key]          ["OK", removed]
+    ["RANK", tree, key]         ["OK", rank]    keys less than key (bst, avl, splay)
+    ["RANGE", tree, lo, hi]     ["MORE", [...]] ... ["OK", count]
+    ["MGET", tree, [keys]]      ["OK", [values or true/false]]
+    ["MPUT", tree, [keys]]      ["OK", new]     for bplus: [[key, value], ...]
+    ["MDEL", tree, [keys]]      ["OK", removed]
+    ["TREES"]                   ["OK", {name: kind}]
+    ["CREATE", name, kind]      ["OK", true]
+
+A failed request is answered with ["ERR", message] and the connection
+stays usable. That includes a request line longer than the server's
+line_limit, which is skipped piecewise without being buffered whole.
+RANGE streams its keys ([key, value] pairs for bplus) in chunks of at most
+CHUNK. Each chunk is read from the tree in one go, then
+the server waits for the socket to drain before reading the next one, so
+a slow reader throttles the stream instead of filling server memory. The
+next chunk resumes after the last key sent, so writes that land between
+chunks are seen consistently.
+
+    python tree_server.py [--port 7400 | --unix PATH] [--tree NAME=KIND ...] [--line-limit BYTES]
+"""
+import argparse
+import asyncio
+import json
+
+from avl_tree_skeleton import AVLTree
+from b_tree import BTree
+from binary_tree import BinarySearchTree
+from bplus_tree import BPlusTree
+from redblack_tree_skeleton import RedBlackTree
+from splay_tree_skeleton import SplayTree
+from two_four_tree_skeleton import TwoFourTree
+
+KINDS = {
+    'bst': BinarySearchTree,
+    'avl': AVLTree,
+    'redblack': RedBlackTree,
+    'splay': SplayTree,
+    'two_four': TwoFourTree,
+    'btree': BTree,
+    'bplus': BPlusTree,
+}
+
+DEFAULT_PORT = 7400
+LINE_LIMIT = 1 << 24  # longest request or reply line, in bytes
+CHUNK = 256
+WRITE_LIMIT = 1 << 16  # drain once this many response bytes are buffered
+
+
+class ProtocolError(Exception):
+    """A request the server cannot carry out; reported to the client as ERR."""
+
+
+class TreeServer():
+    """Hosts named trees and serves them to clients over TCP or a Unix socket."""
+
+    def __init__(self, trees=None, line_limit=LINE_LIMIT):
+        """trees maps names to kinds (see KINDS) or to existing tree objects."""
+        self.line_limit = line_limit
+        self._trees = {}
+        self._kinds = {}
+        for name, tree in (trees or {}).items():
+            if isinstance(tree, str):
+                self.create(name, tree)
+            else:
+                self._trees[name] = tree
+                self._kinds[name] = next((kind for kind, cls in KINDS.items() if type(tree) is cls), None)
+
+    def create(self, name, kind):
+        if kind not in KINDS:
+            raise ProtocolError(f"unknown kind {kind!r}; choose from {', '.join(KINDS)}")
+        if name in self._trees:
+            raise ProtocolError(f"tree {name!r} already exists")
+        self._trees[name] = KINDS[kind]()
+        self._kinds[name] = kind
+        return True
+
+    async def serve_tcp(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening on host:port; returns the asyncio Server."""
+        return await asyncio.start_server(self._handle, host, port, limit=self.line_limit)
+
+    async def serve_unix(self, path):
+        """Start listening on the Unix socket at path; returns the asyncio Server."""
+        return await asyncio.start_unix_server(self._handle, path, limit=self.line_limit)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await self._read_line(reader)
+                    if not line:
+                        break
+                    request = json.loads(line)
+                    if not isinstance(request, list) or not request:
+                        raise ProtocolError("a request is a non-empty JSON array")
+                    verb = request[0]
+                    if verb == 'RANGE':
+                        await self._stream_range(writer, *request[1:])
+                        continue
+                    handler = self._HANDLERS.get(verb)
+                    if handler is None:
+                        raise ProtocolError(f"unknown command {verb!r}")
+                    response = ['OK', handler(self, *request[1:])]
+                except (ProtocolError, ValueError, TypeError, KeyError, RecursionError) as error:
+                    # RecursionError: a request nested too deeply for json.loads
+                    response = ['ERR', f"{type(error).__name__}: {error}"]
+                writer.write(_encode(response))
+                if writer.transport.get_write_buffer_size() > WRITE_LIMIT:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_line(self, reader):
+        """Return the next request line, b'' at the end of the stream.
+
+        A line longer than line_limit is read and dropped piecewise up to
+        its newline, then reported with ProtocolError.
+        """
+        try:
+            return await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as error:
+            return error.partial  # a last line without its newline
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+        while True:
+            try:
+                await reader.readexactly(consumed)
+                await reader.readuntil(b'\n')
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as error:
+                consumed = error.consumed
+        raise ProtocolError(f"request line longer than {self.line_limit} bytes")
+
+    def _tree(self, name):
+        tree = self._trees.get(name)
+        if tree is None:
+            raise ProtocolError(f"no tree named {name!r}")
+        return tree
+
+    def _is_map(self, name):
+        return self._kinds.get(name) == 'bplus'
+
+    def _get(self, name, key):
+        tree = self._tree(name)
+        if self._is_map(name):
+            return tree.get(key)
+        return bool(tree.search(key))
+
+    def _put(self, name, key, *value):
+        tree = self._tree(name)
+        if self._is_map(name):
+            if not value:
+                raise ProtocolError("PUT on a bplus tree needs a value")
+            new = key not in tree
+            tree[key] = value[0]
+            return new
+        before = tree.size()
+        tree.insert(key)
+        return tree.size() > before
+
+    def _delete(self, name, key):
+        return bool(self._tree(name).delete(key))
+
+    def _rank(self, name, key):
+        tree = self._tree(name)
+        if not hasattr(tree, 'rank'):
+            raise ProtocolError(f"tree {name!r} does not keep ranks")
+        return tree.rank(key)
+
+    def _mget(self, name, keys):
+        tree = self._tree(name)
+        if self._is_map(name):
+            return [tree.get(key) for key in keys]
+        if hasattr(tree, 'search_many'):
+            return [bool(found) for found in tree.search_many(keys)]
+        return [bool(tree.search(key)) for key in keys]
+
+    def _mput(self, name, items):
+        tree = self._tree(name)
+        before = tree.size()
+        if self._is_map(name):
+            for key, value in items:
+                tree[key] = value
+        elif hasattr(tree, 'insert_many'):
+            tree.insert_many(items)
+        else:
+            for key in items:
+                tree.insert(key)
+        return tree.size() - before
+
+    def _mdel(self, name, keys):
+        tree = self._tree(name)
+        before = tree.size()
+        if hasattr(tree, 'delete_many'):
+            tree.delete_many(keys)
+        else:
+            for key in keys:
+                tree.delete(key)
+        return before - tree.size()
+
+    def _list(self):
+        return dict(self._kinds)
+
+    _HANDLERS = {
+        'GET': _get,
+        'PUT': _put,
+        'DEL': _delete,
+        'RANK': _rank,
+        'MGET': _mget,
+        'MPUT': _mput,
+        'MDEL': _mdel,
+        'TREES': _list,
+        'CREATE': create,
+    }
+
+    def _chunk(self, name, low, high, after):
+        """Read up to CHUNK entries of [low, high], skipping keys <= after (if any)."""
+        tree = self._tree(name)
+        if self._is_map(name):
+            entries = ([key, value] for key, value in tree.scan(low, high))
+            position = (lambda entry: entry[0])
+        else:
+            entries = tree.iter_range(low, high)
+            position = (lambda key: key)
+        chunk = []
+        for entry in entries:
+            if after is not None and not after[0] < position(entry):
+                continue
+            chunk.append(entry)
+            if len(chunk) == CHUNK:
+                break
+        return chunk, position
+
+    async def _stream_range(self, writer, name=None, low=None, high=None, *extra):
+        try:
+            if extra or low is None or high is None:
+                raise ProtocolError("RANGE takes a tree, a low and a high key")
+            self._tree(name)
+            count = 0
+            after = None
+            while True:
+                chunk, position = self._chunk(name, low, high, after)
+                if not chunk:
+                    break
+                count += len(chunk)
+                writer.write(_encode(['MORE', chunk]))
+                await writer.drain()
+                if len(chunk) < CHUNK:
+                    break
+                # Resume past the last key sent; later chunks see later writes
+                after = (position(chunk[-1]),)
+                low = after[0]
+            writer.write(_encode(['OK', count]))
+        except (ProtocolError, ValueError, TypeError) as error:
+            writer.write(_encode(['ERR', f"{type(error).__name__}: {error}"]))
+
+
+def _encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def parse_tree_option(text):
+    name, _, kind = text.partition('=')
+    if not name or kind not in KINDS:
+        raise argparse.ArgumentTypeError(f"expected NAME=KIND with KIND one of {', '.join(KINDS)}")
+    return name, kind
+
+
+async def serve(server, host, port, unix):
+    listener = await (server.serve_unix(unix) if unix else server.serve_tcp(host, port))
+    where = unix or f"{host}:{port}"
+    print(f"serving {', '.join(f'{name} ({kind})' for name, kind in server._list().items()) or 'no trees'} "
+          f"on {where}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--tree", type=parse_tree_option, action="append", default=[],
+                        metavar="NAME=KIND", help="host a tree (repeatable)")
+    parser.add_argument("--line-limit", type=int, default=LINE_LIMIT, help="longest request line in bytes")
+    args = parser.parse_args()
+    server = TreeServer(dict(args.tree), line_limit=args.line_limit)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()